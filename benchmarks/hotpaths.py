@@ -0,0 +1,252 @@
+"""Microbenchmarks of the EventEmitter hot paths: emit, raising_emit, emitting
+using an event token (emit_token), emitting to coroutine listeners and registering/removing listeners, for EventEmitter and
+EventEmitterS, with 0, 1, 10 and 1000 listeners, with and without "error" listeners
+and on the default asyncio loop and uvloop (when installed).
+
+Run using: python -m benchmarks.hotpaths [--output FILE] [--filter TEXT] [--min-time S]
+
+The results are written as JSON so they can be compared across versions.
+The cases can also be run using pytest-benchmark: pytest benchmarks
+"""
+
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from asyncio import AbstractEventLoop, new_event_loop, sleep
+from functools import partial
+from timeit import Timer
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from pyee2 import EventEmitter, EventEmitterS, __version__, event_token
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+EMITTERS: Dict[str, Any] = {
+    "EventEmitter": EventEmitter,
+    "EventEmitterS": EventEmitterS,
+}
+LOOPS: Tuple[str, ...] = ("asyncio", "uvloop")
+LISTENER_COUNTS: Tuple[int, ...] = (0, 1, 10, 1000)
+KINDS: Tuple[str, ...] = ("sync", "async")
+OPERATIONS: Tuple[str, ...] = ("emit", "emit_token", "raising_emit", "churn")
+
+
+class Case(NamedTuple):
+    """A single benchmark case"""
+
+    operation: str
+    emitter: str
+    loop: str
+    listeners: int
+    kind: str
+    error_listener: bool
+
+    @property
+    def name(self) -> str:
+        return "%s[%s-%s-%d-%s%s]" % (
+            self.operation,
+            self.emitter,
+            self.loop,
+            self.listeners,
+            self.kind,
+            "-error" if self.error_listener else "",
+        )
+
+
+def cases() -> Iterator[Case]:
+    """Generate every benchmark case.
+
+    Registering and removing listeners (churn) does not depend on the kind of
+    the listeners or on the presence of "error" listeners, so it is only
+    benchmarked with synchronous listeners and no "error" listener.
+
+    :return: Iterator of the benchmark cases
+    """
+    for operation in OPERATIONS:
+        for emitter in EMITTERS:
+            for loop in LOOPS:
+                for listeners in LISTENER_COUNTS:
+                    for kind in KINDS:
+                        for error_listener in (False, True):
+                            if operation == "churn" and (
+                                kind != "sync" or error_listener
+                            ):
+                                continue
+                            yield Case(
+                                operation,
+                                emitter,
+                                loop,
+                                listeners,
+                                kind,
+                                error_listener,
+                            )
+
+
+def create_loop(name: str) -> Optional[AbstractEventLoop]:
+    """Create a new loop
+
+    :param name: Either "asyncio" or "uvloop"
+    :return: The new loop or None if uvloop is not installed
+    """
+    if name == "uvloop":
+        return None if uvloop is None else uvloop.new_event_loop()
+    return new_event_loop()
+
+
+def sync_listener(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
+async def async_listener(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
+def create_listener(kind: str) -> Callable[..., Any]:
+    """Create a new listener, registering the same listener again would replace it
+
+    :param kind: Either "sync" or "async"
+    :return: A new do nothing function or coroutine function
+    """
+    if kind == "sync":
+
+        def listener(*args: Any, **kwargs: Any) -> None:
+            pass
+
+    else:
+
+        async def listener(*args: Any, **kwargs: Any) -> None:
+            pass
+
+    return listener
+
+
+def prepare(case: Case, loop: AbstractEventLoop) -> Callable[[], Any]:
+    """Create the emitter of a benchmark case and the operation to be measured.
+
+    Emitting to coroutine listeners is measured up to the listeners having run,
+    that is to say each operation is an emit followed by a loop iteration.
+
+    :param case: The benchmark case
+    :param loop: The loop the emitter is bound to
+    :return: The operation to be measured
+    """
+    ee = EMITTERS[case.emitter](loop=loop)
+    event = "churn" if case.operation == "churn" else "event"
+    for _ in range(case.listeners):
+        ee.on(event, create_listener(case.kind))
+    if case.error_listener:
+        ee.on("error", sync_listener)
+
+    if case.operation == "churn":
+
+        def churn() -> None:
+            ee.on("churn", sync_listener)
+            ee.once("churn", async_listener)
+            ee.remove_listener("churn", sync_listener)
+            ee.remove_listener("churn", async_listener)
+
+        return churn
+
+    emit = ee.raising_emit if case.operation == "raising_emit" else ee.emit
+    if case.operation == "emit_token":
+        event = event_token(event)
+    if case.kind == "sync" or case.listeners == 0:
+        return partial(emit, event, 1, data=2)
+
+    run_until_complete = loop.run_until_complete
+
+    def emit_and_run() -> None:
+        emit(event, 1, data=2)
+        run_until_complete(sleep(0))
+
+    return emit_and_run
+
+
+def measure(operation: Callable[[], Any], min_time: float, repeat: int) -> float:
+    """Measure the duration of an operation
+
+    :param operation: The operation to be measured
+    :param min_time: Minimum number of seconds each measurement runs for
+    :param repeat: The number of measurements
+    :return: The best duration, in seconds, of a single operation
+    """
+    timer = Timer(operation)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / elapsed) + 1 if elapsed else 0)
+    best = min([elapsed] + timer.repeat(repeat - 1, number)) if repeat > 1 else elapsed
+    return best / number
+
+
+def run(
+    name_filter: Optional[str] = None, min_time: float = 0.1, repeat: int = 3
+) -> Dict[str, Any]:
+    """Run the benchmark cases
+
+    :param name_filter: Optional text the name of the cases to be run must contain
+    :param min_time: Minimum number of seconds each measurement runs for
+    :param repeat: The number of measurements per case
+    :return: The JSON serializable results
+    """
+    results: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    loops: Dict[str, Optional[AbstractEventLoop]] = {
+        name: create_loop(name) for name in LOOPS
+    }
+    try:
+        for case in cases():
+            if name_filter is not None and name_filter not in case.name:
+                continue
+            loop = loops[case.loop]
+            if loop is None:
+                skipped.append(case.name)
+                continue
+            seconds = measure(prepare(case, loop), min_time, repeat)
+            result = case._asdict()
+            result["name"] = case.name
+            result["ns_per_op"] = seconds * 1e9
+            result["ops_per_sec"] = 1 / seconds
+            results.append(result)
+    finally:
+        for loop in loops.values():
+            if loop is not None:
+                loop.close()
+    return {
+        "pyee2": __version__,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "min_time": min_time,
+        "repeat": repeat,
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def main(args: Any = None) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="File to write the JSON results to")
+    parser.add_argument("--filter", help="Only run the cases whose name contains it")
+    parser.add_argument("--min-time", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(args)
+    results = run(options.filter, options.min_time, options.repeat)
+    if options.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(options.output, "w") as output:
+        json.dump(results, output, indent=2)
+    for result in results["results"]:
+        print("%-60s %12.1f ns/op" % (result["name"], result["ns_per_op"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Measures the memory used per emitter, for EventEmitter and EventEmitterS,
+with 0, 1 and 5 listeners registered for a single event.
+
+Every result is compared with the baseline, the bytes per emitter measured
+before the rare per-emitter state was moved into the emitter extras, or with
+the results of a previous run written using --output.
+
+Run using: python -m benchmarks.memory [--emitters N] [--output FILE] [--baseline FILE]
+"""
+
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from asyncio import AbstractEventLoop, new_event_loop
+from typing import Any, Callable, Dict, List
+
+from pyee2 import EventEmitter, EventEmitterS, __version__
+
+EMITTERS: Dict[str, Any] = {
+    "EventEmitter": EventEmitter,
+    "EventEmitterS": EventEmitterS,
+}
+LISTENER_COUNTS = (0, 1, 5)
+#: The bytes per emitter of pyee2 before the emitter extras, on CPython 3.11
+BASELINE: Dict[str, Dict[int, float]] = {
+    "EventEmitter": {0: 152.3, 1: 655.3, 5: 782.6},
+    "EventEmitterS": {0: 111.6, 1: 614.6, 5: 742.6},
+}
+
+
+def create_listeners(count: int) -> List[Callable[..., Any]]:
+    """Create distinct listeners, shared by every emitter
+
+    :param count: The number of listeners
+    :return: The listeners
+    """
+    listeners = []
+    for _ in range(count):
+
+        def listener(*args: Any, **kwargs: Any) -> None:
+            pass
+
+        listeners.append(listener)
+    return listeners
+
+
+def measure(
+    loop: AbstractEventLoop, emitter: Any, listeners: int, emitters: int
+) -> float:
+    """Measure the memory used per emitter
+
+    :param loop: The loop the emitters are bound to
+    :param emitter: The emitter class
+    :param listeners: The number of listeners registered for an event of each emitter
+    :param emitters: The number of emitters created
+    :return: The number of bytes allocated per emitter
+    """
+    registered = create_listeners(listeners)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = []
+    for _ in range(emitters):
+        ee = emitter(loop=loop)
+        for listener in registered:
+            ee.on("event", listener)
+        instances.append(ee)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # the list holding on to the emitters is not part of their footprint
+    allocated -= sys.getsizeof(instances)
+    return allocated / emitters
+
+
+def load_baseline(path: str) -> Dict[str, Dict[int, float]]:
+    """Load the results of a previous run to compare with
+
+    :param path: The JSON file written by the previous run using --output
+    :return: The bytes per emitter of the previous run, by emitter and listener count
+    """
+    with open(path) as previous:
+        results = json.load(previous)["results"]
+    baseline: Dict[str, Dict[int, float]] = {}
+    for result in results:
+        baseline.setdefault(result["emitter"], {})[result["listeners"]] = result[
+            "bytes_per_emitter"
+        ]
+    return baseline
+
+
+def main(args: Any = None) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emitters", type=int, default=10_000)
+    parser.add_argument("--output", help="File to write the JSON results to")
+    parser.add_argument(
+        "--baseline", help="JSON results of a previous run to compare with"
+    )
+    options = parser.parse_args(args)
+    baseline = BASELINE if options.baseline is None else load_baseline(options.baseline)
+    loop = new_event_loop()
+    results = []
+    try:
+        for name, emitter in EMITTERS.items():
+            for listeners in LISTENER_COUNTS:
+                per_emitter = measure(loop, emitter, listeners, options.emitters)
+                previous = baseline.get(name, {}).get(listeners)
+                results.append(
+                    {
+                        "emitter": name,
+                        "listeners": listeners,
+                        "bytes_per_emitter": per_emitter,
+                        "baseline": previous,
+                    }
+                )
+                line = "%-14s %d listeners: %8.1f bytes" % (
+                    name,
+                    listeners,
+                    per_emitter,
+                )
+                if previous is not None:
+                    line += "  baseline %8.1f bytes (%+.1f%%)" % (
+                        previous,
+                        (per_emitter - previous) / previous * 100,
+                    )
+                print(line)
+    finally:
+        loop.close()
+    if options.output is not None:
+        with open(options.output, "w") as output:
+            json.dump(
+                {
+                    "pyee2": __version__,
+                    "python": sys.version.split()[0],
+                    "emitters": options.emitters,
+                    "results": results,
+                },
+                output,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
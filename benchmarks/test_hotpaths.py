@@ -0,0 +1,32 @@
+"""pytest-benchmark integration of the hotpaths benchmarks.
+
+Run using: pytest benchmarks [--benchmark-json FILE]
+"""
+
+from asyncio import AbstractEventLoop
+from typing import Any, Iterator
+
+import pytest
+
+from .hotpaths import Case, cases, create_loop, prepare
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module", params=["asyncio", "uvloop"])
+def bench_loop(request: Any) -> Iterator[AbstractEventLoop]:
+    loop = create_loop(request.param)
+    if loop is None:
+        pytest.skip("uvloop is not installed")
+    yield loop
+    loop.close()
+
+
+@pytest.mark.parametrize(
+    "case",
+    [case for case in cases() if case.loop == "asyncio"],
+    ids=lambda case: case.name.replace("-asyncio", ""),
+)
+def test_hotpath(benchmark: Any, bench_loop: AbstractEventLoop, case: Case) -> None:
+    benchmark.group = case.operation
+    benchmark(prepare(case, bench_loop))
@@ -0,0 +1,89 @@
+"""Compares emitting events from another thread using EventEmitter.emit_threadsafe
+against scheduling every emit with loop.call_soon_threadsafe.
+
+Run using: python -m benchmarks.threadsafe [--events N] [--threads N]
+"""
+
+from argparse import ArgumentParser
+from asyncio import AbstractEventLoop, Future, new_event_loop
+from threading import Thread
+from time import perf_counter
+from typing import Any, Callable, List
+
+from pyee2 import EventEmitter
+
+
+def run(
+    loop: AbstractEventLoop,
+    ee: EventEmitter,
+    producer: Callable[[int], None],
+    events: int,
+    threads: int,
+) -> float:
+    """Emit events from producer threads and measure how long it takes
+    for all of them to be handled on the loop
+
+    :param loop: The loop the emitter is bound to
+    :param ee: The emitter
+    :param producer: The function emitting a single event from a producer thread
+    :param events: The number of events emitted by each producer thread
+    :param threads: The number of producer threads
+    :return: The number of seconds it took for every event to be handled
+    """
+    done: Future = loop.create_future()
+    expected = events * threads
+    handled = 0
+
+    def listener(value: int) -> None:
+        nonlocal handled
+        handled += 1
+        if handled == expected:
+            done.set_result(True)
+
+    ee.on("event", listener, is_async=False)
+
+    def produce() -> None:
+        for value in range(events):
+            producer(value)
+
+    workers: List[Thread] = [Thread(target=produce) for _ in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    loop.run_until_complete(done)
+    elapsed = perf_counter() - start
+    for worker in workers:
+        worker.join()
+    ee.remove_listener("event", listener)
+    return elapsed
+
+
+def main(args: Any = None) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=1)
+    options = parser.parse_args(args)
+    loop = new_event_loop()
+    ee = EventEmitter(loop=loop)
+    naive = run(
+        loop,
+        ee,
+        lambda value: loop.call_soon_threadsafe(ee.emit, "event", value),
+        options.events,
+        options.threads,
+    )
+    batched = run(
+        loop,
+        ee,
+        lambda value: ee.emit_threadsafe("event", value),
+        options.events,
+        options.threads,
+    )
+    loop.close()
+    total = options.events * options.threads
+    print("call_soon_threadsafe: %.0f events/s" % (total / naive))
+    print("emit_threadsafe:      %.0f events/s" % (total / batched))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,21 @@
+from .bridge import EventBridge, bridge_pipe
 from .eventemitter import EventEmitter
 from .eventemitterS import EventEmitterS
+from .sharedmem import SharedPayload
+from .stream import EventIterator
+from .subscriptions import ListenerGroup, Subscription
+from .tokens import EventToken, event_token
 
-__all__ = ["EventEmitter", "EventEmitterS"]
+__all__ = [
+    "EventBridge",
+    "EventEmitter",
+    "EventEmitterS",
+    "EventIterator",
+    "EventToken",
+    "ListenerGroup",
+    "SharedPayload",
+    "Subscription",
+    "bridge_pipe",
+    "event_token",
+]
 __version__ = "2.0.0"
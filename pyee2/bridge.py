@@ -0,0 +1,400 @@
+import os
+from asyncio import AbstractEventLoop, TimerHandle
+from functools import partial
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import ForkingPickler
+from queue import Queue
+from struct import pack, unpack_from
+from threading import Thread
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .sharedmem import SegmentCache, SegmentPool, SharedHandle, SharedPayload, shareable
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .eventemitter import EventEmitter
+    from .eventemitterS import EventEmitterS
+
+__all__ = ["EventBridge", "bridge_pipe"]
+
+_SUBSCRIBE = "subscribe"
+_UNSUBSCRIBE = "unsubscribe"
+_EMIT = "emit"
+_EMIT_SHARED = "emit_shared"
+_RELEASE = "release"
+_DESTROYED = "destroyed"
+
+_Emit = Tuple[str, Tuple[Any, ...], Dict[str, Any]]
+
+# The number of bytes read from the connection per read callback
+_READ_SIZE = 1 << 16
+
+
+def bridge_pipe() -> Tuple[Connection, Connection]:
+    """Create the two connected ends used by the EventBridges of two processes
+
+    :return: The two ends of a duplex multiprocessing pipe
+    """
+    return Pipe(duplex=True)
+
+
+class EventBridge:
+    """Connects an emitter to the emitter of another process over one end
+    of a multiprocessing pipe (see bridge_pipe).
+
+    Events are only forwarded once the other side subscribed to them, by
+    registering a listener for the event that queues its emits. The queued
+    emits are sent as a single pickled message per flush interval and
+    emitted, on the receiving side, using the emitter's emit on its loop.
+    Subscriptions are for exact event names, not wildcard patterns.
+
+    Emits received for an event are not forwarded back while they are being
+    emitted, so both sides can subscribe to the same event.
+
+    The connection is used in non-blocking mode: messages are pickled into an
+    outgoing buffer written using loop.add_writer as the pipe has room and
+    read using loop.add_reader as their bytes arrive, so neither side blocks
+    its loop on a large batch or on a message that was only partly written.
+    Messages are framed like Connection.send_bytes frames them. If the loop
+    does not support add_reader, messages are written and read by a writer
+    and a reader thread instead. Closing the bridge sends the queued emits
+    and only closes the connection once the outgoing buffer was written.
+
+    When shared_memory_threshold is set, emitted buffers (bytes, bytearray,
+    memoryview or NumPy arrays) of at least that many bytes are copied into
+    shared memory segments taken from a pool, and only their handles are
+    pickled. Listeners on the receiving side get a SharedPayload viewing the
+    segment in place of the buffer, the segment returns to the pool once the
+    payload is released (see SharedPayload). Segments the pool does not keep
+    are destroyed and the receiving side is told to unmap them.
+    """
+
+    __slots__ = [
+        "emitter",
+        "connection",
+        "flush_interval",
+        "shared_memory_threshold",
+        "_loop",
+        "_forwarders",
+        "_batch",
+        "_flush_handle",
+        "_receiving",
+        "_reader",
+        "_writer",
+        "_outgoing",
+        "_written",
+        "_incoming",
+        "_closed",
+        "_pool",
+        "_segments",
+    ]
+
+    def __init__(
+        self,
+        emitter: Union["EventEmitter", "EventEmitterS"],
+        connection: Connection,
+        flush_interval: float = 0.005,
+        shared_memory_threshold: Optional[int] = None,
+    ) -> None:
+        """Initialize a new EventBridge, reading messages right away
+
+        :param emitter: The emitter of this process
+        :param connection: This process's end of the pipe
+        :param flush_interval: The number of seconds emits are queued
+        for before being sent. Defaults to 0.005
+        :param shared_memory_threshold: Optional minimum size, in bytes, of the emitted
+        buffers sent through shared memory (Python 3.8+). Defaults to None, pickling every buffer
+        """
+        self.emitter: Union["EventEmitter", "EventEmitterS"] = emitter
+        self.connection: Connection = connection
+        self.flush_interval: float = flush_interval
+        self._loop: AbstractEventLoop = emitter._loop
+        self._forwarders: Dict[str, Callable[..., None]] = {}
+        self._batch: List[_Emit] = []
+        self._flush_handle: Optional[TimerHandle] = None
+        self._receiving: Optional[str] = None
+        self._reader: Optional[Thread] = None
+        self._writer: "Optional[Queue[Any]]" = None
+        self._outgoing: bytearray = bytearray()
+        self._written: int = 0
+        self._incoming: bytearray = bytearray()
+        self._closed: bool = False
+        self._pool: Optional[SegmentPool] = None
+        if shared_memory_threshold is not None:
+            self._pool = SegmentPool()
+        self._segments: SegmentCache = SegmentCache()
+        self.shared_memory_threshold: Optional[int] = shared_memory_threshold
+        try:
+            self._loop.add_reader(connection.fileno(), self._read)
+        except NotImplementedError:
+            self._writer = Queue()
+            Thread(target=self._write_in_thread, daemon=True).start()
+            self._reader = Thread(target=self._read_in_thread, daemon=True)
+            self._reader.start()
+        else:
+            os.set_blocking(connection.fileno(), False)
+
+    def subscribe(self, event: str) -> None:
+        """Ask the other side to forward the emits of an event
+
+        :param event: The event to be forwarded
+        """
+        self._send((_SUBSCRIBE, event))
+
+    def unsubscribe(self, event: str) -> None:
+        """Ask the other side to stop forwarding the emits of an event
+
+        :param event: The event to no longer be forwarded
+        """
+        self._send((_UNSUBSCRIBE, event))
+
+    def flush(self) -> None:
+        """Send the queued emits now"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._batch:
+            return
+        batch = self._batch
+        self._batch = []
+        self._send((_EMIT if self._pool is None else _EMIT_SHARED, batch))
+
+    def close(self) -> None:
+        """Send the queued emits, stop forwarding and close the connection
+        once the messages sent were written"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        for event, forwarder in self._forwarders.items():
+            self.emitter.remove_listener(event, forwarder)
+        self._forwarders.clear()
+        if self._writer is not None:
+            # the writer thread closes the connection once done writing
+            self._writer.put(None)
+        elif len(self._outgoing) == self._written:
+            self._disconnect()
+        else:
+            self._loop.remove_reader(self.connection.fileno())
+        if self._pool is not None:
+            self._pool.close()
+        self._segments.close()
+
+    def _disconnect(self) -> None:
+        """Stop reading and writing, discarding the unwritten messages,
+        and close the connection"""
+        connection = self.connection
+        if connection.closed:
+            return
+        self._loop.remove_reader(connection.fileno())
+        self._loop.remove_writer(connection.fileno())
+        self._outgoing.clear()
+        self._written = 0
+        connection.close()
+
+    def _forward(self, event: str, *args: Any, **kwargs: Any) -> None:
+        """The listener queueing the emits of an event the other side subscribed to"""
+        if event == self._receiving:
+            return
+        if self._pool is not None:
+            args, kwargs = self._share(args, kwargs)
+        self._batch.append((event, args, kwargs))
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_interval, self.flush)
+
+    def _share(
+        self, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """Replace the large buffers of an emit by their shared memory handles"""
+        pool = self._pool
+        threshold = self.shared_memory_threshold
+
+        def share(value: Any) -> Any:
+            if shareable(value):
+                view = memoryview(value)
+                if view.nbytes >= threshold:
+                    return pool.share(view) or value
+            return value
+
+        return (
+            tuple(share(arg) for arg in args),
+            {key: share(value) for key, value in kwargs.items()},
+        )
+
+    def _receive(self, value: Any, payloads: List[SharedPayload]) -> Any:
+        """Replace a shared memory handle by its payload"""
+        if type(value) is not SharedHandle:
+            return value
+        payload = self._segments.receive(value, self._release)
+        payloads.append(payload)
+        return payload
+
+    def _release(self, name: str) -> None:
+        self._send((_RELEASE, name))
+
+    def _send(self, message: Tuple[str, Any]) -> None:
+        if self._closed or self.connection.closed:
+            return
+        try:
+            data = ForkingPickler.dumps(message)
+        except Exception as e:
+            self._loop.call_exception_handler(
+                {"message": "EventBridge failed to send a message", "exception": e}
+            )
+            return
+        if self._writer is not None:
+            self._writer.put(data)
+            return
+        size = len(data)
+        outgoing = self._outgoing
+        idle = len(outgoing) == self._written
+        if size > 0x7FFFFFFF:
+            outgoing += pack("!iQ", -1, size)
+        else:
+            outgoing += pack("!i", size)
+        outgoing += data
+        if idle:
+            self._write()
+            if len(outgoing) != self._written:
+                self._loop.add_writer(self.connection.fileno(), self._write)
+
+    def _write(self) -> None:
+        """Write as much of the outgoing buffer as the pipe has room for"""
+        outgoing = self._outgoing
+        try:
+            with memoryview(outgoing) as view, view[self._written :] as pending:
+                self._written += os.write(self.connection.fileno(), pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            # the other side is gone
+            self._disconnect()
+            self.close()
+            return
+        if self._written == len(outgoing):
+            outgoing.clear()
+            self._written = 0
+            self._loop.remove_writer(self.connection.fileno())
+            if self._closed:
+                self._disconnect()
+        elif self._written > len(outgoing) >> 1:
+            del outgoing[: self._written]
+            self._written = 0
+
+    def _read(self) -> None:
+        try:
+            data = os.read(self.connection.fileno(), _READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect()
+            self.close()
+            return
+        incoming = self._incoming
+        incoming += data
+        consumed = 0
+        available = len(incoming)
+        try:
+            while not self._closed and available - consumed >= 4:
+                (size,) = unpack_from("!i", incoming, consumed)
+                start = consumed + 4
+                if size == -1:
+                    if available - start < 8:
+                        break
+                    (size,) = unpack_from("!Q", incoming, start)
+                    start += 8
+                if available - start < size:
+                    break
+                consumed = start + size
+                try:
+                    with memoryview(incoming) as view, view[start:consumed] as frame:
+                        message = ForkingPickler.loads(frame)
+                    self._handle(message)
+                except Exception as e:
+                    self._report_failure(e)
+        finally:
+            del incoming[:consumed]
+
+    def _read_in_thread(self) -> None:
+        connection = self.connection
+        try:
+            while True:
+                data = connection.recv_bytes()
+                try:
+                    message = ForkingPickler.loads(data)
+                except Exception as e:
+                    self._loop.call_soon_threadsafe(self._report_failure, e)
+                    continue
+                self._loop.call_soon_threadsafe(self._handle, message)
+        except (EOFError, OSError):
+            if not self._closed:
+                self._loop.call_soon_threadsafe(self.close)
+
+    def _write_in_thread(self) -> None:
+        connection = self.connection
+        writer = self._writer
+        try:
+            while True:
+                data = writer.get()
+                if data is None:
+                    break
+                connection.send_bytes(data)
+        except OSError:
+            if not self._closed:
+                self._loop.call_soon_threadsafe(self.close)
+        finally:
+            connection.close()
+
+    def _report_failure(self, exception: Exception) -> None:
+        self._loop.call_exception_handler(
+            {
+                "message": "EventBridge failed to handle a message",
+                "exception": exception,
+            }
+        )
+
+    def _handle(self, message: Tuple[str, Any]) -> None:
+        if self._closed:
+            return
+        kind, payload = message
+        if kind == _EMIT or kind == _EMIT_SHARED:
+            shared = kind == _EMIT_SHARED
+            emit = self.emitter.emit
+            payloads: List[SharedPayload] = []
+            receive = self._receive
+            for event, args, kwargs in payload:
+                if shared:
+                    args = tuple(receive(arg, payloads) for arg in args)
+                    kwargs = {
+                        key: receive(value, payloads) for key, value in kwargs.items()
+                    }
+                self._receiving = event
+                try:
+                    emit(event, *args, **kwargs)
+                finally:
+                    self._receiving = None
+            # released after the coroutine listeners had the chance to retain them
+            for received in payloads:
+                self._loop.call_soon(received.release)
+        elif kind == _SUBSCRIBE:
+            if payload not in self._forwarders:
+                forwarder: Callable[..., None] = partial(self._forward, payload)
+                self._forwarders[payload] = forwarder
+                self.emitter.on(payload, forwarder, is_async=False)
+        elif kind == _RELEASE:
+            if self._pool is not None and self._pool.release(payload):
+                self._send((_DESTROYED, payload))
+        elif kind == _DESTROYED:
+            self._segments.forget(payload)
+        elif kind == _UNSUBSCRIBE:
+            forwarder = self._forwarders.pop(payload, None)
+            if forwarder is not None:
+                self.emitter.remove_listener(payload, forwarder)
+
+    def __enter__(self) -> "EventBridge":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
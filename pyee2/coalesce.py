@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+from asyncio import AbstractEventLoop, Handle
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__all__ = [
+    "COALESCE_ACCUMULATE",
+    "COALESCE_DEBOUNCE",
+    "COALESCE_LATEST",
+    "COALESCE_THROTTLE",
+    "Accumulate",
+    "Coalescer",
+    "Debounce",
+    "Latest",
+    "Throttle",
+    "create_coalescer",
+]
+
+#: Deliver only the latest emit, once per loop iteration
+COALESCE_LATEST = "latest"
+#: Deliver the positional arguments of every emit as a list, once per loop iteration
+COALESCE_ACCUMULATE = "accumulate"
+#: Deliver the latest emit once no emit happened for interval seconds
+COALESCE_DEBOUNCE = "debounce"
+#: Deliver the latest emit at most once every interval seconds
+COALESCE_THROTTLE = "throttle"
+
+Deliver = Callable[[Tuple[Any, ...], Dict[str, Any]], None]
+
+
+class Coalescer(ABC):
+    """Base class of the coalescing policies of an event.
+
+    Emitting a coalesced event only hands its arguments to the coalescer,
+    which decides when, and with which arguments, the listeners of the event
+    are called using the loop's call_soon/call_at timers.
+    """
+
+    __slots__ = ["loop", "deliver", "handle"]
+
+    def __init__(self, loop: AbstractEventLoop, deliver: Deliver) -> None:
+        """Initialize a new Coalescer
+
+        :param loop: The loop used to schedule the deliveries
+        :param deliver: The function calling the listeners of the event
+        """
+        self.loop: AbstractEventLoop = loop
+        self.deliver: Deliver = deliver
+        self.handle: Optional[Handle] = None
+
+    @abstractmethod
+    def push(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        """Hand the arguments of an emit to the coalescer
+
+        :param args: Arguments of the emit
+        :param kwargs: Keyword arguments of the emit
+        """
+
+    def cancel(self) -> None:
+        """Cancel the pending delivery, if any, discarding its arguments"""
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+
+class Latest(Coalescer):
+    """Delivers only the latest emit, once per loop iteration"""
+
+    __slots__ = ["pending"]
+
+    def __init__(self, loop: AbstractEventLoop, deliver: Deliver) -> None:
+        super().__init__(loop, deliver)
+        self.pending: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
+
+    def push(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        self.pending = (args, kwargs)
+        if self.handle is None:
+            self.handle = self.loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self.handle = None
+        args, kwargs = self.pending
+        self.pending = None
+        self.deliver(args, kwargs)
+
+
+class Accumulate(Coalescer):
+    """Delivers the positional arguments of every emit made during a loop iteration
+    as a single list argument, once per loop iteration.
+    Keyword arguments are not supported
+    """
+
+    __slots__ = ["batch"]
+
+    def __init__(self, loop: AbstractEventLoop, deliver: Deliver) -> None:
+        super().__init__(loop, deliver)
+        self.batch: List[Tuple[Any, ...]] = []
+
+    def push(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        if kwargs:
+            raise TypeError("Accumulated events do not support keyword arguments")
+        self.batch.append(args)
+        if self.handle is None:
+            self.handle = self.loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self.handle = None
+        batch = self.batch
+        self.batch = []
+        self.deliver((batch,), {})
+
+    def cancel(self) -> None:
+        super().cancel()
+        self.batch = []
+
+
+class Debounce(Coalescer):
+    """Delivers the latest emit once no emit happened for interval seconds.
+
+    Rather than rescheduling its timer on every emit, the timer is only
+    rescheduled when it fires before the deadline set by the latest emit.
+    """
+
+    __slots__ = ["interval", "deadline", "pending"]
+
+    def __init__(
+        self, loop: AbstractEventLoop, deliver: Deliver, interval: float
+    ) -> None:
+        super().__init__(loop, deliver)
+        self.interval: float = interval
+        self.deadline: float = 0.0
+        self.pending: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
+
+    def push(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        self.pending = (args, kwargs)
+        self.deadline = self.loop.time() + self.interval
+        if self.handle is None:
+            self.handle = self.loop.call_at(self.deadline, self._fire)
+
+    def _fire(self) -> None:
+        if self.loop.time() < self.deadline:
+            self.handle = self.loop.call_at(self.deadline, self._fire)
+            return
+        self.handle = None
+        args, kwargs = self.pending
+        self.pending = None
+        self.deliver(args, kwargs)
+
+
+class Throttle(Coalescer):
+    """Delivers the latest emit at most once every interval seconds.
+
+    An emit made at least interval seconds after the previous delivery is
+    delivered immediately, otherwise the latest emit is delivered once
+    the interval has elapsed.
+    """
+
+    __slots__ = ["interval", "last", "pending"]
+
+    def __init__(
+        self, loop: AbstractEventLoop, deliver: Deliver, interval: float
+    ) -> None:
+        super().__init__(loop, deliver)
+        self.interval: float = interval
+        self.last: float = float("-inf")
+        self.pending: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
+
+    def push(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        self.pending = (args, kwargs)
+        if self.handle is not None:
+            return
+        if self.loop.time() - self.last >= self.interval:
+            self._flush()
+        else:
+            self.handle = self.loop.call_at(self.last + self.interval, self._fire)
+
+    def _fire(self) -> None:
+        self.handle = None
+        self._flush()
+
+    def _flush(self) -> None:
+        self.last = self.loop.time()
+        args, kwargs = self.pending
+        self.pending = None
+        self.deliver(args, kwargs)
+
+
+def create_coalescer(
+    policy: str,
+    loop: AbstractEventLoop,
+    deliver: Deliver,
+    interval: Optional[float] = None,
+) -> Coalescer:
+    """Create the coalescer implementing a coalescing policy
+
+    :param policy: One of "latest", "accumulate", "debounce" or "throttle"
+    :param loop: The loop used to schedule the deliveries
+    :param deliver: The function calling the listeners of the event
+    :param interval: The interval, in seconds, of the "debounce" and "throttle" policies
+    :return: The coalescer
+    """
+    if policy == COALESCE_LATEST:
+        return Latest(loop, deliver)
+    if policy == COALESCE_ACCUMULATE:
+        return Accumulate(loop, deliver)
+    if policy in (COALESCE_DEBOUNCE, COALESCE_THROTTLE):
+        if interval is None or interval <= 0:
+            raise ValueError("The %r policy requires a positive interval" % policy)
+        if policy == COALESCE_DEBOUNCE:
+            return Debounce(loop, deliver, interval)
+        return Throttle(loop, deliver, interval)
+    raise ValueError("Unknown coalescing policy %r" % policy)
@@ -0,0 +1,127 @@
+from asyncio import AbstractEventLoop
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+__all__ = ["DeferredQueue", "deferred_queue"]
+
+_Entry = Tuple[Callable[..., Any], str, Tuple[Any, ...], Dict[str, Any]]
+
+
+class DeferredQueue:
+    """FIFO queue of deferred emits, shared by every emitter using the same loop.
+
+    Deferred emits are run, in the order they were queued, by a single
+    loop.call_soon callback per burst that keeps running them, including those
+    queued while it runs, until the queue is empty. To keep the loop fair,
+    at most max_batch emits are run per callback when max_batch is set,
+    the remaining ones are run by the next callback.
+    """
+
+    __slots__ = [
+        "loop",
+        "max_batch",
+        "max_depth",
+        "drained",
+        "drains",
+        "_queue",
+        "_scheduled",
+        "__weakref__",
+    ]
+
+    def __init__(
+        self, loop: AbstractEventLoop, max_batch: Optional[int] = None
+    ) -> None:
+        """Initialize a new DeferredQueue
+
+        :param loop: The loop the queued emits are run on
+        :param max_batch: Optional maximum number of emits run per loop callback
+        """
+        self.loop: AbstractEventLoop = loop
+        self.max_batch: Optional[int] = max_batch
+        self.max_depth: int = 0
+        self.drained: int = 0
+        self.drains: int = 0
+        self._queue: Deque[_Entry] = deque()
+        self._scheduled: bool = False
+
+    @property
+    def depth(self) -> int:
+        """The number of queued emits"""
+        return len(self._queue)
+
+    def push(
+        self,
+        emit: Callable[..., Any],
+        event: str,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        """Queue an emit
+
+        :param emit: The emit function to call
+        :param event: The event to emit
+        :param args: Arguments to pass to the listeners for the event
+        :param kwargs: Keyword arguments to pass to the listeners for the event
+        """
+        queue = self._queue
+        queue.append((emit, event, args, kwargs))
+        if len(queue) > self.max_depth:
+            self.max_depth = len(queue)
+        if not self._scheduled:
+            self._scheduled = True
+            self.loop.call_soon(self._drain)
+
+    def stats(self) -> Dict[str, int]:
+        """Retrieve the metrics of the queue
+
+        :return: The current depth, maximum depth, number of emits run
+        and number of loop callbacks used to run them
+        """
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "drained": self.drained,
+            "drains": self.drains,
+        }
+
+    def _drain(self) -> None:
+        queue = self._queue
+        budget = self.max_batch
+        ran = 0
+        try:
+            while queue and (budget is None or ran < budget):
+                emit, event, args, kwargs = queue.popleft()
+                ran += 1
+                try:
+                    emit(event, *args, **kwargs)
+                except Exception as e:
+                    self.loop.call_exception_handler(
+                        {
+                            "message": "Exception raised by a deferred emit of %r"
+                            % event,
+                            "exception": e,
+                        }
+                    )
+        finally:
+            self.drained += ran
+            self.drains += 1
+            if queue:
+                self.loop.call_soon(self._drain)
+            else:
+                self._scheduled = False
+
+
+_queues: "WeakKeyDictionary[AbstractEventLoop, DeferredQueue]" = WeakKeyDictionary()
+
+
+def deferred_queue(loop: AbstractEventLoop) -> DeferredQueue:
+    """Retrieve the DeferredQueue of a loop, creating it if need be
+
+    :param loop: The loop
+    :return: The loop's DeferredQueue
+    """
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = DeferredQueue(loop)
+    return queue
@@ -0,0 +1,117 @@
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, cast
+
+from .listeners import LANE_ASYNC, LANE_SYNC, LANE_UNKNOWN, ListenerTable
+
+__all__ = ["UNROLL_LIMIT", "Dispatcher", "compile_dispatcher"]
+
+#: Events with at most this many listeners have their listener calls unrolled
+UNROLL_LIMIT = 8
+
+Dispatcher = Callable[[Tuple[Any, ...], Dict[str, Any]], None]
+
+_SYNC_CALL = """
+    {name}(*args, **kwargs)"""
+
+_HOOK_CALL = _SYNC_CALL
+
+_UNKNOWN_CALL = """
+    result = {name}(*args, **kwargs)
+    if isawaitable(result):
+        handle_awaitable(result)"""
+
+_ASYNC_CALL = """
+    handle_awaitable({name}(*args, **kwargs))"""
+
+_LANE_CALLS = {
+    LANE_SYNC: _SYNC_CALL,
+    LANE_ASYNC: _ASYNC_CALL,
+    LANE_UNKNOWN: _UNKNOWN_CALL,
+}
+
+_LOOP = """
+    for listener, lane in calls:"""
+
+_LOOP_CALL = """
+    result = listener(*args, **kwargs)
+    if lane and (lane == LANE_ASYNC or isawaitable(result)):
+        handle_awaitable(result)"""
+
+_EMIT_ERROR = """
+    except Exception as e:
+        emit_error("error", e)"""
+
+_SWALLOW_ERROR = """
+    except Exception:
+        pass"""
+
+
+def _indent(code: str) -> str:
+    return code.replace("\n", "\n    ")
+
+
+def _guard(call: str, handler: Optional[str]) -> str:
+    if handler is None:
+        return call
+    return "\n    try:%s%s" % (_indent(call), handler)
+
+
+def compile_dispatcher(
+    listeners: ListenerTable,
+    handle_awaitable: Callable[[Awaitable[Any]], None],
+    emit_error: Optional[Callable[..., Any]] = None,
+    raising: bool = False,
+) -> Dispatcher:
+    """Generate a dispatch function specialized for the current listeners of an event.
+
+    The generated function takes the positional and keyword arguments of an emit
+    and calls the hooks and the listeners in the same order, with the same
+    error semantics, as EventEmitter.emit. Events with no more than UNROLL_LIMIT listeners have
+    their calls unrolled, each handling the return value as its listener's lane
+    requires, and, when there is no one listening for the "error" event,
+    exceptions raised by the listeners are swallowed without any further checks.
+
+    When raising is true the generated function has the error semantics of
+    EventEmitter.raising_emit instead, that is to say it makes no attempt to
+    catch exceptions raised by the listeners.
+
+    The generated function holds on to the listeners it was generated for and
+    must be regenerated when the listeners for the event or the presence
+    of "error" listeners changes.
+
+    :param listeners: The listeners of the event to generate the dispatch function for
+    :param handle_awaitable: The function used to handle awaitables returned by listeners
+    :param emit_error: The function used to emit the error event, if there are error listeners
+    :param raising: Should exceptions raised by the listeners propagate to the caller
+    :return: The generated dispatch function
+    """
+    if raising:
+        handler = None
+    elif emit_error is None:
+        handler = _SWALLOW_ERROR
+    else:
+        handler = _EMIT_ERROR
+    namespace: Dict[str, Any] = {
+        "isawaitable": isawaitable,
+        "handle_awaitable": handle_awaitable,
+        "emit_error": emit_error,
+        "LANE_ASYNC": LANE_ASYNC,
+    }
+    body: List[str] = []
+    calls = listeners.resolve()
+    for idx, hook in enumerate(listeners.hooks):
+        name = "hook_%d" % idx
+        namespace[name] = hook
+        body.append(_HOOK_CALL.format(name=name))
+    if len(calls) > UNROLL_LIMIT:
+        namespace["calls"] = calls
+        body.append(_LOOP)
+        body.append(_indent(_guard(_LOOP_CALL, handler)))
+    else:
+        for idx, (listener, lane) in enumerate(calls):
+            name = "listener_%d" % idx
+            namespace[name] = listener
+            body.append(_guard(_LANE_CALLS[lane].format(name=name), handler))
+    source = "def dispatch(args, kwargs):%s\n" % ("".join(body) or "\n    pass")
+    exec(compile(source, "<pyee2 dispatch>", "exec"), namespace)
+    return cast(Dispatcher, namespace["dispatch"])
@@ -0,0 +1,115 @@
+import sys
+from asyncio import AbstractEventLoop, CancelledError, Future, Task, ensure_future
+from inspect import iscoroutine
+from typing import TYPE_CHECKING, Any, Awaitable, Coroutine, Optional
+
+if sys.version_info >= (3, 12):
+    from asyncio import eager_task_factory
+elif sys.version_info >= (3, 7) or TYPE_CHECKING:
+    from asyncio import current_task
+    from asyncio.tasks import _enter_task, _leave_task
+    from contextvars import Context, copy_context
+
+__all__ = ["EAGER_SUPPORTED", "eager_future"]
+
+#: T/F indicating if coroutines can be run eagerly, which needs contextvars (Python 3.7+)
+EAGER_SUPPORTED = sys.version_info >= (3, 7)
+
+
+def eager_future(awaitable: Awaitable[Any], loop: AbstractEventLoop) -> Future:
+    """Schedule an awaitable returned by a listener, running coroutines
+    eagerly, in their own task and context, when the loop is running.
+
+    Uses the loop's eager task factory on Python 3.12+. On older versions
+    the first step of the coroutine is run right away, in a copy of the current
+    context, while the task created for the coroutine is the current task,
+    the task then runs the next steps in the same context. A coroutine that
+    completes without suspending gets a future that is already done in place
+    of its task, whose only step ends it.
+
+    :param awaitable: The awaitable to be scheduled
+    :param loop: The loop to schedule it on
+    :return: The future of the awaitable, already done if the coroutine
+    completed without suspending
+    """
+    if not iscoroutine(awaitable) or not loop.is_running():
+        return ensure_future(awaitable, loop=loop)
+    if sys.version_info >= (3, 12):
+        return eager_task_factory(loop, awaitable)
+    context = copy_context()
+    resumed = _Resumed(awaitable, context)
+    task: "Task[Any]" = loop.create_task(resumed)
+    previous: "Optional[Task[Any]]" = current_task(loop)
+    if previous is not None:
+        _leave_task(loop, previous)
+    _enter_task(loop, task)
+    try:
+        resumed.first = context.run(awaitable.send, None)
+    except BaseException as e:
+        # the coroutine completed without suspending, the task's step only ends
+        resumed.coro = _completed()
+        resumed.started = True
+        if isinstance(e, (KeyboardInterrupt, SystemExit)):
+            raise
+        future = loop.create_future()
+        if isinstance(e, StopIteration):
+            future.set_result(e.value)
+        elif isinstance(e, CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+        return future
+    finally:
+        _leave_task(loop, task)
+        if previous is not None:
+            _enter_task(loop, previous)
+    return task
+
+
+class _Resumed(Coroutine[Any, Any, Any]):
+    """The coroutine run by the task of a coroutine whose first step was
+    already run by eager_future, before Python 3.12. It hands the value yielded
+    by the first step to the task and then runs the next steps in the
+    coroutine's context.
+    """
+
+    __slots__ = ["coro", "context", "first", "started"]
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], context: "Context") -> None:
+        """Initialize a new _Resumed
+
+        :param coro: The coroutine, suspended after its first step
+        :param context: The context the coroutine is run in
+        """
+        self.coro: Coroutine[Any, Any, Any] = coro
+        self.context: "Context" = context
+        self.first: Any = None
+        self.started: bool = False
+
+    def send(self, value: Any) -> Any:
+        if not self.started:
+            self.started = True
+            return self.first
+        return self.context.run(self.coro.send, value)
+
+    def throw(self, typ: Any, val: Any = None, tb: Any = None) -> Any:
+        # thrown before the task handled the value yielded by the first step,
+        # e.g. when cancelled, the coroutine gets it at its first await
+        self.started = True
+        return self.context.run(self.coro.throw, typ, val, tb)
+
+    def close(self) -> None:
+        self.coro.close()
+
+    def __await__(self) -> Any:
+        return self
+
+    def __next__(self) -> Any:
+        return self.send(None)
+
+    def __iter__(self) -> "_Resumed":
+        return self
+
+
+async def _completed() -> None:
+    """The coroutine ending the task of a coroutine that completed eagerly"""
@@ -1,25 +1,138 @@
-from asyncio import AbstractEventLoop, Future, ensure_future, get_event_loop
-from collections import OrderedDict
+from asyncio import (
+    FIRST_COMPLETED,
+    AbstractEventLoop,
+    Future,
+    ensure_future,
+    gather,
+    get_event_loop,
+    isfuture,
+    wait,
+)
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from functools import partial
-from inspect import isawaitable
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+from inspect import isawaitable, iscoroutine
+from itertools import repeat
+from operator import attrgetter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
+from threading import Lock
+from types import MappingProxyType
+
+from .coalesce import create_coalescer
+from .deferred import DeferredQueue, deferred_queue
+from .dispatch import compile_dispatcher
+from .eager import EAGER_SUPPORTED, eager_future
+from .extras import EmitterExtras
+from .listeners import (
+    LANE_ASYNC,
+    LANE_UNKNOWN,
+    ListenerTable,
+    WeakListener,
+    classify,
+    executor_caller,
+    weak_caller,
+)
+from .metrics import EventMetrics
+from .patterns import PatternTrie
+from .replay import ReplayBuffer
+from .stream import EventIterator
+from .subscriptions import Subscription
+from .tokens import EventToken, event_token, find_token
+from .waiters import Waiters
 
 __all__ = ["EventEmitterS"]
 
+#: Run the listener in the emitter's shared ThreadPoolExecutor
+EXECUTOR_THREAD = "thread"
+#: Run the listener in the emitter's shared ProcessPoolExecutor
+EXECUTOR_PROCESS = "process"
+
+#: When the high water mark is reached, emit_async waits for pending listener work
+OVERFLOW_BLOCK = "block"
+#: When the high water mark is reached, new listener work is discarded
+OVERFLOW_DROP = "drop"
+#: When the high water mark is reached, new listener work is discarded and an exception raised
+OVERFLOW_RAISE = "raise"
+
+#: The maximum number of event names whose matching listeners are cached in wildcard mode
+MATCH_CACHE_SIZE = 1024
+
+# Default of the configure_event options, leaving the option as it is
+_UNCHANGED: Any = object()
+# The read-only event table shared by every emitter without listeners
+_NO_EVENTS: Dict[Any, Any] = cast(Dict[Any, Any], MappingProxyType({}))
+# The token slots shared by every emitter without listeners for tokens,
+# never mutated, emitters replace it with their own list
+_NO_SLOTS: List[Optional[ListenerTable]] = []
+# Guards the lazy creation of the emitter extras and emit_threadsafe queues
+_setup_lock = Lock()
+
 
 class EventEmitterS:
     """Exactly the same class as EventEmitter except it is slotted"""
 
-    __slots__ = ["_loop", "__events"]
+    __slots__ = ["_loop", "__events", "__slots", "__compiled", "__eager", "__extras"]
 
-    def __init__(self, loop: Optional[AbstractEventLoop] = None) -> None:
+    def __init__(
+        self,
+        loop: Optional[AbstractEventLoop] = None,
+        *,
+        compiled: bool = False,
+        tracked: bool = False,
+        high_water_mark: Optional[int] = None,
+        overflow: str = OVERFLOW_BLOCK,
+        wildcard: bool = False,
+        separator: str = ".",
+        eager: bool = False
+    ) -> None:
         """Initialize a new EventEmitterS.
 
         :param loop: Optional loop argument. Defaults to asyncio.get_event_loop()
         :type loop: AbstractEventLoop
+        :param compiled: Should emit use dispatch functions generated for the listeners
+        of each event rather than the generic dispatch loop. Defaults to False
+        :param tracked: Should the futures created for awaitables returned by listeners
+        be kept track of until they are done. Defaults to False
+        :param high_water_mark: Optional maximum number of pending futures in tracked mode
+        :param overflow: What to do when the high water mark is reached,
+        one of "block", "drop" or "raise". Defaults to "block"
+        :param wildcard: Should listeners registered for event names containing
+        the "*" or "**" segments be called for every event name they match. Defaults to False
+        :param separator: The string separating the segments of event names. Defaults to "."
+        :param eager: Should the coroutines returned by listeners be run by emit until
+        they first suspend, in their own task and context, rather than always being
+        scheduled to start on a later loop iteration. Requires Python 3.7+.
+        Defaults to False
         """
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_RAISE):
+            raise ValueError("Unknown overflow policy %r" % overflow)
+        if eager and not EAGER_SUPPORTED:
+            raise ValueError("Running coroutines eagerly requires Python 3.7+")
         self._loop: AbstractEventLoop = loop if loop is not None else get_event_loop()
-        self.__events: Dict[str, Dict[Callable[..., Any], Callable[..., Any]]] = {}
+        self.__events: Dict[str, ListenerTable] = _NO_EVENTS
+        self.__slots: List[Optional[ListenerTable]] = _NO_SLOTS
+        self.__compiled: bool = compiled
+        self.__eager: bool = eager
+        self.__extras: Optional[EmitterExtras] = None
+        if tracked or wildcard:
+            extras = self.__extras = EmitterExtras(overflow)
+            if tracked:
+                extras.pending = set()
+                extras.high_water_mark = high_water_mark
+            if wildcard:
+                extras.patterns = PatternTrie(separator)
 
     def emit(self, event: str, *args: Any, **kwargs: Any) -> bool:
         """Emit an event, passing any args and kwargs to the registered listeners.
@@ -27,20 +140,61 @@ class EventEmitterS:
         If the registered listener for an event returns an awaitable, the awaitable is scheduled
         using asyncio.ensure_future
 
+        Listeners added or removed while the event is being emitted do not
+        affect which listeners are called for that emit.
+
+        In compiled dispatch mode the listeners are called by a dispatch function
+        generated for the current listeners of the event, which is cached until
+        the listeners of the event or the presence of "error" listeners changes.
+
+        If the event was configured with a coalescing policy (see configure_event)
+        the arguments are handed to the policy, which calls the listeners later on.
+
         :param event: The event to call listens for
         :param args: Arguments to pass to the listeners for the event
         :param kwargs: Keyword arguments to pass to the listeners for the event
         """
-        listeners = self.__events.get(event)
+        if type(event) is EventToken:
+            try:
+                listeners = self.__slots[event.slot]
+            except IndexError:
+                listeners = None
+            if listeners is None:
+                listeners = self.__fill_slot(event)
+        else:
+            listeners = self.__events.get(event)
+        extras = self.__extras
+        if extras is not None and extras.patterns is not None:
+            listeners = self.__match_listeners(event, listeners)
         if listeners is None:
+            if extras is not None and extras.replays is not None:
+                self.__record_unheard(event, args, kwargs)
             return False
+        if listeners.coalescer is not None:
+            listeners.coalescer.push(args, kwargs)
+            return True
+        if listeners.once:
+            listeners = self.__take_once(event, listeners)
+        elif self.__compiled:
+            dispatch = listeners.dispatcher
+            if dispatch is None:
+                dispatch = self.__dispatcher_for(listeners)
+            dispatch(args, kwargs)
+            return True
         listening_for_exceptions = "error" in self.__events
-        handle_awaitable = self.__handle_awaitable if listening_for_exceptions else self.__ne_handle_awaitable
+        handle_awaitable = (
+            self.__handle_awaitable
+            if listening_for_exceptions
+            else self.__ne_handle_awaitable
+        )
         emit_error = self.emit
-        for listener in list(listeners.values()):
+        calls = listeners.calls or listeners.resolve()
+        for hook in listeners.hooks:
+            hook(*args, **kwargs)
+        for listener, lane in calls:
             try:
                 result = listener(*args, **kwargs)
-                if isawaitable(result):
+                if lane and (lane == LANE_ASYNC or isawaitable(result)):
                     handle_awaitable(result)
             except Exception as e:
                 if listening_for_exceptions:
@@ -61,53 +215,460 @@ class EventEmitterS:
         :param args: Arguments to pass to the listeners for the event
         :param kwargs: Keyword arguments to pass to the listeners for the event
         """
-        listeners = self.__events.get(event)
+        if type(event) is EventToken:
+            try:
+                listeners = self.__slots[event.slot]
+            except IndexError:
+                listeners = None
+            if listeners is None:
+                listeners = self.__fill_slot(event)
+        else:
+            listeners = self.__events.get(event)
+        extras = self.__extras
+        if extras is not None and extras.patterns is not None:
+            listeners = self.__match_listeners(event, listeners)
         if listeners is None:
+            if extras is not None and extras.replays is not None:
+                self.__record_unheard(event, args, kwargs)
             return False
+        if listeners.once:
+            listeners = self.__take_once(event, listeners)
         handle_awaitable = self.__handle_awaitable
-        for listener in list(listeners.values()):
+        calls = listeners.calls or listeners.resolve()
+        for hook in listeners.hooks:
+            hook(*args, **kwargs)
+        for listener, lane in calls:
             result = listener(*args, **kwargs)
-            if isawaitable(result):
+            if lane and (lane == LANE_ASYNC or isawaitable(result)):
                 handle_awaitable(result)
         return True
 
+    def emit_deferred(self, event: str, *args: Any, **kwargs: Any) -> None:
+        """Emit an event on a later iteration of the emitter's loop rather than
+        calling the listeners from the caller's stack.
+
+        Deferred emits are queued, in FIFO order, in the DeferredQueue shared by every
+        emitter using the same loop (see deferred_queue) and run using emit by a single
+        loop callback per burst of deferred emits.
+
+        :param event: The event to call listens for
+        :param args: Arguments to pass to the listeners for the event
+        :param kwargs: Keyword arguments to pass to the listeners for the event
+        """
+        deferred_queue(self._loop).push(self.emit, event, args, kwargs)
+
+    def deferred_queue(self) -> DeferredQueue:
+        """Retrieve the DeferredQueue used by emit_deferred, which is shared
+        by every emitter using the same loop.
+
+        Use it to configure the maximum number of deferred emits
+        run per loop callback (max_batch) or to retrieve its metrics (stats).
+
+        :return: The DeferredQueue of the emitter's loop
+        """
+        return deferred_queue(self._loop)
+
+    def emit_threadsafe(self, event: str, *args: Any, **kwargs: Any) -> None:
+        """Emit an event from a thread other than the one running the emitter's loop.
+
+        The event is queued and emitted, using emit, on the emitter's loop.
+        Events queued before the loop gets around to emitting them are all
+        emitted by a single callback, so the loop is woken up at most once
+        per batch rather than once per event.
+
+        :param event: The event to call listens for
+        :param args: Arguments to pass to the listeners for the event
+        :param kwargs: Keyword arguments to pass to the listeners for the event
+        """
+        extras = self.__use_extras()
+        queue = extras.threadsafe_queue
+        if queue is None:
+            with _setup_lock:
+                if extras.threadsafe_queue is None:
+                    extras.threadsafe_lock = Lock()
+                    extras.threadsafe_queue = deque()
+            queue = extras.threadsafe_queue
+        queue.append((event, args, kwargs))
+        if extras.threadsafe_scheduled:
+            return
+        with extras.threadsafe_lock:
+            if extras.threadsafe_scheduled:
+                return
+            extras.threadsafe_scheduled = True
+        self._loop.call_soon_threadsafe(self.__drain_threadsafe)
+
+    def emit_many(self, event: str, payloads: Iterable[Sequence[Any]]) -> bool:
+        """Emit an event once for each of the supplied payloads, passing the items
+        of each payload as the positional arguments of the registered listeners.
+
+        Equivalent to calling emit for each payload, but the listeners of the event are
+        only resolved once. Delivery is payload-major: every listener receives
+        a payload before any listener receives the next one.
+        Listeners added or removed by a listener, including one time listeners,
+        take effect starting with the next payload.
+
+        :param event: The event to call listens for
+        :param payloads: The positional arguments to pass to the listeners, one sequence per emit
+        :return: T/F indicating if the event had listeners registered
+        """
+        return self.__emit_many(event, zip(payloads, repeat({})), False)
+
+    def emit_many_kwargs(
+        self, event: str, payloads: Iterable[Tuple[Sequence[Any], Dict[str, Any]]]
+    ) -> bool:
+        """Emit an event once for each of the supplied (args, kwargs) payloads.
+
+        Has the same semantics as emit_many except that each payload also
+        supplies the keyword arguments to pass to the listeners.
+
+        :param event: The event to call listens for
+        :param payloads: The positional and keyword arguments to pass to the listeners,
+        one (args, kwargs) pair per emit
+        :return: T/F indicating if the event had listeners registered
+        """
+        return self.__emit_many(event, payloads, False)
+
+    def raising_emit_many(self, event: str, payloads: Iterable[Sequence[Any]]) -> bool:
+        """Emit an event once for each of the supplied payloads with the error
+        semantics of raising_emit.
+
+        An exception raised by a listener propagates to the caller
+        and the remaining payloads are not delivered.
+
+        :param event: The event to call listens for
+        :param payloads: The positional arguments to pass to the listeners, one sequence per emit
+        :return: T/F indicating if the event had listeners registered
+        """
+        return self.__emit_many(event, zip(payloads, repeat({})), True)
+
+    def raising_emit_many_kwargs(
+        self, event: str, payloads: Iterable[Tuple[Sequence[Any], Dict[str, Any]]]
+    ) -> bool:
+        """Emit an event once for each of the supplied (args, kwargs) payloads with
+        the error semantics of raising_emit.
+
+        :param event: The event to call listens for
+        :param payloads: The positional and keyword arguments to pass to the listeners,
+        one (args, kwargs) pair per emit
+        :return: T/F indicating if the event had listeners registered
+        """
+        return self.__emit_many(event, payloads, True)
+
+    async def emit_async(
+        self,
+        event: str,
+        *args: Any,
+        max_concurrency: Optional[int] = None,
+        **kwargs: Any
+    ) -> List[Any]:
+        """Emit an event and wait for all of its listeners to finish handling it.
+
+        Listeners are called in the same order as emit. The awaitables returned by
+        listeners are awaited concurrently, using at most max_concurrency tasks
+        when max_concurrency is supplied, otherwise they are scheduled on
+        the emitter's loop using asyncio.ensure_future and gathered.
+
+        As with emit, exceptions raised by a listener are emitted as the "error"
+        event if there are error listeners. They are also included in the returned
+        results in place of the listener's result.
+
+        In tracked mode, when the high water mark of pending futures is reached,
+        depending on the overflow policy emit_async waits until enough of them
+        are done ("block"), returns without calling the listeners ("drop") or
+        raises a RuntimeError ("raise").
+
+        :param event: The event to call listens for
+        :param args: Arguments to pass to the listeners for the event
+        :param max_concurrency: Optional maximum number of awaitables awaited at once
+        :param kwargs: Keyword arguments to pass to the listeners for the event
+        :return: The result, or raised exception, of each listener in the order they were called
+        """
+        listeners = self.__listeners_for(event)
+        extras = self.__extras
+        if listeners is None:
+            if extras is not None and extras.replays is not None:
+                self.__record_unheard(event, args, kwargs)
+            return []
+        if self.__over_high_water_mark():
+            if extras.overflow == OVERFLOW_DROP:
+                return []
+            if extras.overflow == OVERFLOW_RAISE:
+                raise RuntimeError(
+                    "The high water mark of pending listeners was reached"
+                )
+            await self.__wait_below_high_water_mark()
+        results: List[Any] = []
+        pending: List[Tuple[int, Awaitable[Any]]] = []
+        failed: List[int] = []
+        calls = listeners.calls or listeners.resolve()
+        for hook in listeners.hooks:
+            hook(*args, **kwargs)
+        for listener, _ in calls:
+            try:
+                result = listener(*args, **kwargs)
+            except Exception as e:
+                failed.append(len(results))
+                result = e
+            else:
+                if isawaitable(result):
+                    pending.append((len(results), result))
+            results.append(result)
+        if pending:
+            if max_concurrency is None:
+                awaited = await gather(
+                    *[self.__ensure_tracked(aw) for _, aw in pending],
+                    return_exceptions=True
+                )
+                for (idx, _), result in zip(pending, awaited):
+                    if isinstance(result, Exception):
+                        failed.append(idx)
+                    results[idx] = result
+            else:
+                await self.__await_limited(pending, results, failed, max_concurrency)
+        if failed and "error" in self.__events:
+            emit_error = self.emit
+            for idx in sorted(failed):
+                emit_error("error", results[idx])
+        return results
+
     def on(
-        self, event: str, listener: Optional[Callable[..., Any]] = None
-    ) -> Callable[..., Any]:
+        self,
+        event: str,
+        listener: Optional[Callable[..., Any]] = None,
+        *,
+        is_async: Optional[bool] = None,
+        weak: bool = False,
+        executor: Union[Executor, str, None] = None,
+        priority: int = 0,
+        subscription: bool = False,
+        replay: bool = False
+    ) -> Union[Callable[..., Any], Subscription]:
         """Register a listener for an event.
 
         Can be used as a decorator for pythonic EventEmitter usage.
 
         :param event: The event to register the listener for
         :param listener: The listener to be called when the event it is registered for is emitted
-        :return: The listener or listener wrapper when used as a decorator
+        :param is_async: Optional declaration that the listener always (True) or never (False)
+        returns an awaitable. Defaults to classifying the listener automatically
+        :param weak: Should the listener be weakly referenced, removing it automatically
+        once it is garbage collected. Defaults to False
+        :param executor: Optional executor to call the (blocking) listener in,
+        either an Executor or "thread"/"process" for the emitter's shared pools
+        :param priority: The priority of the listener, listeners with higher priorities
+        are called first. Defaults to 0
+        :param subscription: Should the Subscription of the listener be returned,
+        rather than the listener. Defaults to False
+        :param replay: Should the listener be called right away with the emits buffered
+        for the event if it is configured for replay (see configure_event). Defaults to False
+        :return: The listener, or its Subscription, or listener wrapper when used as a decorator
         """
-        if listener is None:
-            return partial(self.on, event)
-        self.__add_listener(event, listener, listener)
-        return listener
+        return self.__register(
+            event,
+            listener,
+            False,
+            False,
+            is_async,
+            weak,
+            executor,
+            priority,
+            subscription,
+            replay,
+        )
 
     def once(
-        self, event: str, listener: Optional[Callable[..., Any]] = None
-    ) -> Callable[..., Any]:
+        self,
+        event: str,
+        listener: Optional[Callable[..., Any]] = None,
+        *,
+        is_async: Optional[bool] = None,
+        weak: bool = False,
+        executor: Union[Executor, str, None] = None,
+        priority: int = 0,
+        subscription: bool = False,
+        replay: bool = False
+    ) -> Union[Callable[..., Any], Subscription]:
         """Register a one time listener for an event.
 
         Can be used as a decorator for pythonic EventEmitter usage.
 
         :param event: The event to register the listener for
         :param listener: The listener to be called when the event it is registered for is emitted
-        :return: The listener or listener wrapper when used as a decorator
+        :param is_async: Optional declaration that the listener always (True) or never (False)
+        returns an awaitable. Defaults to classifying the listener automatically
+        :param weak: Should the listener be weakly referenced, removing it automatically
+        once it is garbage collected. Defaults to False
+        :param executor: Optional executor to call the (blocking) listener in,
+        either an Executor or "thread"/"process" for the emitter's shared pools
+        :param priority: The priority of the listener, listeners with higher priorities
+        are called first. Defaults to 0
+        :param subscription: Should the Subscription of the listener be returned,
+        rather than the listener. Defaults to False
+        :param replay: Should the listener be called right away with the emits buffered
+        for the event if it is configured for replay (see configure_event). Defaults to False
+        :return: The listener, or its Subscription, or listener wrapper when used as a decorator
         """
+        return self.__register(
+            event,
+            listener,
+            True,
+            False,
+            is_async,
+            weak,
+            executor,
+            priority,
+            subscription,
+            replay,
+        )
 
-        if listener is None:
-            return partial(self.once, event)
+    def prepend_listener(
+        self,
+        event: str,
+        listener: Optional[Callable[..., Any]] = None,
+        *,
+        is_async: Optional[bool] = None,
+        weak: bool = False,
+        executor: Union[Executor, str, None] = None,
+        priority: int = 0,
+        subscription: bool = False,
+        replay: bool = False
+    ) -> Union[Callable[..., Any], Subscription]:
+        """Register a listener for an event, called before the other
+        listeners of the event with the same priority.
 
-        def once_wrapper(*args: Any, **kwargs: Any) -> Any:
-            self.remove_listener(event, listener)
-            return listener(*args, **kwargs)
+        Can be used as a decorator for pythonic EventEmitter usage.
 
-        self.__add_listener(event, listener, once_wrapper)
-        return listener
+        :param event: The event to register the listener for
+        :param listener: The listener to be called when the event it is registered for is emitted
+        :param is_async: Optional declaration that the listener always (True) or never (False)
+        returns an awaitable. Defaults to classifying the listener automatically
+        :param weak: Should the listener be weakly referenced, removing it automatically
+        once it is garbage collected. Defaults to False
+        :param executor: Optional executor to call the (blocking) listener in,
+        either an Executor or "thread"/"process" for the emitter's shared pools
+        :param priority: The priority of the listener, listeners with higher priorities
+        are called first. Defaults to 0
+        :param subscription: Should the Subscription of the listener be returned,
+        rather than the listener. Defaults to False
+        :param replay: Should the listener be called right away with the emits buffered
+        for the event if it is configured for replay (see configure_event). Defaults to False
+        :return: The listener, or its Subscription, or listener wrapper when used as a decorator
+        """
+        return self.__register(
+            event,
+            listener,
+            False,
+            True,
+            is_async,
+            weak,
+            executor,
+            priority,
+            subscription,
+            replay,
+        )
+
+    def prepend_once_listener(
+        self,
+        event: str,
+        listener: Optional[Callable[..., Any]] = None,
+        *,
+        is_async: Optional[bool] = None,
+        weak: bool = False,
+        executor: Union[Executor, str, None] = None,
+        priority: int = 0,
+        subscription: bool = False,
+        replay: bool = False
+    ) -> Union[Callable[..., Any], Subscription]:
+        """Register a one time listener for an event, called before the other
+        listeners of the event with the same priority.
+
+        Can be used as a decorator for pythonic EventEmitter usage.
+
+        :param event: The event to register the listener for
+        :param listener: The listener to be called when the event it is registered for is emitted
+        :param is_async: Optional declaration that the listener always (True) or never (False)
+        returns an awaitable. Defaults to classifying the listener automatically
+        :param weak: Should the listener be weakly referenced, removing it automatically
+        once it is garbage collected. Defaults to False
+        :param executor: Optional executor to call the (blocking) listener in,
+        either an Executor or "thread"/"process" for the emitter's shared pools
+        :param priority: The priority of the listener, listeners with higher priorities
+        are called first. Defaults to 0
+        :param subscription: Should the Subscription of the listener be returned,
+        rather than the listener. Defaults to False
+        :param replay: Should the listener be called right away with the emits buffered
+        for the event if it is configured for replay (see configure_event). Defaults to False
+        :return: The listener, or its Subscription, or listener wrapper when used as a decorator
+        """
+        return self.__register(
+            event,
+            listener,
+            True,
+            True,
+            is_async,
+            weak,
+            executor,
+            priority,
+            subscription,
+            replay,
+        )
+
+    def events(
+        self, event: str, *, maxsize: int = 0, overflow: str = OVERFLOW_BLOCK
+    ) -> EventIterator:
+        """Iterate the emits of an event asynchronously.
+
+        The returned EventIterator registers a listener for the event right away
+        and yields the tuple of positional arguments of every emit, keyword arguments
+        are not supported. It removes its listener when closed, for example when
+        exiting it as an async context manager:
+
+            async with ee.events("data", maxsize=100) as events:
+                async for args in events:
+                    ...
+
+        :param event: The event to iterate the emits of
+        :param maxsize: The maximum number of buffered emits, unbounded if zero or less.
+        Defaults to unbounded
+        :param overflow: What to do with new emits when the buffer is full,
+        one of "block", "drop_oldest" or "drop_newest". Defaults to "block"
+        :return: The async iterator of the emits of the event
+        """
+        return EventIterator(self, event, maxsize, overflow)
+
+    async def wait_for(
+        self,
+        event: str,
+        predicate: Optional[Callable[..., bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[Any, ...]:
+        """Wait for the next emit of an event, optionally one satisfying a predicate.
+
+        Every wait_for of an event shares a single listener, removed once
+        nobody is waiting for the event anymore. The predicates are evaluated in
+        the order the waits started and a wait stops waiting as soon as it is
+        satisfied, times out or is cancelled. Removing all listeners of
+        the event cancels the waits.
+
+        :param event: The event to wait for
+        :param predicate: Optional function called with the arguments of each emit,
+        only an emit for which it returns true ends the wait. If it raises,
+        the wait fails with the exception
+        :param timeout: Optional maximum number of seconds to wait
+        :return: The tuple of positional arguments of the emit
+        :raises asyncio.TimeoutError: If the timeout elapsed first
+        """
+        extras = self.__use_extras()
+        waiters = None
+        if extras.waiters is None:
+            extras.waiters = {}
+        else:
+            waiters = extras.waiters.get(event)
+        if waiters is None:
+            waiters = Waiters(self._loop, partial(self.__forget_waiters, event))
+            extras.waiters[event] = waiters
+            self.on(event, waiters.dispatch, is_async=False)
+        return cast(Tuple[Any, ...], await waiters.wait(predicate, timeout))
 
     def remove_listener(self, event: str, listener: Callable[..., Any]) -> None:
         """Remove a listener registered for a event
@@ -115,11 +676,10 @@ class EventEmitterS:
         :param event: The event that has the supplied `listener` register
         :param listener: The registered listener to be removed
         """
-        ldict = self.__events.get(event, None)
-        if ldict is not None:
-            ldict.pop(listener, None)
-            if len(ldict) == 0:
-                del self.__events[event]
+        listeners = self.__events.get(event, None)
+        if listeners is None:
+            return
+        self.__listeners_removed(event, listeners.remove(listener))
 
     def remove_all_listeners(self, event: Optional[str] = None) -> None:
         """Removes all listeners registered to an event.
@@ -128,10 +688,33 @@ class EventEmitterS:
 
         :param event: Optional event to remove listeners for
         """
+        extras = self.__extras
+        if extras is not None and extras.waiters is not None:
+            waiting = (
+                list(extras.waiters.values())
+                if event is None
+                else [extras.waiters.get(event)]
+            )
+            for waiters in waiting:
+                if waiters is not None:
+                    waiters.cancel()
         if event is not None:
-            self.__events.pop(event, None)
+            listeners = self.__events.get(event, None)
+            if listeners is not None:
+                self.__remove_event(event)
+                listeners.invalidate()
+                if extras is not None and extras.patterns is not None:
+                    extras.patterns.remove(event)
+                if event == "error":
+                    self.__invalidate_dispatchers()
+                self.__forget_matches(event)
             return
-        self.__events.clear()
+        self.__invalidate_dispatchers()
+        self.__events = _NO_EVENTS
+        self.__slots = _NO_SLOTS
+        if extras is not None and extras.patterns is not None:
+            extras.patterns.clear()
+            self.__forget_matches()
 
     def listeners(self, event: str) -> List[Callable[..., Any]]:
         """Retrieve the list of listeners registered for a event
@@ -139,9 +722,9 @@ class EventEmitterS:
         :param event: The event to retrieve its listeners for
         :return: List of listeners registered for the event
         """
-        ldict = self.__events.get(event, None)
-        if ldict is not None:
-            return [listener for listener in ldict.keys()]
+        listeners = self.__events.get(event, None)
+        if listeners is not None:
+            return listeners.originals()
         return []
 
     def event_names(self) -> List[str]:
@@ -170,23 +753,799 @@ class EventEmitterS:
         """
         return event_name in self.__events
 
+    @staticmethod
+    def event_token(name: str) -> EventToken:
+        """Retrieve the interned token for an event name.
+
+        The token can be used anywhere an event name is accepted, emitting
+        using the token finds the event's listeners by indexing the emitter's
+        list of token slots instead of looking the name up (see EventToken).
+
+        :param name: The event name
+        :return: The token for the event name
+        """
+        return event_token(name)
+
+    def pending_count(self) -> int:
+        """Returns the number of pending futures created for awaitables
+        returned by listeners.
+
+        Always zero unless the emitter is in tracked mode.
+
+        :return: The number of pending futures
+        """
+        pending = None if self.__extras is None else self.__extras.pending
+        if pending is None:
+            return 0
+        return len(pending)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the pending futures created for awaitables returned by
+        listeners to be done, including those created while waiting.
+
+        :param timeout: Optional maximum number of seconds to wait
+        :return: T/F indicating if there are no more pending futures
+        """
+        pending = None if self.__extras is None else self.__extras.pending
+        if pending is None:
+            return True
+        deadline = None if timeout is None else self._loop.time() + timeout
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return False
+            await wait(list(pending), timeout=remaining)
+        return True
+
+    async def aclose(self, timeout: Optional[float] = 0) -> None:
+        """Wait for the pending futures created for awaitables returned by listeners,
+        for at most timeout seconds, then cancel those that are still pending.
+
+        :param timeout: Maximum number of seconds to wait before cancelling,
+        None to wait for all of them. Defaults to cancelling immediately
+        """
+        pending = None if self.__extras is None else self.__extras.pending
+        if pending is None or await self.drain(timeout):
+            return
+        outstanding = list(pending)
+        for future in outstanding:
+            future.cancel()
+        await gather(*outstanding, return_exceptions=True)
+
+    def configure_event(
+        self,
+        event: str,
+        *,
+        coalesce: Optional[str] = _UNCHANGED,
+        interval: Optional[float] = None,
+        replay: Optional[int] = _UNCHANGED
+    ) -> None:
+        """Configure how emit delivers an event to its listeners.
+
+        The supported coalescing policies are:
+         - "latest": only the latest emit made during a loop iteration is delivered
+         - "accumulate": the positional arguments of every emit made during a loop
+           iteration are delivered as a single list argument
+         - "debounce": the latest emit is delivered once no emit happened for interval seconds
+         - "throttle": the latest emit is delivered at most once every interval seconds
+
+        Deliveries are scheduled on the emitter's loop and only apply to emit
+        (and so emit_threadsafe); the other emit methods deliver immediately.
+        Reconfiguring the policy of an event discards its pending delivery.
+
+        When replay is supplied the latest replay emits of the event, with or
+        without listeners, are kept in a ring buffer and replayed to the listeners
+        registered with replay=True. Events not configured for replay are not recorded.
+        Resizing the buffer keeps the latest buffered emits that still fit.
+
+        An option that is not supplied keeps its current configuration.
+
+        :param event: The event to configure
+        :param coalesce: The coalescing policy of the event, None to remove it
+        :param interval: The interval, in seconds, of the "debounce" and "throttle" policies,
+        only supplied along with coalesce
+        :param replay: The number of emits kept for replay, None to stop keeping them
+        """
+        if coalesce is _UNCHANGED:
+            if interval is not None:
+                raise ValueError("The interval is only supplied along with coalesce")
+        else:
+            self.__configure_coalescing(event, coalesce, interval)
+        if replay is not _UNCHANGED:
+            self.__configure_replay(event, replay)
+        self.__forget_matches(event)
+
+    def close(self, wait: bool = True) -> None:
+        """Shut down the emitter's shared "thread" and "process" executor pools.
+
+        Executors supplied when registering listeners are left untouched.
+        Listeners registered with a shared pool keep working, the next
+        call of one of them creates a new pool.
+
+        :param wait: Should close wait for the calls running in the pools to finish
+        """
+        extras = self.__extras
+        if extras is None or extras.executors is None:
+            return
+        executors = extras.executors
+        extras.executors = None
+        for pool in executors.values():
+            pool.shutdown(wait=wait)
+
+    def enable_metrics(self) -> None:
+        """Start collecting metrics, discarding those previously collected.
+
+        While enabled, the number of emits of every event and, for every listener,
+        the number and duration of its calls and the latency until the completion
+        of the awaitables it returns are recorded. The listeners of an event are
+        only wrapped while enabled, disabling metrics restores the listeners
+        themselves so emitting costs nothing extra.
+
+        Emits of events without listeners are not counted and emits of
+        coalesced events are counted when they are delivered.
+        """
+        extras = self.__use_extras()
+        extras.metrics = {}
+        extras.metrics_enabled = True
+        for event, listeners in self.__events.items():
+            listeners.metrics = self.__metrics_for(event)
+            listeners.changed()
+        self.__forget_matches()
+
+    def disable_metrics(self) -> None:
+        """Stop collecting metrics, keeping those collected for stats"""
+        if not self.metrics_enabled():
+            return
+        self.__extras.metrics_enabled = False
+        for listeners in self.__events.values():
+            listeners.metrics = None
+            listeners.changed()
+        self.__forget_matches()
+
+    def metrics_enabled(self) -> bool:
+        """Returns T/F indicating if metrics are being collected
+
+        :return: T/F indicating if metrics are being collected
+        """
+        return self.__extras is not None and self.__extras.metrics_enabled
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retrieve a snapshot of the collected metrics.
+
+        Durations are in nanoseconds and histograms have BUCKETS (pyee2.metrics)
+        power of two buckets, bucket i counting the durations d with
+        2 ** (i - 1) <= d < 2 ** i.
+
+        :return: Dictionary of event name to the number of emits of the event
+        and the call count, error count, duration and latency histograms
+        of its listeners
+        """
+        metrics = None if self.__extras is None else self.__extras.metrics
+        if metrics is None:
+            return {}
+        return {event: stats.snapshot() for event, stats in metrics.items()}
+
+    def __register(
+        self,
+        event: str,
+        listener: Optional[Callable[..., Any]],
+        once: bool,
+        prepend: bool,
+        is_async: Optional[bool],
+        weak: bool,
+        executor: Union[Executor, str, None],
+        priority: int,
+        subscription: bool,
+        replay: bool,
+    ) -> Union[Callable[..., Any], Subscription]:
+        """Utility method implementing the listener registration methods
+
+        :param event: The event to register the listener for
+        :param listener: The listener, None when used as a decorator
+        :param once: Should the listener be removed after its first call
+        :param prepend: Should the listener be called before the other
+        listeners of the same priority
+        :param is_async: The declared kind of the listener
+        :param weak: Should the listener be weakly referenced
+        :param executor: Optional executor to call the listener in
+        :param priority: The priority of the listener
+        :param subscription: Should the Subscription of the listener be returned
+        :param replay: Should the buffered emits of the event be replayed to the listener
+        :return: The listener, or its Subscription, or listener wrapper when used as a decorator
+        """
+        if listener is None:
+            return partial(
+                self.__register,
+                event,
+                once=once,
+                prepend=prepend,
+                is_async=is_async,
+                weak=weak,
+                executor=executor,
+                priority=priority,
+                subscription=subscription,
+                replay=replay,
+            )
+        key, call_listener, lane = self.__prepare_listener(
+            event, listener, is_async, weak, executor
+        )
+        if not (replay and once and self.__replay(event, call_listener, True)):
+            self.__add_listener(
+                event, key, call_listener, lane, priority, prepend, once
+            )
+            if replay and not once:
+                self.__replay(event, call_listener, False)
+        if subscription:
+            return Subscription(self, event, key)
+        return listener
+
     def __add_listener(
         self,
         event: str,
         original_listener: Callable[..., Any],
         maybe_wrapped_listener: Callable[..., Any],
+        lane: int,
+        priority: int = 0,
+        prepend: bool = False,
+        once: bool = False,
     ) -> None:
         """Utility method for registering an listener for an event
 
         :param event: The event the listener will be registered for
         :param original_listener: The listener to be registered
         :param maybe_wrapped_listener: The original or wrapped listener
+        :param lane: The dispatch lane of the listener
+        :param priority: The priority of the listener
+        :param prepend: Should the listener be called before the other
+        listeners of the same priority
+        :param once: Should the listener be removed before it is first called
+        """
+        listeners = self.__events.get(event, None)
+        if listeners is None:
+            listeners = ListenerTable()
+            if self.__events is _NO_EVENTS:
+                self.__events = {}
+            self.__events[event] = listeners
+            token = find_token(event)
+            if token is not None:
+                self.__set_slot(token, listeners)
+            if event == "error":
+                self.__invalidate_dispatchers()
+            extras = self.__extras
+            if extras is not None:
+                if extras.coalescers is not None:
+                    listeners.coalescer = extras.coalescers.get(event)
+                if extras.patterns is not None and extras.patterns.is_pattern(event):
+                    extras.patterns.add(event)
+                if extras.metrics_enabled:
+                    listeners.metrics = self.__metrics_for(event)
+                if extras.replays is not None:
+                    listeners.replay = extras.replays.get(event)
+        listeners.add(
+            original_listener, maybe_wrapped_listener, lane, priority, prepend, once
+        )
+        self.__forget_matches(event)
+
+    def __forget_waiters(self, event: str) -> None:
+        """Utility method for removing the listener shared by the wait_for
+        of an event once nobody is waiting for it anymore
+
+        :param event: The event nobody is waiting for anymore
+        """
+        waiters = self.__extras.waiters.pop(event)
+        self.remove_listener(event, waiters.dispatch)
+
+    def __listeners_removed(self, event: str, empty: bool) -> None:
+        """Utility method for updating the emitter after listeners of an event were removed
+
+        :param event: The event whose listeners were removed
+        :param empty: T/F indicating if the event has no more listeners
+        """
+        if empty:
+            self.__remove_event(event)
+            extras = self.__extras
+            if extras is not None and extras.patterns is not None:
+                extras.patterns.remove(event)
+            if event == "error":
+                self.__invalidate_dispatchers()
+        self.__forget_matches(event)
+
+    def __take_once(self, event: str, listeners: ListenerTable) -> ListenerTable:
+        """Utility method for removing the one time listeners to be called
+        for an emit, in a single pass, before calling them
+
+        :param event: The event being emitted
+        :param listeners: The listeners to be called for the event
+        :return: The snapshot of the listeners to be called, one time listeners included
+        """
+        snapshot = listeners.snapshot()
+        if listeners.merged is None:
+            self.__listeners_removed(event, listeners.remove_once())
+            return snapshot
+        for source in listeners.merged:
+            table = self.__events.get(source)
+            if table is not None and table.once:
+                self.__listeners_removed(source, table.remove_once())
+        return snapshot
+
+    def __record_unheard(
+        self, event: str, args: Sequence[Any], kwargs: Dict[str, Any]
+    ) -> None:
+        """Utility method for recording an emit of an event without listeners
+        if the event is configured for replay
+
+        :param event: The event emitted
+        :param args: Arguments of the emit
+        :param kwargs: Keyword arguments of the emit
+        """
+        buffer = self.__extras.replays.get(event)
+        if buffer is not None:
+            buffer.record(*args, **kwargs)
+
+    def __replay(self, event: str, listener: Callable[..., Any], once: bool) -> bool:
+        """Utility method for calling a listener registered with replay=True
+        with the buffered emits of its event, as emit would
+
+        :param event: The event the listener is registered for
+        :param listener: The (possibly wrapped) listener
+        :param once: Should only the latest buffered emit be replayed
+        :return: T/F indicating if any emit was replayed
+        """
+        extras = self.__extras
+        buffer = None
+        if extras is not None and extras.replays is not None:
+            buffer = extras.replays.get(event)
+        if not buffer:
+            return False
+        emits = (buffer.emits[-1],) if once else tuple(buffer.emits)
+        listening_for_exceptions = "error" in self.__events
+        handle_awaitable = (
+            self.__handle_awaitable
+            if listening_for_exceptions
+            else self.__ne_handle_awaitable
+        )
+        for args, kwargs in emits:
+            try:
+                result = listener(*args, **kwargs)
+                if isawaitable(result):
+                    handle_awaitable(result)
+            except Exception as e:
+                if listening_for_exceptions:
+                    self.emit("error", e)
+        return True
+
+    def __remove_event(self, event: str) -> None:
+        """Utility method for discarding the listener table of an event,
+        going back to the shared empty event table once there are no more events
+
+        :param event: The event to discard the listener table of
+        """
+        del self.__events[event]
+        if not self.__events:
+            self.__events = _NO_EVENTS
+            self.__slots = _NO_SLOTS
+            return
+        token = find_token(event)
+        if token is not None:
+            self.__set_slot(token, None)
+
+    def __fill_slot(self, token: EventToken) -> Optional[ListenerTable]:
+        """Utility method for retrieving the listeners of an event by name,
+        when the slot of its token is empty, filling the slot if the event
+        has listeners, e.g. listeners registered before the token was created
+
+        :param token: The token of the event
+        :return: The listeners registered for the event if there are any
+        """
+        listeners = self.__events.get(token)
+        if listeners is not None:
+            self.__set_slot(token, listeners)
+        return listeners
+
+    def __set_slot(self, token: EventToken, listeners: Optional[ListenerTable]) -> None:
+        """Utility method for setting the slot of a token, growing the
+        slots of the emitter if need be
+
+        :param token: The token of the event
+        :param listeners: The listeners of the event or None to empty the slot
         """
-        ldict = self.__events.get(event, None)
-        if ldict is None:
-            ldict = OrderedDict()
-            self.__events[event] = ldict
-        ldict[original_listener] = maybe_wrapped_listener
+        slots = self.__slots
+        slot = token.slot
+        if slot >= len(slots):
+            if listeners is None:
+                return
+            # a new list, the shared empty slots are never mutated
+            slots = self.__slots = slots + [None] * (slot + 1 - len(slots))
+        slots[slot] = listeners
+
+    def __prepare_listener(
+        self,
+        event: str,
+        listener: Callable[..., Any],
+        is_async: Optional[bool],
+        weak: bool,
+        executor: Union[Executor, str, None],
+    ) -> Tuple[Any, Callable[..., Any], int]:
+        """Utility method for determining how a listener is registered: the key it is
+        registered under, the function called when the event is emitted and its dispatch lane.
+
+        Weakly referenced listeners are keyed by a WeakListener that removes them from the
+        event once they are garbage collected. Since a dead listener returns None,
+        weakly referenced listeners can not be in the async lane.
+        Listeners run in an executor always return the future of the call, the shared
+        pools are retrieved on every call so that they survive close.
+
+        :param event: The event the listener will be registered for
+        :param listener: The listener to be registered
+        :param is_async: Optional declaration of the listener's kind
+        :param weak: Should the listener be weakly referenced
+        :param executor: Optional executor to call the listener in
+        :return: The key, called function and dispatch lane of the listener
+        """
+        lane = classify(listener, is_async)
+        if executor is not None and lane == LANE_ASYNC:
+            raise ValueError("Coroutine listeners can not be run in an executor")
+        key: Any = listener
+        call_listener = listener
+        if weak:
+            key = WeakListener(listener, partial(self.remove_listener, event))
+            call_listener = weak_caller(key)
+        if executor is not None:
+            pool: Union[Executor, Callable[[], Executor]]
+            if isinstance(executor, Executor):
+                pool = executor
+            elif executor in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+                pool = partial(self.__resolve_executor, executor)
+            else:
+                raise ValueError("Unknown executor %r" % executor)
+            call_listener = executor_caller(self._loop, pool, key)
+            lane = LANE_ASYNC
+        if weak and lane == LANE_ASYNC:
+            lane = LANE_UNKNOWN
+        return key, call_listener, lane
+
+    def __resolve_executor(self, executor: Union[Executor, str]) -> Executor:
+        """Utility method for retrieving the executor to run a listener in,
+        creating the emitter's shared pool if need be
+
+        :param executor: An Executor or the name of one of the emitter's shared pools
+        :return: The executor
+        """
+        if isinstance(executor, Executor):
+            return executor
+        extras = self.__use_extras()
+        if extras.executors is None:
+            extras.executors = {}
+        pool = extras.executors.get(executor)
+        if pool is None:
+            if executor == EXECUTOR_THREAD:
+                pool = ThreadPoolExecutor()
+            elif executor == EXECUTOR_PROCESS:
+                pool = ProcessPoolExecutor()
+            else:
+                raise ValueError("Unknown executor %r" % executor)
+            extras.executors[executor] = pool
+        return pool
+
+    def __use_extras(self) -> EmitterExtras:
+        """Utility method for retrieving the extras of the emitter,
+        allocating them the first time a feature needing them is used
+
+        :return: The extras of the emitter
+        """
+        extras = self.__extras
+        if extras is None:
+            with _setup_lock:
+                extras = self.__extras
+                if extras is None:
+                    extras = self.__extras = EmitterExtras(OVERFLOW_BLOCK)
+        return extras
+
+    def __listeners_for(self, event: str) -> Optional[ListenerTable]:
+        """Utility method for retrieving the listeners to be called when an event
+        is emitted, including those registered for matching patterns in wildcard mode.
+
+        One time listeners are removed, the returned listeners are then
+        a snapshot only valid for a single emit.
+
+        :param event: The event to retrieve the listeners for
+        :return: The listeners for the event if there are any
+        """
+        if type(event) is EventToken:
+            try:
+                listeners = self.__slots[event.slot]
+            except IndexError:
+                listeners = None
+            if listeners is None:
+                listeners = self.__fill_slot(event)
+        else:
+            listeners = self.__events.get(event)
+        extras = self.__extras
+        if extras is not None and extras.patterns is not None:
+            listeners = self.__match_listeners(event, listeners)
+        if listeners is not None and listeners.once:
+            return self.__take_once(event, listeners)
+        return listeners
+
+    def __match_listeners(
+        self, event: str, listeners: Optional[ListenerTable]
+    ) -> Optional[ListenerTable]:
+        """Utility method for combining the listeners registered for an event
+        with those registered for the patterns matching it in wildcard mode.
+
+        The combined listeners are cached per event name until the listeners
+        of the event or any pattern change. At most MATCH_CACHE_SIZE event names
+        are cached, the oldest cached event name is discarded to make room.
+
+        :param event: The event being emitted
+        :param listeners: The listeners registered for the event itself
+        :return: The listeners to be called for the event if there are any
+        """
+        extras = self.__extras
+        try:
+            matched = extras.matched[event]
+        except KeyError:
+            patterns = [
+                pattern for pattern in extras.patterns.match(event) if pattern != event
+            ]
+            tables = [self.__events[pattern] for pattern in patterns]
+            if not tables:
+                matched = None
+            elif listeners is None:
+                matched = ListenerTable.merge(patterns, tables)
+            else:
+                matched = ListenerTable.merge([event] + patterns, [listeners] + tables)
+            if matched is not None:
+                if extras.coalescers is not None:
+                    matched.coalescer = extras.coalescers.get(event)
+                if extras.metrics_enabled:
+                    matched.metrics = self.__metrics_for(event)
+                if extras.replays is not None:
+                    matched.replay = extras.replays.get(event)
+                if matched.metrics is not None or matched.replay is not None:
+                    matched.changed()
+            cache = extras.matched
+            if len(cache) >= MATCH_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[event] = matched
+        return listeners if matched is None else matched
+
+    def __metrics_for(self, event: str) -> EventMetrics:
+        """Utility method for retrieving the metrics of an event, creating them if need be
+
+        :param event: The event
+        :return: The metrics of the event
+        """
+        collected = self.__extras.metrics
+        metrics = collected.get(event)
+        if metrics is None:
+            metrics = collected[event] = EventMetrics()
+        return metrics
+
+    def __forget_matches(self, event: Optional[str] = None) -> None:
+        """Utility method for discarding the cached combined listeners
+        that are affected by a change to the listeners of an event
+
+        :param event: The event whose listeners changed, None for every event
+        """
+        extras = self.__extras
+        if extras is None or extras.patterns is None:
+            return
+        if event is None or extras.patterns.is_pattern(event):
+            for matched in extras.matched.values():
+                if matched is not None:
+                    matched.invalidate()
+            extras.matched.clear()
+            return
+        matched = extras.matched.pop(event, None)
+        if matched is not None:
+            matched.invalidate()
+
+    def __configure_coalescing(
+        self, event: str, coalesce: Optional[str], interval: Optional[float]
+    ) -> None:
+        """Utility method for replacing the coalescing policy of an event
+
+        :param event: The event to configure
+        :param coalesce: The coalescing policy of the event, None to remove it
+        :param interval: The interval, in seconds, of the "debounce" and "throttle" policies
+        """
+        coalescer = None
+        if coalesce is not None:
+            coalescer = create_coalescer(
+                coalesce,
+                self._loop,
+                partial(self.__deliver_coalesced, event),
+                interval,
+            )
+        extras = self.__use_extras()
+        if extras.coalescers is None:
+            extras.coalescers = {}
+        previous = extras.coalescers.pop(event, None)
+        if previous is not None:
+            previous.cancel()
+        if coalescer is not None:
+            extras.coalescers[event] = coalescer
+        listeners = self.__events.get(event)
+        if listeners is not None:
+            listeners.coalescer = coalescer
+
+    def __configure_replay(self, event: str, replay: Optional[int]) -> None:
+        """Utility method for replacing the replay buffer of an event
+
+        :param event: The event to configure
+        :param replay: The number of emits kept for replay, None to stop keeping them
+        """
+        extras = self.__extras
+        if replay is None and (extras is None or extras.replays is None):
+            return
+        extras = self.__use_extras()
+        if extras.replays is None:
+            extras.replays = {}
+        previous_buffer = extras.replays.pop(event, None)
+        buffer = None
+        if replay is not None:
+            buffer = (
+                ReplayBuffer(replay)
+                if previous_buffer is None
+                else previous_buffer.resize(replay)
+            )
+            extras.replays[event] = buffer
+        listeners = self.__events.get(event)
+        if listeners is not None and listeners.replay is not buffer:
+            listeners.replay = buffer
+            listeners.changed()
+
+    def __deliver_coalesced(
+        self, event: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        """Utility method used by the coalescing policy of an event to call
+        the listeners of the event
+
+        :param event: The event to call listens for
+        :param args: Arguments to pass to the listeners for the event
+        :param kwargs: Keyword arguments to pass to the listeners for the event
+        """
+        listeners = self.__listeners_for(event)
+        if listeners is not None:
+            self.__dispatcher_for(listeners)(args, kwargs)
+
+    def __drain_threadsafe(self) -> None:
+        """Utility method for emitting, on the emitter's loop, the events queued
+        by emit_threadsafe.
+
+        Only the events queued when the drain starts are emitted, events queued while
+        draining schedule another drain.
+        """
+        extras = self.__extras
+        with extras.threadsafe_lock:
+            extras.threadsafe_scheduled = False
+        queue = extras.threadsafe_queue
+        emit = self.emit
+        for _ in range(len(queue)):
+            event, args, kwargs = queue.popleft()
+            emit(event, *args, **kwargs)
+
+    def __emit_many(
+        self,
+        event: str,
+        payloads: Iterable[Tuple[Sequence[Any], Dict[str, Any]]],
+        raising: bool,
+    ) -> bool:
+        """Utility method for emitting an event once per payload
+
+        The dispatch function of the event is only re-resolved when the cached one
+        was discarded, i.e. when the listeners of the event changed mid batch,
+        or after an emit calling one time listeners.
+
+        :param event: The event to call listens for
+        :param payloads: The (args, kwargs) pairs to pass to the listeners
+        :param raising: Should the error semantics of raising_emit be used
+        :return: T/F indicating if the event had listeners registered
+        """
+        listeners = self.__listeners_for(event)
+        if listeners is None:
+            extras = self.__extras
+            if extras is not None and extras.replays is not None:
+                for args, kwargs in payloads:
+                    self.__record_unheard(event, args, kwargs)
+            return False
+        if raising:
+            dispatcher_for = self.__raising_dispatcher_for
+            cached_dispatcher = attrgetter("raising_dispatcher")
+        else:
+            dispatcher_for = self.__dispatcher_for
+            cached_dispatcher = attrgetter("dispatcher")
+        dispatch: Optional[Callable[..., None]] = dispatcher_for(listeners)
+        for args, kwargs in payloads:
+            if dispatch is None or cached_dispatcher(listeners) is not dispatch:
+                listeners = self.__listeners_for(event)
+                if listeners is None:
+                    break
+                dispatch = dispatcher_for(listeners)
+            dispatch(args, kwargs)
+            if not listeners:
+                # a snapshot, taken when removing one time listeners, is only
+                # valid for a single emit
+                dispatch = None
+        return True
+
+    async def __await_limited(
+        self,
+        pending: List[Tuple[int, Awaitable[Any]]],
+        results: List[Any],
+        failed: List[int],
+        max_concurrency: int,
+    ) -> None:
+        """Utility method for awaiting the awaitables returned by listeners using
+        at most max_concurrency tasks
+
+        :param pending: The (result index, awaitable) pairs to be awaited
+        :param results: The list the result of each awaitable is stored in
+        :param failed: The list the result index of each raised exception is added to
+        :param max_concurrency: The maximum number of awaitables awaited at once
+        """
+        remaining = iter(pending)
+
+        async def worker() -> None:
+            for idx, aw in remaining:
+                try:
+                    results[idx] = await aw
+                except Exception as e:
+                    failed.append(idx)
+                    results[idx] = e
+
+        await gather(
+            *[
+                self.__ensure_tracked(worker())
+                for _ in range(min(max(max_concurrency, 1), len(pending)))
+            ]
+        )
+
+    def __dispatcher_for(self, listeners: ListenerTable) -> Callable[..., None]:
+        """Utility method for retrieving, generating and caching if need be,
+        the dispatch function for the listeners of an event
+
+        :param listeners: The listeners of the event
+        :return: The dispatch function
+        """
+        dispatch = listeners.dispatcher
+        if dispatch is not None:
+            return dispatch
+        if "error" in self.__events:
+            dispatch = compile_dispatcher(listeners, self.__handle_awaitable, self.emit)
+        else:
+            dispatch = compile_dispatcher(listeners, self.__ne_handle_awaitable)
+        listeners.dispatcher = dispatch
+        return dispatch
+
+    def __raising_dispatcher_for(self, listeners: ListenerTable) -> Callable[..., None]:
+        """Utility method for retrieving, generating and caching if need be,
+        the dispatch function with raising_emit error semantics for the listeners of an event
+
+        :param listeners: The listeners of the event
+        :return: The dispatch function
+        """
+        dispatch = listeners.raising_dispatcher
+        if dispatch is None:
+            dispatch = compile_dispatcher(
+                listeners, self.__handle_awaitable, raising=True
+            )
+            listeners.raising_dispatcher = dispatch
+        return dispatch
+
+    def __invalidate_dispatchers(self) -> None:
+        """Utility method for discarding the cached dispatch functions of
+        every event, used when the presence of "error" listeners changes
+        """
+        for listeners in self.__events.values():
+            listeners.dispatcher = None
+        if self.__extras is not None:
+            for matched in self.__extras.matched.values():
+                if matched is not None:
+                    matched.dispatcher = None
 
     def __handle_awaitable(self, awaitable: Awaitable[Any]) -> None:
         """Utility method for handling an awaitable return value of an
@@ -194,7 +1553,13 @@ class EventEmitterS:
 
         :param awaitable: An awaitable returned by a listener
         """
-        future = ensure_future(awaitable, loop=self._loop)
+        extras = self.__extras
+        if extras is not None and extras.pending is not None:
+            future = self.__track(awaitable)
+        elif self.__eager:
+            future = eager_future(awaitable, self._loop)
+        else:
+            future = ensure_future(awaitable, loop=self._loop)
         future.add_done_callback(self.__maybe_emit_error)
 
     def __ne_handle_awaitable(self, awaitable: Awaitable[Any]) -> None:
@@ -203,7 +1568,78 @@ class EventEmitterS:
 
         :param awaitable: An awaitable returned by a listener
         """
-        ensure_future(awaitable, loop=self._loop)
+        extras = self.__extras
+        if extras is not None and extras.pending is not None:
+            self.__track(awaitable)
+        elif self.__eager:
+            eager_future(awaitable, self._loop)
+        else:
+            ensure_future(awaitable, loop=self._loop)
+
+    def __track(self, awaitable: Awaitable[Any]) -> Future:
+        """Utility method for scheduling and keeping track of an awaitable returned
+        by a listener in tracked mode, applying the overflow policy
+        if the high water mark was reached
+
+        :param awaitable: An awaitable returned by a listener
+        :return: The future created for the awaitable
+        """
+        extras = self.__extras
+        if extras.overflow != OVERFLOW_BLOCK and self.__over_high_water_mark():
+            if iscoroutine(awaitable):
+                awaitable.close()
+            elif isfuture(awaitable):
+                awaitable.cancel()
+            if extras.overflow == OVERFLOW_RAISE:
+                raise RuntimeError(
+                    "The high water mark of pending listeners was reached"
+                )
+            future = self._loop.create_future()
+            future.cancel()
+            return future
+        if self.__eager:
+            future = eager_future(awaitable, self._loop)
+        else:
+            future = ensure_future(awaitable, loop=self._loop)
+        if not future.done():
+            pending = extras.pending
+            pending.add(future)
+            future.add_done_callback(pending.discard)
+        return future
+
+    def __ensure_tracked(self, awaitable: Awaitable[Any]) -> Future:
+        """Utility method for scheduling an awaitable using asyncio.ensure_future
+        and, in tracked mode, keeping track of it until it is done
+
+        :param awaitable: The awaitable to be scheduled
+        :return: The future created for the awaitable
+        """
+        future = ensure_future(awaitable, loop=self._loop)
+        pending = None if self.__extras is None else self.__extras.pending
+        if pending is not None:
+            pending.add(future)
+            future.add_done_callback(pending.discard)
+        return future
+
+    def __over_high_water_mark(self) -> bool:
+        """Utility method for checking if the high water mark of pending futures
+        was reached in tracked mode
+
+        :return: T/F indicating if the high water mark was reached
+        """
+        extras = self.__extras
+        return (
+            extras is not None
+            and extras.pending is not None
+            and extras.high_water_mark is not None
+            and len(extras.pending) >= extras.high_water_mark
+        )
+
+    async def __wait_below_high_water_mark(self) -> None:
+        """Utility method for waiting until the number of pending futures
+        is below the high water mark"""
+        while self.__over_high_water_mark():
+            await wait(list(self.__extras.pending), return_when=FIRST_COMPLETED)
 
     def __maybe_emit_error(self, the_future: Future) -> None:
         """Utility method for emitting the exception, if one was raised,
@@ -211,6 +1647,8 @@ class EventEmitterS:
 
         :param the_future: The future created from the awaitable returned by an event listener
         """
+        if the_future.cancelled():
+            return
         raised_exception = the_future.exception()
         if raised_exception:
             self.emit("error", raised_exception)
@@ -0,0 +1,63 @@
+from asyncio import Future
+from concurrent.futures import Executor
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .coalesce import Coalescer
+    from .listeners import ListenerTable
+    from .metrics import EventMetrics
+    from .patterns import PatternTrie
+    from .replay import ReplayBuffer
+    from .waiters import Waiters
+
+__all__ = ["EmitterExtras"]
+
+
+class EmitterExtras:
+    """The state of an emitter used by its less common features: tracked mode,
+    wildcard mode, emit_threadsafe, executors, coalescing, metrics, wait_for and replay.
+
+    An emitter only allocates its extras the first time one of these features
+    is used, emitters only registering listeners and emitting events
+    do not pay for the state of the features they do not use.
+    """
+
+    __slots__ = [
+        "pending",
+        "high_water_mark",
+        "overflow",
+        "patterns",
+        "matched",
+        "threadsafe_queue",
+        "threadsafe_lock",
+        "threadsafe_scheduled",
+        "executors",
+        "coalescers",
+        "metrics",
+        "metrics_enabled",
+        "waiters",
+        "replays",
+    ]
+
+    def __init__(self, overflow: str) -> None:
+        """Initialize new EmitterExtras, every feature unused
+
+        :param overflow: The overflow policy of tracked mode
+        """
+        self.pending: Optional[Set[Future]] = None
+        self.high_water_mark: Optional[int] = None
+        self.overflow: str = overflow
+        self.patterns: Optional["PatternTrie"] = None
+        self.matched: Dict[str, Optional["ListenerTable"]] = {}
+        self.threadsafe_queue: Optional[
+            Deque[Tuple[str, Tuple[Any, ...], Dict[str, Any]]]
+        ] = None
+        self.threadsafe_lock: Optional[Lock] = None
+        self.threadsafe_scheduled: bool = False
+        self.executors: Optional[Dict[str, Executor]] = None
+        self.coalescers: Optional[Dict[str, "Coalescer"]] = None
+        self.metrics: Optional[Dict[str, "EventMetrics"]] = None
+        self.metrics_enabled: bool = False
+        self.waiters: Optional[Dict[str, "Waiters"]] = None
+        self.replays: Optional[Dict[str, "ReplayBuffer"]] = None
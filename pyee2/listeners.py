@@ -0,0 +1,551 @@
+from asyncio import AbstractEventLoop, Future
+from concurrent.futures import Executor
+from functools import partial
+from inspect import isclass, iscoroutinefunction, isfunction, ismethod
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
+from weakref import WeakMethod, ref
+
+from .coalesce import Coalescer
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .metrics import EventMetrics
+    from .replay import ReplayBuffer
+
+__all__ = [
+    "LANE_ASYNC",
+    "LANE_SYNC",
+    "LANE_UNKNOWN",
+    "ListenerTable",
+    "classify",
+    "WeakListener",
+    "executor_caller",
+    "weak_caller",
+]
+
+#: The listener never returns an awaitable
+LANE_SYNC = 0
+#: The listener always returns an awaitable
+LANE_ASYNC = 1
+#: The listener may or may not return an awaitable
+LANE_UNKNOWN = 2
+
+# (original listener, maybe wrapped listener, lane, priority, once)
+_Entry = Tuple[Any, Callable[..., Any], int, int, bool]
+# (maybe wrapped listener, lane)
+_Call = Tuple[Callable[..., Any], int]
+
+
+def classify(listener: Callable[..., Any], is_async: Optional[bool] = None) -> int:
+    """Determine the dispatch lane of a listener, which decides how the
+    return value of its calls is handled.
+
+    Coroutine functions and objects whose __call__ is a coroutine function are
+    placed in the async lane, their return value is always scheduled. Since regular
+    functions are allowed to return awaitables, they are only placed in the sync lane,
+    their return value ignored, when explicitly declared to be synchronous;
+    otherwise they are placed in the unknown lane which checks the return value
+    of every call.
+
+    :param listener: The listener to be classified
+    :param is_async: Optional explicit declaration of the listener's kind
+    :return: The lane the listener belongs in
+    """
+    if is_async is not None:
+        return LANE_ASYNC if is_async else LANE_SYNC
+    func = listener
+    while isinstance(func, partial):
+        func = func.func
+    if iscoroutinefunction(func):
+        return LANE_ASYNC
+    if not (isfunction(func) or ismethod(func) or isclass(func)):
+        if iscoroutinefunction(getattr(func, "__call__", None)):
+            return LANE_ASYNC
+    return LANE_UNKNOWN
+
+
+class WeakListener:
+    """A weak reference to a listener, used as the listener's key in a ListenerTable.
+
+    Bound methods are referenced using a WeakMethod so that the reference does
+    not die with the bound method object. While the listener is alive,
+    a WeakListener is equal to any other WeakListener for an equal listener,
+    which allows looking up the entry of a weakly referenced listener
+    using the listener itself.
+    """
+
+    __slots__ = ["ref", "hash", "__weakref__"]
+
+    def __init__(
+        self,
+        listener: Callable[..., Any],
+        callback: Optional[Callable[["WeakListener"], Any]] = None,
+    ) -> None:
+        """Initialize a new WeakListener
+
+        :param listener: The listener to be weakly referenced
+        :param callback: Optional callback called with this WeakListener
+        once the listener is garbage collected
+        """
+        on_collected: Optional[Callable[[Any], None]] = None
+        if callback is not None:
+            notify = callback
+
+            def collected(_: Any) -> None:
+                notify(self)
+
+            on_collected = collected
+        self.ref: "ref[Callable[..., Any]]"
+        if ismethod(listener):
+            self.ref = WeakMethod(listener, on_collected)
+        else:
+            self.ref = ref(listener, on_collected)
+        self.hash: int = hash(listener)
+
+    def __call__(self) -> Optional[Callable[..., Any]]:
+        """Retrieve the listener if it is still alive
+
+        :return: The listener or None
+        """
+        return self.ref()
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, WeakListener):
+            return NotImplemented
+        listener = self.ref()
+        return listener is not None and listener == other.ref()
+
+
+def weak_caller(key: WeakListener) -> Callable[..., Any]:
+    """Create a function calling the weakly referenced listener, if it is still alive
+
+    :param key: The weakly referenced listener
+    :return: The function calling the listener
+    """
+
+    def call_weak_listener(*args: Any, **kwargs: Any) -> Any:
+        listener = key()
+        if listener is None:
+            return None
+        return listener(*args, **kwargs)
+
+    return call_weak_listener
+
+
+def executor_caller(
+    loop: AbstractEventLoop,
+    executor: Union[Executor, Callable[[], Executor]],
+    listener: Union[Callable[..., Any], WeakListener],
+) -> Callable[..., Optional[Future]]:
+    """Create a function calling the listener in an executor using loop.run_in_executor
+
+    If the listener is weakly referenced, it is resolved when the function is called
+    and nothing is submitted to the executor if it was garbage collected.
+
+    :param loop: The loop whose run_in_executor is used
+    :param executor: The executor to call the listener in, or a function
+    retrieving it every time the listener is called
+    :param listener: The listener or weakly referenced listener
+    :return: The function calling the listener, returning the future of the call
+    """
+    weak_listener = listener if isinstance(listener, WeakListener) else None
+    fixed_pool: Optional[Executor] = None
+    get_executor: Optional[Callable[[], Executor]] = None
+    if isinstance(executor, Executor):
+        fixed_pool = executor
+    else:
+        get_executor = executor
+
+    def call_in_executor(*args: Any, **kwargs: Any) -> Optional[Future]:
+        target = listener if weak_listener is None else weak_listener()
+        if target is None:
+            return None
+        pool = fixed_pool if get_executor is None else get_executor()
+        if kwargs:
+            return loop.run_in_executor(pool, partial(target, *args, **kwargs))
+        return loop.run_in_executor(pool, target, *args)
+
+    return call_in_executor
+
+
+class ListenerTable:
+    """The listeners registered for a single event.
+
+    Keeps the registered listeners keyed by the original listener alongside
+    an immutable tuple snapshot (calls) of the (listener, lane) pairs to be called
+    when the event is emitted, in call order whatever the lanes of the listeners.
+
+    Since most events only ever have a single listener, the first listener is
+    kept inline in the key and value slots and the listeners dict is only
+    created when a second listener is registered.
+
+    The value stored for a listener is the maybe wrapped listener itself
+    when its lane is the one classify determines for it and it is not a one
+    time listener, the common case, otherwise a (listener, lane, once) tuple.
+    The priorities of the listeners are only kept, in the priorities dict,
+    once a listener is registered with a non zero priority.
+
+    Listeners are called in priority order, highest first, and listeners
+    with the same priority in registration order, except prepended listeners
+    which are called before every other listener of the same priority.
+    The listeners dict is kept in that order for the same priority, prepending
+    a listener moves it to the front of the dict, and the calls are sorted
+    by priority when rebuilt, so they are never sorted when emitting.
+
+    Adding or removing a listener only discards the calls (sets them to None),
+    they are rebuilt by resolve when the event is next emitted, so a burst
+    of changes, e.g. disposing a ListenerGroup, rebuilds them at most once.
+    Emitting does not need to copy the listeners before iterating them and,
+    since a new tuple is created on every rebuild, listeners added or removed
+    while an emit is in progress do not affect that emit.
+
+    The table also caches the dispatch functions generated for the current
+    listeners, used by emit in compiled dispatch mode and by the emit_many methods.
+
+    The coalescer is set when the event was configured with a coalescing policy.
+
+    The hooks are called with the arguments of every emit before the listeners,
+    they are not listeners so their return value is ignored and not part of
+    the results of emit_async.
+
+    The replay buffer is set when the event is configured for replay,
+    its record is then the first hook.
+
+    One time listeners are flagged values, once counts them. The emitter removes
+    them all at once, using snapshot and remove_once, before calling the listeners.
+
+    The metrics are set while metrics are collected for the event, the metrics'
+    record_emit is then a hook and the calls call timed wrappers of the listeners.
+
+    Weakly referenced listeners are keyed by their WeakListener
+    and can be removed using either the WeakListener or the listener itself.
+    """
+
+    __slots__ = [
+        "key",
+        "value",
+        "listeners",
+        "priorities",
+        "calls",
+        "hooks",
+        "dispatcher",
+        "raising_dispatcher",
+        "has_weak",
+        "coalescer",
+        "metrics",
+        "merged",
+        "once",
+        "replay",
+    ]
+
+    def __init__(self) -> None:
+        """Initialize a new, empty, ListenerTable"""
+        self.key: Any = None
+        self.value: Any = None
+        self.listeners: Optional[Dict[Any, Any]] = None
+        self.priorities: Optional[Dict[Any, int]] = None
+        self.calls: Optional[Tuple[_Call, ...]] = ()
+        self.hooks: Tuple[Callable[..., None], ...] = ()
+        self.dispatcher: Optional[Callable[..., None]] = None
+        self.raising_dispatcher: Optional[Callable[..., None]] = None
+        self.has_weak: bool = False
+        self.coalescer: Optional[Coalescer] = None
+        self.metrics: Optional["EventMetrics"] = None
+        self.merged: Optional[List[str]] = None
+        self.once: int = 0
+        self.replay: Optional["ReplayBuffer"] = None
+
+    def add(
+        self,
+        original_listener: Callable[..., Any],
+        maybe_wrapped_listener: Callable[..., Any],
+        lane: int = LANE_UNKNOWN,
+        priority: int = 0,
+        prepend: bool = False,
+        once: bool = False,
+    ) -> None:
+        """Register a listener.
+
+        Registering an already registered listener again replaces it,
+        keeping its place in the call order unless it is prepended
+        or its priority changes.
+
+        :param original_listener: The listener, or weak reference to it, to be registered
+        :param maybe_wrapped_listener: The original or wrapped listener
+        :param lane: The dispatch lane of the listener
+        :param priority: The priority of the listener, higher priorities are called first
+        :param prepend: Should the listener be called before the other listeners of the same priority
+        :param once: Should the listener be removed before it is called
+        """
+        if isinstance(original_listener, WeakListener):
+            self.has_weak = True
+        value = _encode(maybe_wrapped_listener, lane, once)
+        existing = self._get(original_listener)
+        if existing is not None:
+            self.once -= _decode(existing)[2]
+        self.once += once
+        self.changed()
+        priorities = self.priorities
+        previous = 0 if priorities is None else priorities.get(original_listener, 0)
+        if priority != previous:
+            if priorities is None:
+                priorities = self.priorities = {}
+            if priority:
+                priorities[original_listener] = priority
+            else:
+                del priorities[original_listener]
+        if self.listeners is None:
+            if self.value is None or existing is not None:
+                self.key = original_listener
+                self.value = value
+                return
+            self.listeners = {self.key: self.value}
+            self.key = self.value = None
+        listeners = self.listeners
+        if prepend:
+            listeners.pop(original_listener, None)
+            reordered = {original_listener: value}
+            reordered.update(listeners)
+            self.listeners = reordered
+            return
+        if existing is not None and priority != previous:
+            # re-ranked listeners are called after the others of their new priority
+            del listeners[original_listener]
+        listeners[original_listener] = value
+
+    def remove(self, original_listener: Callable[..., Any]) -> bool:
+        """Remove a registered listener
+
+        :param original_listener: The listener, or weak reference to it, to be removed
+        :return: T/F indicating if the table is now empty
+        """
+        key = original_listener
+        removed = self._pop(key)
+        if removed is None and self.has_weak and not isinstance(key, WeakListener):
+            try:
+                key = WeakListener(original_listener)
+            except TypeError:
+                pass
+            else:
+                removed = self._pop(key)
+        if removed is not None:
+            self.once -= _decode(removed)[2]
+            if self.priorities is not None:
+                self.priorities.pop(key, None)
+            self.changed()
+        return len(self) == 0
+
+    def remove_once(self) -> bool:
+        """Remove every one time listener
+
+        :return: T/F indicating if the table is now empty
+        """
+        if not self.once:
+            return len(self) == 0
+        if self.listeners is None:
+            if self.priorities is not None:
+                self.priorities.pop(self.key, None)
+            self.key = self.value = None
+        else:
+            listeners = self.listeners
+            for key, value in tuple(listeners.items()):
+                if _decode(value)[2]:
+                    del listeners[key]
+                    if self.priorities is not None:
+                        self.priorities.pop(key, None)
+        self.once = 0
+        self.changed()
+        return len(self) == 0
+
+    def snapshot(self) -> "ListenerTable":
+        """Create a table with the current calls, and no registered listeners,
+        used for calling the listeners of an emit after removing its one time listeners
+
+        :return: The snapshot of the table
+        """
+        snapshot = ListenerTable()
+        snapshot.calls = self.resolve()
+        snapshot.hooks = self.hooks
+        return snapshot
+
+    @classmethod
+    def merge(
+        cls, events: Sequence[str], tables: Iterable["ListenerTable"]
+    ) -> "ListenerTable":
+        """Create a table containing the listeners of the supplied tables,
+        used for dispatching an event to the listeners of every matching pattern.
+
+        The listeners are called in priority order and, for the same priority,
+        in the order of their tables.
+
+        :param events: The events of the tables, kept as merged
+        :param tables: The tables to be merged, in dispatch order
+        :return: The merged table
+        """
+        merged = cls()
+        merged.merged = list(events)
+        listeners: Dict[Any, Any] = {}
+        priorities: Dict[Any, int] = {}
+        once = 0
+        for idx, table in enumerate(tables):
+            for original_listener, listener, lane, priority, is_once in table:
+                key = (idx, original_listener)
+                listeners[key] = _encode(listener, lane, is_once)
+                if priority:
+                    priorities[key] = priority
+                once += is_once
+        merged.listeners = listeners
+        merged.priorities = priorities or None
+        merged.once = once
+        merged.calls = None
+        return merged
+
+    def originals(self) -> List[Callable[..., Any]]:
+        """Retrieve the list of registered (original) listeners
+
+        :return: List of the registered listeners, in call order,
+        only those still alive if weakly referenced
+        """
+        if not self.has_weak:
+            return [entry[0] for entry in self]
+        originals = []
+        for entry in self:
+            original_listener = entry[0]
+            if isinstance(original_listener, WeakListener):
+                original_listener = original_listener()
+                if original_listener is None:
+                    continue
+            originals.append(original_listener)
+        return originals
+
+    def _get(self, original_listener: Any) -> Any:
+        """Retrieve the stored value of a registered listener
+
+        :param original_listener: The listener, or weak reference to it
+        :return: The value of the listener if it is registered
+        """
+        if self.listeners is not None:
+            return self.listeners.get(original_listener)
+        if self.value is not None:
+            key = self.key
+            if key is original_listener or key == original_listener:
+                return self.value
+        return None
+
+    def _pop(self, original_listener: Any) -> Any:
+        """Remove the stored value of a registered listener
+
+        :param original_listener: The listener, or weak reference to it
+        :return: The removed value if the listener was registered
+        """
+        if self.listeners is not None:
+            return self.listeners.pop(original_listener, None)
+        value = self._get(original_listener)
+        if value is not None:
+            self.key = self.value = None
+        return value
+
+    def changed(self) -> None:
+        """Discard the calls and cached dispatch functions, the calls
+        are rebuilt by resolve when they are next needed"""
+        self.calls = None
+        self.dispatcher = None
+        self.raising_dispatcher = None
+
+    def resolve(self) -> Tuple[_Call, ...]:
+        """Retrieve the calls, rebuilding them and the hooks if they were discarded
+
+        :return: The (listener, lane) pairs to be called, in call order
+        """
+        calls = self.calls
+        if calls is None:
+            calls = self._rebuild()
+        return calls
+
+    def _rebuild(self) -> Tuple[_Call, ...]:
+        """Rebuild the calls of the registered listeners and the hooks
+
+        :return: The rebuilt calls
+        """
+        metrics = self.metrics
+        calls: List[_Call] = []
+        for original_listener, listener, lane, _, _ in self:
+            if metrics is None:
+                calls.append((listener, lane))
+            else:
+                # merged tables are keyed by (table index, original listener)
+                if self.merged:
+                    original_listener = original_listener[1]
+                calls.append((metrics.timed(original_listener, listener), lane))
+        hooks: List[Callable[..., None]] = []
+        if self.replay is not None:
+            hooks.append(self.replay.record)
+        if metrics is not None:
+            hooks.append(metrics.record_emit)
+        self.hooks = tuple(hooks)
+        self.calls = tuple(calls)
+        return self.calls
+
+    def invalidate(self) -> None:
+        """Discard the cached dispatch functions"""
+        self.dispatcher = None
+        self.raising_dispatcher = None
+
+    def __iter__(self) -> Iterator[_Entry]:
+        """Iterate the (original listener, listener, lane, priority, once) entries
+        of the registered listeners, in call order"""
+        priorities = self.priorities
+        if self.listeners is None:
+            if self.value is not None:
+                items: Iterable[Tuple[Any, Any]] = [(self.key, self.value)]
+            else:
+                items = ()
+        elif priorities:
+            items = sorted(
+                self.listeners.items(), key=lambda item: -priorities.get(item[0], 0)
+            )
+        else:
+            items = self.listeners.items()
+        for key, value in items:
+            listener, lane, once = _decode(value)
+            priority = 0 if priorities is None else priorities.get(key, 0)
+            yield key, listener, lane, priority, once
+
+    def __len__(self) -> int:
+        if self.listeners is None:
+            return 0 if self.value is None else 1
+        return len(self.listeners)
+
+
+def _encode(listener: Callable[..., Any], lane: int, once: bool) -> Any:
+    """Returns the value stored for a listener, the listener itself unless
+    its lane is not the one determined by classify or it is a one time listener
+    """
+    if not once and classify(listener) == lane:
+        return listener
+    return (listener, lane, once)
+
+
+def _decode(value: Any) -> Tuple[Callable[..., Any], int, bool]:
+    """Returns the (listener, lane, once) of a value stored for a listener"""
+    # listeners are callable, never tuples
+    if type(value) is tuple:
+        return cast(Tuple[Callable[..., Any], int, bool], value)
+    return value, classify(value), False
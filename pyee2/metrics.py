@@ -0,0 +1,191 @@
+import sys
+from array import array
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Dict, List
+from weakref import ref
+
+from .listeners import WeakListener
+
+if sys.version_info >= (3, 7):
+    from time import perf_counter_ns
+else:  # pragma: no cover
+    from time import perf_counter
+
+    def perf_counter_ns() -> int:
+        return int(perf_counter() * 1e9)
+
+
+__all__ = ["BUCKETS", "EventMetrics", "Histogram", "ListenerMetrics"]
+
+#: Number of buckets of a Histogram, bucket i counts the durations d (in nanoseconds)
+#: with 2 ** (i - 1) <= d < 2 ** i, the last bucket every longer duration
+BUCKETS = 48
+
+
+class Histogram:
+    """Histogram of durations, in nanoseconds, using fixed power of two buckets.
+
+    The buckets are preallocated so recording a duration allocates nothing.
+    """
+
+    __slots__ = ["count", "total", "max", "buckets"]
+
+    def __init__(self) -> None:
+        """Initialize a new, empty, Histogram"""
+        self.count: int = 0
+        self.total: int = 0
+        self.max: int = 0
+        self.buckets: array = array("Q", bytes(8 * BUCKETS))
+
+    def record(self, duration: int) -> None:
+        """Record a duration
+
+        :param duration: The duration in nanoseconds
+        """
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.buckets[min(duration.bit_length(), BUCKETS - 1)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retrieve the recorded durations
+
+        :return: The number, total and maximum (in nanoseconds) of the recorded
+        durations and the list of bucket counts
+        """
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "max_ns": self.max,
+            "buckets": self.buckets.tolist(),
+        }
+
+
+class ListenerMetrics:
+    """The metrics of a listener of an event.
+
+    The duration of every call of the listener is recorded and, when the call
+    returns an awaitable, the latency from the call to the completion
+    of the awaitable's future.
+    """
+
+    __slots__ = ["calls", "errors", "duration", "latency"]
+
+    def __init__(self) -> None:
+        """Initialize new, empty, ListenerMetrics"""
+        self.calls: int = 0
+        self.errors: int = 0
+        self.duration: Histogram = Histogram()
+        self.latency: Histogram = Histogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retrieve the metrics of the listener
+
+        :return: The number of calls, calls that raised and the
+        duration and latency histograms of the listener
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "duration": self.duration.snapshot(),
+            "latency": self.latency.snapshot(),
+        }
+
+
+class EventMetrics:
+    """The metrics of an event.
+
+    Metrics are collected by ListenerTables they are attached to, which call
+    record_emit before and the timed wrappers instead of their listeners
+    when the event is emitted. Detaching the metrics restores the
+    listeners themselves, so collecting metrics costs nothing when disabled.
+
+    The metrics of a listener are keyed by a weak reference to the listener
+    and discarded once it is garbage collected, so registering and removing
+    many short lived listeners, e.g. bound methods, does not keep them alive.
+    Listeners that can not be weakly referenced are kept.
+    """
+
+    __slots__ = ["emits", "listeners"]
+
+    def __init__(self) -> None:
+        """Initialize new, empty, EventMetrics"""
+        self.emits: int = 0
+        self.listeners: Dict[Any, ListenerMetrics] = {}
+
+    def record_emit(self, *args: Any, **kwargs: Any) -> None:
+        """Record an emit of the event, accepting the arguments of the emit"""
+        self.emits += 1
+
+    def timed(
+        self, original_listener: Any, listener: Callable[..., Any]
+    ) -> Callable[..., Any]:
+        """Create the wrapper recording the metrics of a listener
+
+        :param original_listener: The registered listener, or its WeakListener
+        :param listener: The (possibly wrapped) listener to be called
+        :return: The wrapper to be called instead of the listener
+        """
+        try:
+            key: Any = ref(original_listener, self._forget)
+        except TypeError:
+            key = original_listener
+        metrics = self.listeners.get(key)
+        if metrics is None:
+            metrics = self.listeners[key] = ListenerMetrics()
+        duration = metrics.duration
+        latency = metrics.latency
+
+        def timed_listener(*args: Any, **kwargs: Any) -> Any:
+            metrics.calls += 1
+            start = perf_counter_ns()
+            try:
+                result = listener(*args, **kwargs)
+            except BaseException:
+                metrics.errors += 1
+                raise
+            finally:
+                duration.record(perf_counter_ns() - start)
+            if not isawaitable(result):
+                return result
+            return timed_awaitable(result, start)
+
+        async def timed_awaitable(awaitable: Awaitable[Any], start: int) -> Any:
+            # returned in place of the awaitable, which is scheduled by the emitter
+            # like any other, so only its completion is recorded
+            try:
+                return await awaitable
+            except BaseException:
+                metrics.errors += 1
+                raise
+            finally:
+                latency.record(perf_counter_ns() - start)
+
+        return timed_listener
+
+    def _forget(self, key: "ref[Any]") -> None:
+        """Discard the metrics of a garbage collected listener
+
+        :param key: The dead weak reference the metrics are keyed by
+        """
+        self.listeners.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retrieve the metrics of the event
+
+        :return: The number of emits and the metrics of every listener
+        the metrics were collected for
+        """
+        listeners: List[Dict[str, Any]] = []
+        # copied as garbage collecting a listener removes its entry
+        for key, metrics in self.listeners.copy().items():
+            original_listener = key() if isinstance(key, ref) else key
+            if isinstance(original_listener, WeakListener):
+                original_listener = original_listener()
+            if original_listener is None:
+                continue
+            snapshot = metrics.snapshot()
+            snapshot["listener"] = original_listener
+            listeners.append(snapshot)
+        return {"emits": self.emits, "listeners": listeners}
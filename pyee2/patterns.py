@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Sequence
+
+__all__ = ["GLOBSTAR", "STAR", "PatternTrie"]
+
+#: Matches exactly one segment of an event name
+STAR = "*"
+#: Matches zero or more segments of an event name
+GLOBSTAR = "**"
+
+
+class _Node:
+    __slots__ = ["children", "star", "globstar", "pattern"]
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.star: Optional["_Node"] = None
+        self.globstar: Optional["_Node"] = None
+        self.pattern: Optional[str] = None
+
+    def child(self, segment: str) -> "_Node":
+        if segment == STAR:
+            if self.star is None:
+                self.star = _Node()
+            return self.star
+        if segment == GLOBSTAR:
+            if self.globstar is None:
+                self.globstar = _Node()
+            return self.globstar
+        node = self.children.get(segment)
+        if node is None:
+            node = self.children[segment] = _Node()
+        return node
+
+    def is_empty(self) -> bool:
+        return (
+            self.pattern is None
+            and not self.children
+            and self.star is None
+            and self.globstar is None
+        )
+
+
+class PatternTrie:
+    """Index of wildcard event name patterns keyed by their segments.
+
+    An event name is split into segments using the separator. In a pattern
+    the "*" segment matches exactly one segment and the "**" segment matches
+    zero or more segments, e.g. with the default separator "Network.*" matches
+    "Network.requestWillBeSent" and "**" matches every event name.
+
+    Matching walks the trie one segment at a time, so its cost depends on the
+    number of segments of the event name rather than the number of patterns.
+    """
+
+    __slots__ = ["separator", "_root", "_order", "_counter"]
+
+    def __init__(self, separator: str = ".") -> None:
+        """Initialize a new, empty, PatternTrie
+
+        :param separator: The string separating the segments of event names
+        """
+        self.separator: str = separator
+        self._root: _Node = _Node()
+        self._order: Dict[str, int] = {}
+        self._counter: int = 0
+
+    def is_pattern(self, name: str) -> bool:
+        """Returns T/F indicating if the supplied event name is a wildcard pattern
+
+        :param name: The event name to check
+        :return: T/F indicating if the event name contains a wildcard segment
+        """
+        if STAR not in name:
+            return False
+        return any(
+            segment == STAR or segment == GLOBSTAR
+            for segment in name.split(self.separator)
+        )
+
+    def add(self, pattern: str) -> None:
+        """Add a pattern to the index
+
+        :param pattern: The pattern to be added
+        """
+        if pattern in self._order:
+            return
+        node = self._root
+        for segment in pattern.split(self.separator):
+            node = node.child(segment)
+        node.pattern = pattern
+        self._order[pattern] = self._counter
+        self._counter += 1
+
+    def remove(self, pattern: str) -> None:
+        """Remove a pattern from the index
+
+        :param pattern: The pattern to be removed
+        """
+        if self._order.pop(pattern, None) is None:
+            return
+        path: List[_Node] = [self._root]
+        segments = pattern.split(self.separator)
+        for segment in segments:
+            path.append(path[-1].child(segment))
+        path[-1].pattern = None
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if not node.is_empty():
+                break
+            parent = path[depth - 1]
+            segment = segments[depth - 1]
+            if segment == STAR:
+                parent.star = None
+            elif segment == GLOBSTAR:
+                parent.globstar = None
+            else:
+                del parent.children[segment]
+
+    def clear(self) -> None:
+        """Remove every pattern from the index"""
+        self._root = _Node()
+        self._order.clear()
+
+    def match(self, name: str) -> List[str]:
+        """Retrieve the patterns matching an event name
+
+        :param name: The event name to match
+        :return: The matching patterns, in the order they were added
+        """
+        if not self._order:
+            return []
+        found: Dict[str, None] = {}
+        self._match(self._root, name.split(self.separator), 0, found)
+        if len(found) < 2:
+            return list(found)
+        return sorted(found, key=self._order.__getitem__)
+
+    def _match(
+        self, node: _Node, segments: Sequence[str], idx: int, found: Dict[str, None]
+    ) -> None:
+        if node.globstar is not None:
+            for rest in range(idx, len(segments) + 1):
+                self._match(node.globstar, segments, rest, found)
+        if idx == len(segments):
+            if node.pattern is not None:
+                found[node.pattern] = None
+            return
+        child = node.children.get(segments[idx])
+        if child is not None:
+            self._match(child, segments, idx + 1, found)
+        if node.star is not None:
+            self._match(node.star, segments, idx + 1, found)
+
+    def __len__(self) -> int:
+        return len(self._order)
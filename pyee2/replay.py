@@ -0,0 +1,46 @@
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+__all__ = ["ReplayBuffer"]
+
+
+class ReplayBuffer:
+    """Fixed-size ring buffer of the latest emits of an event, replayed to
+    listeners registered with replay=True.
+
+    ListenerTables the buffer is attached to call record, as a hook, when the
+    event is emitted, so events that are not configured for replay pay nothing.
+    """
+
+    __slots__ = ["emits"]
+
+    def __init__(self, size: int) -> None:
+        """Initialize a new, empty, ReplayBuffer
+
+        :param size: The maximum number of emits kept
+        """
+        if size <= 0:
+            raise ValueError("The replay buffer size must be positive")
+        self.emits: Deque[Tuple[Tuple[Any, ...], Dict[str, Any]]] = deque(maxlen=size)
+
+    @property
+    def size(self) -> int:
+        """The maximum number of emits kept"""
+        return self.emits.maxlen
+
+    def record(self, *args: Any, **kwargs: Any) -> None:
+        """Record an emit, discarding the oldest one if the buffer is full"""
+        self.emits.append((args, kwargs))
+
+    def resize(self, size: int) -> "ReplayBuffer":
+        """Create a buffer of another size keeping the latest emits of this one
+
+        :param size: The maximum number of emits kept by the new buffer
+        :return: The new buffer
+        """
+        resized = ReplayBuffer(size)
+        resized.emits.extend(self.emits)
+        return resized
+
+    def __len__(self) -> int:
+        return len(self.emits)
@@ -0,0 +1,362 @@
+import os
+import sys
+from array import array
+from secrets import token_hex
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, cast
+
+# multiprocessing.shared_memory is only available on Python 3.8+,
+# older versions can use EventBridge without shared memory
+if sys.version_info >= (3, 8) or TYPE_CHECKING:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+
+__all__ = ["SegmentPool", "SharedHandle", "SharedPayload", "SegmentCache"]
+
+#: The smallest segment size, smaller buffers use segments of this size
+MIN_SEGMENT_SIZE = 4096
+
+# The (pid, tracker id) of the process the tracker id was last determined in
+_tracker: Tuple[int, Optional[Tuple[int, int]]] = (-1, None)
+
+
+def _segment_size(nbytes: int) -> int:
+    """Returns the size of the segments holding buffers of nbytes,
+    the next power of two, so the segments of a size can be reused
+    for buffers of similar sizes
+    """
+    if nbytes <= MIN_SEGMENT_SIZE:
+        return MIN_SEGMENT_SIZE
+    return 1 << (nbytes - 1).bit_length()
+
+
+def tracker_id() -> Optional[Tuple[int, int]]:
+    """Returns the identity of the resource tracker of the current process,
+    the device and inode of the pipe the tracker reads from, which processes
+    sharing the tracker (forked or spawned children) have in common
+
+    :return: The identity of the tracker or None if shared memory segments
+    are not tracked on this platform
+    """
+    global _tracker
+    pid = os.getpid()
+    if _tracker[0] != pid:
+        identity = None
+        if os.name == "posix":
+            stat = os.fstat(resource_tracker.getfd())
+            identity = (stat.st_dev, stat.st_ino)
+        _tracker = (pid, identity)
+    return _tracker[1]
+
+
+def shareable(value: Any) -> bool:
+    """Returns T/F indicating if the value is a buffer that can be sent
+    through shared memory: bytes, bytearray, memoryview, array or an object
+    exposing the NumPy array interface or, on Python 3.12+, the buffer protocol
+
+    :param value: The value to be checked
+    :return: T/F indicating if the value is a buffer
+    """
+    return (
+        isinstance(value, (bytes, bytearray, memoryview, array))
+        or hasattr(value, "__array_interface__")
+        or hasattr(value, "__buffer__")
+    )
+
+
+class SharedHandle:
+    """Picklable reference to a buffer copied into a shared memory segment,
+    sent in place of the buffer.
+
+    The handle records the process that created the segment and the identity
+    of its resource tracker, used by the receiving side to decide whether its
+    own tracker must forget the segment (see SegmentCache).
+    """
+
+    __slots__ = ["name", "nbytes", "format", "shape", "pid", "tracker"]
+
+    def __init__(
+        self,
+        name: str,
+        nbytes: int,
+        format: str,
+        shape: Tuple[int, ...],
+        pid: int,
+        tracker: Optional[Tuple[int, int]],
+    ) -> None:
+        """Initialize a new SharedHandle
+
+        :param name: The name of the segment
+        :param nbytes: The size of the buffer
+        :param format: The struct format of the items of the buffer
+        :param shape: The shape of the buffer
+        :param pid: The pid of the process that created the segment
+        :param tracker: The identity of the resource tracker of that process
+        """
+        self.name: str = name
+        self.nbytes: int = nbytes
+        self.format: str = format
+        self.shape: Tuple[int, ...] = shape
+        self.pid: int = pid
+        self.tracker: Optional[Tuple[int, int]] = tracker
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (
+            SharedHandle,
+            (self.name, self.nbytes, self.format, self.shape, self.pid, self.tracker),
+        )
+
+
+class SegmentPool:
+    """Pool of the shared memory segments buffers are copied into by
+    the sending side of an EventBridge.
+
+    Segments are sized in powers of two and returned to the pool once
+    the receiving side released them, so sending a buffer reuses a
+    segment of its size class instead of creating a new one.
+    """
+
+    __slots__ = ["max_free", "_free", "_used", "_closed"]
+
+    def __init__(self, max_free: int = 4) -> None:
+        """Initialize a new, empty, SegmentPool
+
+        :param max_free: The maximum number of released segments kept per size,
+        additional released segments are destroyed
+        :raises RuntimeError: If shared memory is not available (Python < 3.8)
+        """
+        if sys.version_info < (3, 8):
+            raise RuntimeError("Shared memory requires Python 3.8+")
+        self.max_free: int = max_free
+        self._free: Dict[int, List["SharedMemory"]] = {}
+        self._used: Dict[str, "SharedMemory"] = {}
+        self._closed: bool = False
+
+    def share(self, value: Any) -> Optional[SharedHandle]:
+        """Copy a buffer into a segment of the pool
+
+        :param value: The buffer to be copied
+        :return: The handle of the copied buffer or None if the buffer is not contiguous
+        """
+        view = memoryview(value)
+        if not view.c_contiguous:
+            return None
+        nbytes = view.nbytes
+        segment = self._acquire(nbytes)
+        segment.buf[:nbytes] = view.cast("B")
+        return SharedHandle(
+            segment.name, nbytes, view.format, view.shape, os.getpid(), tracker_id()
+        )
+
+    def release(self, name: str) -> bool:
+        """Return a segment released by the receiving side to the pool
+
+        :param name: The name of the released segment
+        :return: T/F indicating if the segment was destroyed instead of
+        being kept for reuse
+        """
+        segment = self._used.pop(name, None)
+        if segment is None:
+            return False
+        free = self._free.setdefault(segment.size, [])
+        if self._closed or len(free) >= self.max_free:
+            _destroy(segment)
+            return True
+        free.append(segment)
+        return False
+
+    def close(self) -> None:
+        """Destroy the segments of the pool, segments still used by the
+        receiving side remain mapped there until it releases them
+        """
+        self._closed = True
+        for free in self._free.values():
+            for segment in free:
+                _destroy(segment)
+        self._free.clear()
+        for segment in self._used.values():
+            _destroy(segment)
+        self._used.clear()
+
+    def _acquire(self, nbytes: int) -> "SharedMemory":
+        size = _segment_size(nbytes)
+        free = self._free.get(size)
+        if free:
+            segment = free.pop()
+        else:
+            segment = SharedMemory("pyee2_" + token_hex(8), create=True, size=size)
+        self._used[segment.name] = segment
+        return segment
+
+    def __len__(self) -> int:
+        return len(self._used) + sum(len(free) for free in self._free.values())
+
+
+class SharedPayload:
+    """Buffer received through shared memory, passed to listeners in place
+    of the buffer that was emitted.
+
+    The payload is reference counted, its segment is returned to the sending
+    side once every reference was released. The receiving EventBridge holds
+    a reference until the current loop iteration ends, listeners keeping the
+    payload for longer, coroutine listeners included, must call retain before
+    then (for coroutine listeners, before their first await) and release
+    once done with it.
+    """
+
+    __slots__ = ["name", "view", "_refs", "_on_release"]
+
+    def __init__(
+        self, name: str, view: memoryview, on_release: Callable[[str], None]
+    ) -> None:
+        """Initialize a new SharedPayload holding a reference
+
+        :param name: The name of the segment
+        :param view: The view of the buffer
+        :param on_release: The function called with the name of the segment
+        once every reference was released
+        """
+        self.name: str = name
+        self.view: memoryview = view
+        self._refs: int = 1
+        self._on_release: Callable[[str], None] = on_release
+
+    @property
+    def released(self) -> bool:
+        """T/F indicating if every reference was released"""
+        return self._refs == 0
+
+    def retain(self) -> "SharedPayload":
+        """Add a reference to the payload
+
+        :return: The payload
+        """
+        if self._refs == 0:
+            raise ValueError("The payload was released")
+        self._refs += 1
+        return self
+
+    def release(self) -> None:
+        """Release a reference to the payload, releasing the view and
+        the segment once no reference is left
+        """
+        if self._refs == 0:
+            return
+        self._refs -= 1
+        if self._refs == 0:
+            self.view.release()
+            self._on_release(self.name)
+
+    def tobytes(self) -> bytes:
+        """Returns a copy of the buffer"""
+        return self.view.tobytes()
+
+    def __len__(self) -> int:
+        return self.view.nbytes
+
+    def __enter__(self) -> "SharedPayload":
+        return self.retain()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class SegmentCache:
+    """The shared memory segments mapped by the receiving side of an EventBridge.
+
+    Segments are reused by the sending side, so they stay mapped once
+    received and later buffers sent using them do not have to map them again,
+    until the sending side destroys them and the receiving side forgets them.
+
+    Mapping a segment registers it with the resource tracker of this process
+    (before Python 3.13), which would destroy it when this process exits.
+    Segments created by a process with another tracker are unregistered right
+    away. A tracker shared with the creating process, a forked or spawned child
+    or parent, already tracks the segment on behalf of its creator and keeps it
+    registered, unregistering it there would make the tracker forget it.
+    """
+
+    __slots__ = ["_segments"]
+
+    def __init__(self) -> None:
+        """Initialize a new, empty, SegmentCache"""
+        self._segments: Dict[str, "SharedMemory"] = {}
+
+    def receive(
+        self, handle: SharedHandle, on_release: Callable[[str], None]
+    ) -> SharedPayload:
+        """Create the payload of a received handle
+
+        :param handle: The received handle
+        :param on_release: The function called once the payload is released
+        :return: The payload viewing the segment of the handle
+        """
+        segment = self._segments.get(handle.name)
+        if segment is None:
+            segment = _attach(handle)
+            self._segments[handle.name] = segment
+        view = segment.buf[: handle.nbytes]
+        if handle.format != "B" or len(handle.shape) != 1:
+            try:
+                # the format is only known at runtime, not as one of cast's literals
+                view = view.cast(cast(Any, handle.format), handle.shape)
+            except (TypeError, ValueError):
+                pass
+        return SharedPayload(handle.name, view, on_release)
+
+    def forget(self, name: str) -> None:
+        """Unmap a segment destroyed by the sending side, which is never sent again.
+        A segment whose payload was not released stays mapped until close
+
+        :param name: The name of the destroyed segment
+        """
+        segment = self._segments.get(name)
+        if segment is None:
+            return
+        try:
+            segment.close()
+        except BufferError:
+            return
+        del self._segments[name]
+
+    def close(self) -> None:
+        """Unmap the segments, segments whose payloads were not released stay mapped"""
+        for segment in self._segments.values():
+            try:
+                segment.close()
+            except BufferError:
+                pass
+        self._segments.clear()
+
+
+def _attach(handle: SharedHandle) -> "SharedMemory":
+    if sys.version_info >= (3, 13):
+        return SharedMemory(handle.name, track=False)
+    segment = SharedMemory(handle.name)
+    # the segment is owned by the sending process, do not let the resource
+    # tracker of this process destroy it when this process exits
+    if handle.pid != os.getpid():
+        tracker = tracker_id()
+        if tracker is not None and tracker != handle.tracker:
+            resource_tracker.unregister(_tracked_name(segment), "shared_memory")
+    return segment
+
+
+def _tracked_name(segment: "SharedMemory") -> str:
+    """Returns the name a segment is registered with the resource tracker under.
+
+    On POSIX, SharedMemory registers the segment under the name it was opened
+    with, which has a leading slash that SharedMemory.name strips, only the
+    private _name attribute keeps it
+    """
+    return cast(str, getattr(segment, "_name", segment.name))
+
+
+def _destroy(segment: "SharedMemory") -> None:
+    try:
+        segment.close()
+    except BufferError:
+        pass
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,175 @@
+from asyncio import AbstractEventLoop, Future
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Optional, Tuple, Union
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .eventemitter import EventEmitter
+    from .eventemitterS import EventEmitterS
+
+__all__ = [
+    "OVERFLOW_BLOCK",
+    "OVERFLOW_DROP_NEWEST",
+    "OVERFLOW_DROP_OLDEST",
+    "EventIterator",
+]
+
+#: When the buffer is full, emits wait for room, awaiting emit_async blocks the producer
+OVERFLOW_BLOCK = "block"
+#: When the buffer is full, the oldest buffered emit is discarded
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+#: When the buffer is full, the new emit is discarded
+OVERFLOW_DROP_NEWEST = "drop_newest"
+
+
+class EventIterator:
+    """Async iterator over the emits of an event.
+
+    Registers a listener for the event when created, buffering the positional
+    arguments of every emit until they are consumed, and removes it when closed,
+    either explicitly or when used as an async context manager.
+
+    The buffer holds at most maxsize emits, unbounded when maxsize is zero or less.
+    When it is full, the overflow policy decides what happens to a new emit:
+     - "block": the listener returns a future resolved once the emit made it
+       into the buffer, so producers awaiting emit_async wait for the consumer.
+       Producers using emit do not wait and their emits queue up behind the buffer,
+       at most maxsize of them, further emits are discarded until there is room
+     - "drop_oldest": the oldest buffered emit is discarded
+     - "drop_newest": the new emit is discarded
+
+    The number of discarded emits is available as dropped.
+
+    An EventIterator is meant to be consumed by a single task.
+    """
+
+    __slots__ = [
+        "event",
+        "maxsize",
+        "overflow",
+        "dropped",
+        "_emitter",
+        "_loop",
+        "_buffer",
+        "_blocked",
+        "_getter",
+        "_closed",
+    ]
+
+    def __init__(
+        self,
+        emitter: Union["EventEmitter", "EventEmitterS"],
+        event: str,
+        maxsize: int = 0,
+        overflow: str = OVERFLOW_BLOCK,
+    ) -> None:
+        """Initialize a new EventIterator, registering its listener
+
+        :param emitter: The emitter to iterate the emits of
+        :param event: The event to iterate the emits of
+        :param maxsize: The maximum number of buffered emits, unbounded if zero or less
+        :param overflow: What to do with new emits when the buffer is full,
+        one of "block", "drop_oldest" or "drop_newest"
+        """
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST):
+            raise ValueError("Unknown overflow policy %r" % overflow)
+        self.event: str = event
+        self.maxsize: int = maxsize
+        self.overflow: str = overflow
+        self.dropped: int = 0
+        self._emitter: Union["EventEmitter", "EventEmitterS"] = emitter
+        self._loop: AbstractEventLoop = emitter._loop
+        self._buffer: Deque[Tuple[Any, ...]] = deque(
+            maxlen=maxsize if maxsize > 0 and overflow == OVERFLOW_DROP_OLDEST else None
+        )
+        self._blocked: Deque[Tuple[Tuple[Any, ...], Future]] = deque()
+        self._getter: Optional[Future] = None
+        self._closed: bool = False
+        emitter.on(event, self._push)
+
+    def close(self) -> None:
+        """Remove the listener and end the iteration, discarding the buffered emits.
+
+        Futures returned for emits waiting for room in the buffer are resolved.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._emitter.remove_listener(self.event, self._push)
+        self._buffer.clear()
+        while self._blocked:
+            _, waiter = self._blocked.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+        self._wake()
+
+    async def aclose(self) -> None:
+        """Remove the listener and end the iteration, discarding the buffered emits"""
+        self.close()
+
+    def qsize(self) -> int:
+        """Returns the number of buffered emits
+
+        :return: The number of buffered emits
+        """
+        return len(self._buffer)
+
+    def _push(self, *args: Any, **kwargs: Any) -> Optional[Future]:
+        """The listener buffering the emits of the event"""
+        if kwargs:
+            raise TypeError("Event iterators do not support keyword arguments")
+        if self._closed:
+            return None
+        buffer = self._buffer
+        if 0 < self.maxsize <= len(buffer):
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                return None
+            if self.overflow == OVERFLOW_DROP_OLDEST:
+                self.dropped += 1
+            elif len(self._blocked) >= self.maxsize:
+                self.dropped += 1
+                return None
+            else:
+                waiter = self._loop.create_future()
+                self._blocked.append((args, waiter))
+                return waiter
+        buffer.append(args)
+        self._wake()
+        return None
+
+    def _wake(self) -> None:
+        getter = self._getter
+        if getter is not None:
+            self._getter = None
+            if not getter.done():
+                getter.set_result(None)
+
+    def __aiter__(self) -> "EventIterator":
+        return self
+
+    async def __anext__(self) -> Tuple[Any, ...]:
+        buffer = self._buffer
+        while not buffer:
+            if self._closed:
+                raise StopAsyncIteration
+            self._getter = self._loop.create_future()
+            try:
+                await self._getter
+            finally:
+                self._getter = None
+        args = buffer.popleft()
+        blocked = self._blocked
+        while blocked:
+            blocked_args, waiter = blocked.popleft()
+            # the emit of a producer that stopped waiting is discarded
+            if not waiter.done():
+                buffer.append(blocked_args)
+                waiter.set_result(None)
+                break
+        return args
+
+    async def __aenter__(self) -> "EventIterator":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+from typing import TYPE_CHECKING, Any, Callable, List, Union, cast
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .eventemitter import EventEmitter
+    from .eventemitterS import EventEmitterS
+
+__all__ = ["ListenerGroup", "Subscription"]
+
+Emitter = Union["EventEmitter", "EventEmitterS"]
+
+
+class Subscription:
+    """Handle of a registered listener, returned by the listener registration
+    methods of EventEmitter and EventEmitterS when subscription=True.
+
+    Disposing the subscription removes the listener, whichever emitter it
+    was registered with, without having to keep track of the event and listener.
+    """
+
+    __slots__ = ["emitter", "event", "listener"]
+
+    def __init__(self, emitter: Emitter, event: str, listener: Any) -> None:
+        """Initialize a new Subscription
+
+        :param emitter: The emitter the listener is registered with
+        :param event: The event the listener is registered for
+        :param listener: The registered listener, or its WeakListener
+        """
+        self.emitter: Any = emitter
+        self.event: str = event
+        self.listener: Any = listener
+
+    @property
+    def disposed(self) -> bool:
+        """T/F indicating if the subscription was disposed"""
+        return self.emitter is None
+
+    def dispose(self) -> None:
+        """Remove the listener, disposing the subscription more than once does nothing"""
+        emitter = self.emitter
+        if emitter is None:
+            return
+        self.emitter = None
+        emitter.remove_listener(self.event, self.listener)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.dispose()
+
+
+class ListenerGroup:
+    """Collection of subscriptions, possibly of different emitters, disposed together.
+
+    Disposing the group only removes the listeners it collected, so its cost
+    depends on the number of subscriptions in the group rather than the number
+    of listeners registered with the emitters. It can be used as a context
+    manager, sync or async, disposing the group on exit:
+
+        with ListenerGroup() as group:
+            group.on(page, "load", on_load)
+            group.once(session, "closed", on_closed)
+    """
+
+    __slots__ = ["subscriptions"]
+
+    def __init__(self) -> None:
+        """Initialize a new, empty, ListenerGroup"""
+        self.subscriptions: List[Subscription] = []
+
+    def add(self, subscription: Subscription) -> Subscription:
+        """Add a subscription to the group
+
+        :param subscription: The subscription to be added
+        :return: The subscription
+        """
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def on(
+        self, emitter: Emitter, event: str, listener: Callable[..., Any], **options: Any
+    ) -> Subscription:
+        """Register a listener for an event of an emitter and add its subscription
+
+        :param emitter: The emitter to register the listener with
+        :param event: The event to register the listener for
+        :param listener: The listener to be registered
+        :param options: The keyword-only arguments of EventEmitter.on
+        :return: The subscription of the listener
+        """
+        subscription = emitter.on(event, listener, subscription=True, **options)
+        return self.add(cast(Subscription, subscription))
+
+    def once(
+        self, emitter: Emitter, event: str, listener: Callable[..., Any], **options: Any
+    ) -> Subscription:
+        """Register a one time listener for an event of an emitter and add its subscription
+
+        :param emitter: The emitter to register the listener with
+        :param event: The event to register the listener for
+        :param listener: The listener to be registered
+        :param options: The keyword-only arguments of EventEmitter.once
+        :return: The subscription of the listener
+        """
+        subscription = emitter.once(event, listener, subscription=True, **options)
+        return self.add(cast(Subscription, subscription))
+
+    def dispose(self) -> None:
+        """Dispose every subscription of the group, emptying it"""
+        subscriptions = self.subscriptions
+        self.subscriptions = []
+        for subscription in subscriptions:
+            subscription.dispose()
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    def __enter__(self) -> "ListenerGroup":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.dispose()
+
+    async def __aenter__(self) -> "ListenerGroup":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.dispose()
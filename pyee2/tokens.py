@@ -0,0 +1,53 @@
+from threading import Lock
+from typing import Dict, Optional
+
+__all__ = ["EventToken", "event_token", "find_token"]
+
+
+class EventToken(str):
+    """An interned event name, holding the index of the event's slot.
+
+    Tokens are strings, so they can be used anywhere an event name is accepted
+    and are interchangeable with the name they were created for.
+    Every EventEmitter keeps the listeners of the events whose tokens exist
+    in a list indexed by the tokens' slots, as well as by name, so emitting
+    using a token finds the event's listeners by indexing that list rather
+    than by a lookup in the event dict, while emitting using the name finds
+    the same listeners.
+
+    Slots are allocated densely, in the order the tokens are created, and
+    tokens live as long as the process does, so tokens are meant for the fixed
+    set of event names of high frequency emitters, not for arbitrary names.
+    """
+
+    slot: int
+
+
+_registry: Dict[str, EventToken] = {}
+_registry_lock = Lock()
+
+
+def event_token(name: str) -> EventToken:
+    """Retrieve the token for an event name, creating it if need be
+
+    :param name: The event name
+    :return: The token for the event name
+    """
+    token = _registry.get(name)
+    if token is None:
+        with _registry_lock:
+            token = _registry.get(name)
+            if token is None:
+                token = EventToken(name)
+                token.slot = len(_registry)
+                _registry[name] = token
+    return token
+
+
+def find_token(name: str) -> Optional[EventToken]:
+    """Retrieve the token for an event name if one was created
+
+    :param name: The event name
+    :return: The token for the event name or None
+    """
+    return _registry.get(name)
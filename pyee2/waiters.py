@@ -0,0 +1,91 @@
+from asyncio import AbstractEventLoop, Future, Handle, TimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+__all__ = ["Waiters"]
+
+Predicate = Callable[..., bool]
+
+
+class Waiters:
+    """The futures waiting for the next emit of an event (EventEmitter.wait_for).
+
+    A single listener (dispatch) is registered for the event no matter how many
+    futures are waiting. The waiting futures are kept in a dict, in the order
+    they started waiting, so their predicates are evaluated in that order
+    and a future is removed in O(1) once it is resolved, timed out or cancelled.
+
+    on_empty is called once no more futures are waiting, after which the
+    Waiters must no longer be used.
+    """
+
+    __slots__ = ["loop", "on_empty", "pending"]
+
+    def __init__(self, loop: AbstractEventLoop, on_empty: Callable[[], None]) -> None:
+        """Initialize new, empty, Waiters
+
+        :param loop: The loop of the waiting futures
+        :param on_empty: The function called once no more futures are waiting
+        """
+        self.loop: AbstractEventLoop = loop
+        self.on_empty: Callable[[], None] = on_empty
+        self.pending: Dict[Future, Tuple[Optional[Predicate], Optional[Handle]]] = {}
+
+    def wait(
+        self, predicate: Optional[Predicate] = None, timeout: Optional[float] = None
+    ) -> Future:
+        """Create a future resolved by the next emit satisfying the predicate
+
+        :param predicate: Optional function called with the arguments of each emit,
+        the future is only resolved by an emit for which it returns true
+        :param timeout: Optional maximum number of seconds to wait, after which
+        the future fails with asyncio.TimeoutError
+        :return: The future resolved with the tuple of positional arguments of the emit
+        """
+        future = self.loop.create_future()
+        handle = None
+        if timeout is not None:
+            handle = self.loop.call_later(timeout, self._expire, future)
+        self.pending[future] = (predicate, handle)
+        future.add_done_callback(self._discard)
+        return future
+
+    def dispatch(self, *args: Any, **kwargs: Any) -> None:
+        """The listener resolving the waiting futures satisfied by an emit"""
+        for future, (predicate, _) in tuple(self.pending.items()):
+            if future.done():
+                continue
+            try:
+                if predicate is not None and not predicate(*args, **kwargs):
+                    continue
+            except Exception as e:
+                self._settle(future)
+                future.set_exception(e)
+                continue
+            self._settle(future)
+            future.set_result(args)
+
+    def cancel(self) -> None:
+        """Cancel every waiting future"""
+        for future in tuple(self.pending):
+            self._settle(future)
+            future.cancel()
+
+    def _expire(self, future: Future) -> None:
+        if not future.done():
+            self._settle(future)
+            future.set_exception(TimeoutError())
+
+    def _discard(self, future: Future) -> None:
+        if future in self.pending:
+            self._settle(future)
+
+    def _settle(self, future: Future) -> None:
+        pending = self.pending
+        _, handle = pending.pop(future)
+        if handle is not None:
+            handle.cancel()
+        if not pending:
+            self.on_empty()
+
+    def __len__(self) -> int:
+        return len(self.pending)
@@ -21,7 +21,7 @@ def find_version():
 setup(
     name="pyee2",
     version=find_version(),
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     license="MIT",
     author="John Berlin",
     author_email="n0tan3rd@gmail.com",
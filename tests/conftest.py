@@ -1,5 +1,6 @@
 from asyncio import AbstractEventLoop, Future, gather, set_event_loop_policy
-from typing import Any, Callable, Optional
+from heapq import heappop, heappush
+from typing import Any, Callable, List, Optional, Tuple
 
 import pytest
 from mock import Mock
@@ -12,14 +13,17 @@ except Exception:
     set_event_loop_policy(uvloop.EventLoopPolicy())
 
 
-@pytest.fixture
-def ee() -> EventEmitter:
-    return EventEmitter()
+DISPATCH_MODES = dict(params=[False, True], ids=["generic", "compiled"])
 
 
-@pytest.fixture
-def ees() -> EventEmitterS:
-    return EventEmitterS()
+@pytest.fixture(**DISPATCH_MODES)
+def ee(request: Any) -> EventEmitter:
+    return EventEmitter(compiled=request.param)
+
+
+@pytest.fixture(**DISPATCH_MODES)
+def ees(request: Any) -> EventEmitterS:
+    return EventEmitterS(compiled=request.param)
 
 
 @pytest.fixture
@@ -27,14 +31,14 @@ def mock() -> Mock:
     return Mock()
 
 
-@pytest.fixture
-def ee_with_event_loop(event_loop: AbstractEventLoop) -> EventEmitter:
-    return EventEmitter(loop=event_loop)
+@pytest.fixture(**DISPATCH_MODES)
+def ee_with_event_loop(event_loop: AbstractEventLoop, request: Any) -> EventEmitter:
+    return EventEmitter(loop=event_loop, compiled=request.param)
 
 
-@pytest.fixture
-def ees_with_event_loop(event_loop: AbstractEventLoop) -> EventEmitterS:
-    return EventEmitterS(loop=event_loop)
+@pytest.fixture(**DISPATCH_MODES)
+def ees_with_event_loop(event_loop: AbstractEventLoop, request: Any) -> EventEmitterS:
+    return EventEmitterS(loop=event_loop, compiled=request.param)
 
 
 @pytest.fixture
@@ -105,3 +109,60 @@ class EEExceptionHelper(object):
 @pytest.fixture
 def error_helper() -> EEExceptionHelper:
     return EEExceptionHelper()
+
+
+class FakeClockHandle(object):
+    def __init__(self, when: float, callback: Callable[..., Any], args: Any) -> None:
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+
+class FakeClockLoop(object):
+    """Stands in for the loop of an emitter, its clock only moves when advanced"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.timers = 0
+        self._scheduled: List[Tuple[float, int, FakeClockHandle]] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def call_at(
+        self, when: float, callback: Callable[..., Any], *args: Any
+    ) -> FakeClockHandle:
+        handle = FakeClockHandle(when, callback, args)
+        self.timers += 1
+        heappush(self._scheduled, (when, self.timers, handle))
+        return handle
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> FakeClockHandle:
+        return self.call_at(self.now + delay, callback, *args)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any) -> FakeClockHandle:
+        return self.call_at(self.now, callback, *args)
+
+    def advance(self, seconds: float) -> None:
+        target = self.now + seconds
+        scheduled = self._scheduled
+        while scheduled and scheduled[0][0] <= target:
+            when, _, handle = heappop(scheduled)
+            self.now = when
+            if not handle.cancelled():
+                handle.callback(*handle.args)
+        self.now = target
+
+
+@pytest.fixture
+def fake_clock() -> FakeClockLoop:
+    return FakeClockLoop()
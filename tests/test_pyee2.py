@@ -1,12 +1,45 @@
-from asyncio import AbstractEventLoop, Future
+import gc
+import os
+import sys
+from array import array
+from asyncio import (
+    AbstractEventLoop,
+    CancelledError,
+    Future,
+    TimeoutError,
+    current_task,
+    ensure_future,
+    get_running_loop,
+    run,
+    sleep,
+    wait_for,
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from multiprocessing import Pipe, get_context, resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from threading import Thread, current_thread
 from typing import Callable, TYPE_CHECKING
+from weakref import ref
 import pytest
-from mock import Mock
-
-from pyee2 import EventEmitter
+from mock import Mock, call, patch
+
+from pyee2 import (
+    EventBridge,
+    EventEmitter,
+    ListenerGroup,
+    SharedPayload,
+    Subscription,
+    bridge_pipe,
+    event_token,
+)
+from pyee2.eventemitter import MATCH_CACHE_SIZE
+from pyee2.sharedmem import SegmentCache, SegmentPool, SharedHandle, tracker_id
 
 if TYPE_CHECKING:
-    from .conftest import EEExceptionHelper
+    from .conftest import EEExceptionHelper, FakeClockLoop
 
 
 def test_get_listeners_registered_for_event(
@@ -404,3 +437,1819 @@ async def test_coroutine_listener_once_decorator_does_not_emits_error_when_not_l
     await error_helper.assert_error_was_not_emitted_async()
     assert ee_with_event_loop.listener_count("event") == 0
     assert ee_with_event_loop.listener_count("error") == 0
+
+
+def test_listener_added_during_emit_is_not_called(ee: EventEmitter, mock: Mock) -> None:
+    def adder(*args, **kwargs) -> None:
+        ee.on("event", mock.method)
+
+    ee.on("event", adder)
+    assert ee.emit("event", 1)
+    mock.method.assert_not_called()
+    assert ee.listener_count("event") == 2
+    assert ee.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+
+
+def test_listener_removed_during_emit_is_still_called(
+    ee: EventEmitter, mock: Mock
+) -> None:
+    def remover(*args, **kwargs) -> None:
+        ee.remove_all_listeners("event")
+
+    ee.on("event", remover)
+    ee.on("event", mock.method)
+    assert ee.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+    assert ee.listener_count("event") == 0
+    assert not ee.emit("event", 1)
+
+
+def test_declared_sync_listener(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method, is_async=False)
+    assert ee.listener_count("event") == 1
+    assert mock.method is ee.listeners("event")[0]
+    assert ee.emit("event", 1, data=2)
+    mock.method.assert_called_with(1, data=2)
+
+
+def test_declared_sync_listener_decorator_emits_error_when_listening_for_errors(
+    ee: EventEmitter, error_helper: "EEExceptionHelper"
+) -> None:
+    @ee.on("event", is_async=False)
+    def handler(*args, **kwargs) -> None:
+        error_helper.error_raiser(*args, **kwargs)
+
+    ee.on("error", error_helper.error_listener)
+    assert ee.emit("event", 1, data=2)
+    error_helper.assert_error_was_emitted()
+
+
+def test_listeners_are_called_in_registration_order_whatever_their_lane(
+    ee: EventEmitter, mock: Mock
+) -> None:
+    def unclassified(*args, **kwargs) -> None:
+        mock.unclassified(*args, **kwargs)
+
+    ee.on("event", mock.coroutine, is_async=True)
+    ee.on("event", unclassified)
+    ee.on("event", mock.sync, is_async=False)
+    assert ee.listeners("event") == [mock.coroutine, unclassified, mock.sync]
+    assert ee.emit("event", 1)
+    assert [call[0] for call in mock.mock_calls] == [
+        "coroutine",
+        "unclassified",
+        "sync",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_callable_object_listener(
+    ee_with_event_loop: EventEmitter, mock: Mock, deferred: Future
+) -> None:
+    class Handler:
+        async def __call__(self, *args, **kwargs) -> None:
+            mock.method(*args, **kwargs)
+            deferred.set_result(True)
+
+    handler = Handler()
+    ee_with_event_loop.on("event", handler)
+    assert ee_with_event_loop.emit("event", 1, data=2)
+    assert await deferred
+    mock.method.assert_called_with(1, data=2)
+
+
+@pytest.mark.asyncio
+async def test_function_returning_awaitable_listener(
+    ee_with_event_loop: EventEmitter, mock: Mock, deferred: Future
+) -> None:
+    async def handler(*args, **kwargs) -> None:
+        mock.method(*args, **kwargs)
+        deferred.set_result(True)
+
+    ee_with_event_loop.on("event", lambda *args, **kwargs: handler(*args, **kwargs))
+    assert ee_with_event_loop.emit("event", 1, data=2)
+    assert await deferred
+    mock.method.assert_called_with(1, data=2)
+
+
+@pytest.mark.parametrize("count", [0, 1, 8, 9, 20])
+def test_compiled_dispatch_calls_every_listener_in_order(
+    mock: Mock, count: int
+) -> None:
+    ee = EventEmitter(compiled=True)
+    calls = []
+    for idx in range(count):
+        ee.on("event", partial(calls.append, idx), is_async=False)
+        ee.on("event", partial(calls.append, -idx))
+    ee.on("event", mock.method)
+    assert ee.emit("event")
+    assert ee.emit("event")
+    mock.method.assert_called_with()
+    expected = [arg for idx in range(count) for arg in (idx, -idx)]
+    assert calls == expected + expected
+
+
+def test_compiled_dispatch_is_invalidated_by_error_listeners(
+    error_helper: "EEExceptionHelper",
+) -> None:
+    ee = EventEmitter(compiled=True)
+    ee.on("event", error_helper.error_raiser)
+    assert ee.emit("event")
+    error_helper.assert_error_was_not_emitted()
+    ee.on("error", error_helper.error_listener)
+    assert ee.emit("event")
+    error_helper.assert_error_was_emitted()
+    ee.remove_all_listeners("error")
+    error_helper.emitted_exception = None
+    assert ee.emit("event")
+    error_helper.assert_error_was_not_emitted()
+
+
+def test_compiled_dispatch_is_invalidated_by_listener_changes(mock: Mock) -> None:
+    ee = EventEmitter(compiled=True)
+    ee.on("event", mock.first)
+    assert ee.emit("event", 1)
+    ee.once("event", mock.second)
+    assert ee.emit("event", 2)
+    assert ee.emit("event", 3)
+    ee.remove_listener("event", mock.first)
+    assert not ee.emit("event", 4)
+    assert mock.mock_calls == [
+        call.first(1),
+        call.first(2),
+        call.second(2),
+        call.first(3),
+    ]
+
+
+def test_emit_many(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.first)
+    ee.on("event", mock.second)
+    assert ee.emit_many("event", [(1,), (2, 3), ()])
+    assert mock.mock_calls == [
+        call.first(1),
+        call.second(1),
+        call.first(2, 3),
+        call.second(2, 3),
+        call.first(),
+        call.second(),
+    ]
+    assert not ee.emit_many("other", [(1,)])
+
+
+def test_emit_many_kwargs(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method)
+    assert ee.emit_many_kwargs("event", [((1,), {"data": 2}), ((), {"data": 3})])
+    assert mock.method.mock_calls == [call(1, data=2), call(data=3)]
+
+
+def test_emit_many_once(ee: EventEmitter, mock: Mock) -> None:
+    ee.once("event", mock.once)
+    ee.on("event", mock.on)
+    assert ee.emit_many("event", [(1,), (2,)])
+    assert mock.mock_calls == [call.once(1), call.on(1), call.on(2)]
+    ee.once("event", mock.once)
+    ee.remove_all_listeners("event")
+    assert not ee.emit_many("event", [(3,)])
+    mock.once.assert_called_once_with(1)
+
+
+def test_emit_many_stops_when_listeners_are_removed(
+    ee: EventEmitter, mock: Mock
+) -> None:
+    def remover(arg) -> None:
+        mock.method(arg)
+        if arg == 2:
+            ee.remove_all_listeners("event")
+
+    ee.on("event", remover)
+    assert ee.emit_many("event", [(1,), (2,), (3,)])
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_emit_many_emits_error_when_listening_for_errors(
+    ee: EventEmitter, mock: Mock
+) -> None:
+    exception = Exception("An exception was raised")
+
+    def raiser(arg) -> None:
+        if arg == 1:
+            raise exception
+        mock.method(arg)
+
+    ee.on("event", raiser)
+    ee.on("error", mock.error)
+    assert ee.emit_many("event", [(1,), (2,)])
+    mock.error.assert_called_once_with(exception)
+    mock.method.assert_called_once_with(2)
+
+
+def test_raising_emit_many(ee: EventEmitter, mock: Mock) -> None:
+    exception = Exception("An exception was raised")
+
+    def raiser(arg) -> None:
+        if arg == 2:
+            raise exception
+        mock.method(arg)
+
+    ee.on("event", raiser)
+    ee.on("error", mock.error)
+    with pytest.raises(Exception) as raised:
+        ee.raising_emit_many("event", [(1,), (2,), (3,)])
+    assert raised.value is exception
+    mock.method.assert_called_once_with(1)
+    mock.error.assert_not_called()
+    with pytest.raises(Exception):
+        ee.raising_emit_many_kwargs("event", [((2,), {})])
+
+
+@pytest.mark.asyncio
+async def test_emit_async(ee_with_event_loop: EventEmitter, mock: Mock) -> None:
+    async def handler(arg, data=None) -> int:
+        await sleep(0)
+        mock.coroutine(arg, data=data)
+        return arg + data
+
+    ee_with_event_loop.on("event", handler)
+    ee_with_event_loop.on("event", lambda arg, data=None: arg * data)
+    results = await ee_with_event_loop.emit_async("event", 2, data=3)
+    assert results == [5, 6]
+    mock.coroutine.assert_called_once_with(2, data=3)
+    assert await ee_with_event_loop.emit_async("other") == []
+
+
+@pytest.mark.asyncio
+async def test_emit_async_results_exclude_hooks(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    ee = ee_with_event_loop
+    ee.configure_event("event", replay=1)
+    ee.enable_metrics()
+    ee.on("event", lambda arg: arg * 3)
+    assert await ee.emit_async("event", 2) == [6]
+    assert ee.emit("event", 3)
+    assert ee.stats()["event"]["emits"] == 2
+    replayed = []
+    ee.on("event", replayed.append, replay=True)
+    assert replayed == [3]
+
+
+@pytest.mark.asyncio
+async def test_emit_async_emits_error_when_listening_for_errors(
+    ee_with_event_loop: EventEmitter, error_helper: "EEExceptionHelper", mock: Mock
+) -> None:
+    ee_with_event_loop.on("event", error_helper.error_raiser)
+    ee_with_event_loop.on("event", error_helper.error_raiser_async)
+    ee_with_event_loop.on("error", mock.error)
+    results = await ee_with_event_loop.emit_async("event", 1, data=2)
+    assert results == [error_helper.exception, error_helper.exception]
+    assert mock.error.mock_calls == [
+        call(error_helper.exception),
+        call(error_helper.exception),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_emit_async_max_concurrency(ee_with_event_loop: EventEmitter) -> None:
+    running = 0
+    most_running = 0
+
+    async def handler(arg) -> int:
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await sleep(0)
+        running -= 1
+        return arg
+
+    for _ in range(10):
+        ee_with_event_loop.on("event", partial(handler))
+    results = await ee_with_event_loop.emit_async("event", 1, max_concurrency=3)
+    assert results == [1] * 10
+    assert most_running == 3
+
+
+@pytest.mark.asyncio
+async def test_tracked_drain(event_loop: AbstractEventLoop, mock: Mock) -> None:
+    ee = EventEmitter(loop=event_loop, tracked=True)
+
+    async def handler(arg) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ee.on("event", handler)
+    assert ee.pending_count() == 0
+    assert ee.emit("event", 1)
+    assert ee.emit("event", 2)
+    assert ee.pending_count() == 2
+    assert await ee.drain()
+    assert ee.pending_count() == 0
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+@pytest.mark.asyncio
+async def test_tracked_aclose_cancels_pending(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ee = EventEmitter(loop=event_loop, tracked=True)
+
+    async def handler() -> None:
+        await sleep(10)
+        mock.method()
+
+    ee.on("event", handler)
+    ee.on("error", mock.error)
+    assert ee.emit("event")
+    assert not await ee.drain(timeout=0.01)
+    assert ee.pending_count() == 1
+    await ee.aclose()
+    assert ee.pending_count() == 0
+    mock.method.assert_not_called()
+    mock.error.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_drop(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ee = EventEmitter(loop=event_loop, tracked=True, high_water_mark=2, overflow="drop")
+
+    async def handler(arg) -> None:
+        mock.method(arg)
+
+    ee.on("event", handler)
+    for arg in range(4):
+        assert ee.emit("event", arg)
+    assert ee.pending_count() == 2
+    assert await ee.emit_async("event", 4) == []
+    assert await ee.drain()
+    assert mock.method.mock_calls == [call(0), call(1)]
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_raise(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ee = EventEmitter(
+        loop=event_loop, tracked=True, high_water_mark=1, overflow="raise"
+    )
+
+    async def handler() -> None:
+        mock.method()
+
+    ee.on("event", handler)
+    ee.on("error", mock.error)
+    assert ee.emit("event")
+    assert ee.emit("event")
+    assert isinstance(mock.error.call_args[0][0], RuntimeError)
+    with pytest.raises(RuntimeError):
+        ee.raising_emit("event")
+    with pytest.raises(RuntimeError):
+        await ee.emit_async("event")
+    assert await ee.drain()
+    mock.method.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_block(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ee = EventEmitter(loop=event_loop, tracked=True, high_water_mark=2)
+
+    async def handler(arg) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ee.on("event", handler)
+    for arg in range(3):
+        assert ee.emit("event", arg)
+    assert ee.pending_count() == 3
+    assert await ee.emit_async("event", 3) == [None]
+    assert mock.method.call_count >= 2
+    assert await ee.drain()
+    assert mock.method.call_count == 4
+
+
+def test_unknown_overflow_policy() -> None:
+    with pytest.raises(ValueError):
+        EventEmitter(tracked=True, overflow="unknown")
+
+
+def test_wildcard_listeners(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Network.requestWillBeSent", mock.exact)
+    ee.on("Network.*", mock.network)
+    ee.on("*.frameNavigated", mock.navigated)
+    ee.on("**", mock.everything)
+    assert ee.emit("Network.requestWillBeSent", 1)
+    assert ee.emit("Page.frameNavigated", 2)
+    assert ee.emit("Page.lifecycle.event", 3)
+    assert mock.mock_calls == [
+        call.exact(1),
+        call.network(1),
+        call.everything(1),
+        call.navigated(2),
+        call.everything(2),
+        call.everything(3),
+    ]
+    assert ee.listeners("Network.*") == [mock.network]
+    assert ee.listener_count("Network.requestWillBeSent") == 1
+
+
+def test_wildcard_listeners_separator_and_globstar(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True, separator="/")
+    ee.on("a/**/z", mock.method)
+    assert ee.emit("a/z", 1)
+    assert ee.emit("a/b/c/z", 2)
+    assert not ee.emit("a/b/c", 3)
+    assert not ee.emit("a.z", 4)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_wildcard_match_cache_is_bounded(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Network.*", mock.method)
+    names = ["req.%d" % idx for idx in range(MATCH_CACHE_SIZE + 100)]
+    for name in names:
+        assert not ee.emit(name)
+    assert ee.emit("Network.load", 1)
+    matched = getattr(ee, "_%s__extras" % type(ee).__name__).matched
+    assert len(matched) == MATCH_CACHE_SIZE
+    assert names[0] not in matched
+    assert ee.emit("Network.load", 2)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_wildcard_listener_changes(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Page.*", mock.page)
+    assert ee.emit("Page.load", 1)
+    ee.once("Page.*", mock.once)
+    ee.on("Page.load", mock.exact)
+    assert ee.emit("Page.load", 2)
+    assert ee.emit("Page.load", 3)
+    ee.remove_listener("Page.*", mock.page)
+    assert ee.emit("Page.load", 4)
+    ee.remove_all_listeners("Page.load")
+    assert not ee.emit("Page.load", 5)
+    assert mock.mock_calls == [
+        call.page(1),
+        call.exact(2),
+        call.page(2),
+        call.once(2),
+        call.exact(3),
+        call.page(3),
+        call.exact(4),
+    ]
+
+
+def test_wildcard_disabled_by_default(mock: Mock) -> None:
+    ee = EventEmitter()
+    ee.on("Network.*", mock.method)
+    assert not ee.emit("Network.requestWillBeSent")
+    assert ee.emit("Network.*")
+    mock.method.assert_called_once_with()
+
+
+def test_event_token(ee: EventEmitter, mock: Mock) -> None:
+    token = ee.event_token("token event")
+    assert token == "token event"
+    assert token is event_token("token event")
+    assert event_token("other token event").slot != token.slot
+    ee.on(token, mock.first)
+    ee.on("token event", mock.second)
+    assert ee.listener_count("token event") == 2
+    slots = getattr(ee, "_%s__slots" % type(ee).__name__)
+    assert slots[token.slot] is getattr(ee, "_%s__events" % type(ee).__name__)[token]
+    assert ee.emit(token, 1)
+    assert ee.emit("token event", 2)
+    ee.remove_listener(token, mock.second)
+    assert ee.listeners("token event") == [mock.first]
+    assert mock.mock_calls == [
+        call.first(1),
+        call.second(1),
+        call.first(2),
+        call.second(2),
+    ]
+
+
+def test_event_token_slot_follows_listeners(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("late token event", mock.method)
+    ee.once("late token event", mock.once)
+    token = event_token("late token event")
+    assert ee.emit(token, 1)
+    assert ee.emit(token, 2)
+    ee.remove_listener("late token event", mock.method)
+    assert not ee.emit(token, 3)
+    ee.on(token, mock.method)
+    ee.remove_all_listeners()
+    assert not ee.emit(token, 4)
+    assert not ee.raising_emit(token, 5)
+    assert mock.mock_calls == [call.method(1), call.once(1), call.method(2)]
+
+
+def test_event_token_wildcard(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Token.*", mock.pattern)
+    ee.on(event_token("Token.event"), mock.method)
+    assert ee.emit(event_token("Token.event"), 1)
+    assert ee.emit(event_token("Token.other"), 2)
+    assert mock.mock_calls == [call.method(1), call.pattern(1), call.pattern(2)]
+
+
+class WeakHandler:
+    def __init__(self, mock: Mock) -> None:
+        self.mock = mock
+
+    def handle(self, *args, **kwargs) -> None:
+        self.mock.handle(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.mock.call(*args, **kwargs)
+
+
+def test_weak_listener_is_removed_when_collected(ee: EventEmitter, mock: Mock) -> None:
+    handler = WeakHandler(mock)
+    ee.on("event", handler.handle, weak=True)
+    ee.on("event", handler, weak=True)
+    assert ee.listener_count("event") == 2
+    assert ee.listeners("event") == [handler.handle, handler]
+    assert ee.emit("event", 1)
+    del handler
+    gc.collect()
+    assert ee.listener_count("event") == 0
+    assert ee.listeners("event") == []
+    assert not ee.emit("event", 2)
+    assert mock.mock_calls == [call.handle(1), call.call(1)]
+
+
+def test_weak_listener_remove_listener(ee: EventEmitter, mock: Mock) -> None:
+    handler = WeakHandler(mock)
+    ee.on("event", handler.handle, weak=True)
+    ee.once("event", handler, weak=True)
+    ee.remove_listener("event", handler.handle)
+    assert ee.listeners("event") == [handler]
+    assert ee.emit("event", 1)
+    assert ee.listener_count("event") == 0
+    assert mock.mock_calls == [call.call(1)]
+
+
+def test_weak_listener_decorator(ee: EventEmitter, mock: Mock) -> None:
+    @ee.on("event", weak=True)
+    def handler(*args, **kwargs) -> None:
+        mock.method(*args, **kwargs)
+
+    assert ee.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+    del handler
+    gc.collect()
+    assert not ee.emit("event", 2)
+
+
+@pytest.mark.asyncio
+async def test_emit_threadsafe(
+    ee_with_event_loop: EventEmitter, event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    done = event_loop.create_future()
+
+    def handler(arg, data=None) -> None:
+        mock.method(arg, data=data)
+        if arg == 99:
+            done.set_result(True)
+
+    ee_with_event_loop.on("event", handler)
+
+    def produce() -> None:
+        for arg in range(100):
+            ee_with_event_loop.emit_threadsafe("event", arg, data=arg)
+
+    producer = Thread(target=produce)
+    producer.start()
+    await done
+    producer.join()
+    assert mock.method.mock_calls == [call(arg, data=arg) for arg in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_executor_listener(ee_with_event_loop: EventEmitter, mock: Mock) -> None:
+    def blocking(arg, data=None) -> int:
+        mock.thread(current_thread())
+        return arg + data
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        ee_with_event_loop.on("event", blocking, executor=executor)
+        ee_with_event_loop.on("event", blocking, executor="thread")
+        assert ee_with_event_loop.listeners("event") == [blocking]
+        assert await ee_with_event_loop.emit_async("event", 1, data=2) == [3]
+        ee_with_event_loop.remove_listener("event", blocking)
+        ee_with_event_loop.once("event", blocking, executor="thread")
+        assert await ee_with_event_loop.emit_async("event", 2, data=2) == [4]
+        assert ee_with_event_loop.listener_count("event") == 0
+    ee_with_event_loop.close()
+    assert all(
+        thread is not current_thread() for ((thread,), _) in mock.thread.call_args_list
+    )
+
+
+@pytest.mark.asyncio
+async def test_executor_listener_survives_close(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    ee_with_event_loop.on("event", divmod, executor="thread")
+    assert await ee_with_event_loop.emit_async("event", 7, 2) == [(3, 1)]
+    ee_with_event_loop.close()
+    assert await ee_with_event_loop.emit_async("event", 9, 4) == [(2, 1)]
+    ee_with_event_loop.close()
+
+
+@pytest.mark.asyncio
+async def test_executor_listener_emits_error_when_listening_for_errors(
+    ee_with_event_loop: EventEmitter, error_helper: "EEExceptionHelper", mock: Mock
+) -> None:
+    ee_with_event_loop.on("event", error_helper.error_raiser, executor="thread")
+    ee_with_event_loop.on("error", mock.error)
+    assert await ee_with_event_loop.emit_async("event") == [error_helper.exception]
+    mock.error.assert_called_once_with(error_helper.exception)
+    ee_with_event_loop.close()
+
+
+@pytest.mark.asyncio
+async def test_process_executor_listener(ee_with_event_loop: EventEmitter) -> None:
+    ee_with_event_loop.on("event", divmod, executor="process")
+    assert await ee_with_event_loop.emit_async("event", 7, 2) == [(3, 1)]
+    ee_with_event_loop.close()
+
+
+def test_executor_listener_validation(ee: EventEmitter) -> None:
+    async def handler() -> None:
+        pass
+
+    with pytest.raises(ValueError):
+        ee.on("event", handler, executor="thread")
+    with pytest.raises(ValueError):
+        ee.on("event", print, executor="fiber")
+    assert ee.listener_count("event") == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_latest(ee_with_event_loop: EventEmitter, mock: Mock) -> None:
+    ee_with_event_loop.configure_event("event", coalesce="latest")
+    ee_with_event_loop.on("event", mock.method)
+    for arg in range(5):
+        assert ee_with_event_loop.emit("event", arg, data=arg)
+    mock.method.assert_not_called()
+    await sleep(0)
+    mock.method.assert_called_once_with(4, data=4)
+    assert ee_with_event_loop.emit("event", 5)
+    await sleep(0)
+    assert mock.method.call_count == 2
+    ee_with_event_loop.configure_event("event", coalesce=None)
+    assert ee_with_event_loop.emit("event", 6)
+    assert mock.method.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesce_accumulate(
+    ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    ee_with_event_loop.on("event", mock.method)
+    ee_with_event_loop.configure_event("event", coalesce="accumulate")
+    for arg in range(3):
+        assert ee_with_event_loop.emit("event", arg)
+    with pytest.raises(TypeError):
+        ee_with_event_loop.emit("event", data=1)
+    await sleep(0)
+    mock.method.assert_called_once_with([(0,), (1,), (2,)])
+
+
+def test_coalesce_debounce(fake_clock: "FakeClockLoop", mock: Mock) -> None:
+    ee = EventEmitter(loop=fake_clock)
+    ee.configure_event("event", coalesce="debounce", interval=0.5)
+    ee.on("event", mock.method)
+    for arg in range(3):
+        assert ee.emit("event", arg)
+        fake_clock.advance(0.125)
+    fake_clock.advance(0.25)
+    mock.method.assert_not_called()
+    fake_clock.advance(0.125)
+    mock.method.assert_called_once_with(2)
+    # the timer is only rescheduled when it fires before the deadline
+    assert fake_clock.timers == 2
+
+
+def test_coalesce_throttle(fake_clock: "FakeClockLoop", mock: Mock) -> None:
+    ee = EventEmitter(loop=fake_clock)
+    ee.configure_event("event", coalesce="throttle", interval=0.5)
+    ee.on("event", mock.method)
+    for arg in range(3):
+        assert ee.emit("event", arg)
+    mock.method.assert_called_once_with(0)
+    fake_clock.advance(0.25)
+    mock.method.assert_called_once_with(0)
+    fake_clock.advance(0.25)
+    assert mock.method.mock_calls == [call(0), call(2)]
+    assert ee.emit("event", 3)
+    assert mock.method.call_count == 2
+    fake_clock.advance(0.5)
+    assert mock.method.mock_calls == [call(0), call(2), call(3)]
+    fake_clock.advance(0.5)
+    assert ee.emit("event", 4)
+    assert mock.method.mock_calls[-1] == call(4)
+
+
+def test_configure_event_validation(ee: EventEmitter) -> None:
+    with pytest.raises(ValueError):
+        ee.configure_event("event", coalesce="debounce")
+    with pytest.raises(ValueError):
+        ee.configure_event("event", coalesce="sometimes")
+    with pytest.raises(ValueError):
+        ee.configure_event("event", interval=0.5)
+
+
+@pytest.mark.asyncio
+async def test_configure_event_keeps_options_not_supplied(
+    ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    ee = ee_with_event_loop
+    ee.configure_event("event", coalesce="latest")
+    ee.configure_event("event", replay=2)
+    ee.on("event", mock.method)
+    for arg in range(3):
+        assert ee.emit("event", arg)
+    await sleep(0)
+    mock.method.assert_called_once_with(2)
+    ee.configure_event("event", coalesce=None)
+    assert ee.emit("event", 3)
+    assert mock.method.mock_calls == [call(2), call(3)]
+    ee.on("event", mock.replayed, replay=True)
+    assert mock.replayed.mock_calls == [call(2), call(3)]
+    ee.configure_event("event", coalesce="latest")
+    ee.configure_event("event", replay=None)
+    assert ee.emit("event", 4)
+    mock.method.assert_called_with(3)
+    await sleep(0)
+    mock.method.assert_called_with(4)
+    ee.on("event", mock.late, replay=True)
+    mock.late.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_emit_deferred(ee_with_event_loop: EventEmitter, mock: Mock) -> None:
+    def chained(arg) -> None:
+        mock.chained(arg)
+        if arg < 3:
+            ee_with_event_loop.emit_deferred("event", arg + 1)
+
+    ee_with_event_loop.on("event", chained)
+    ee_with_event_loop.on("other", mock.other)
+    queue = ee_with_event_loop.deferred_queue()
+    drained = queue.drained
+    drains = queue.drains
+    ee_with_event_loop.emit_deferred("event", 0)
+    ee_with_event_loop.emit_deferred("other", data=1)
+    assert queue.depth == 2
+    mock.chained.assert_not_called()
+    await sleep(0)
+    assert mock.mock_calls == [
+        call.chained(0),
+        call.other(data=1),
+        call.chained(1),
+        call.chained(2),
+        call.chained(3),
+    ]
+    stats = queue.stats()
+    assert stats["depth"] == 0
+    assert stats["max_depth"] >= 2
+    assert stats["drained"] - drained == 5
+    assert stats["drains"] - drains == 1
+
+
+@pytest.mark.asyncio
+async def test_emit_deferred_max_batch(
+    ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    ee_with_event_loop.on("event", mock.method)
+    queue = ee_with_event_loop.deferred_queue()
+    queue.max_batch = 2
+    try:
+        for arg in range(5):
+            ee_with_event_loop.emit_deferred("event", arg)
+        await sleep(0)
+        assert mock.method.call_count == 2
+        await sleep(0)
+        assert mock.method.call_count == 4
+        await sleep(0)
+        assert mock.method.mock_calls == [call(arg) for arg in range(5)]
+    finally:
+        queue.max_batch = None
+
+
+def test_priority_orders_listeners(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.low, priority=-1)
+    ee.on("event", mock.first)
+    ee.on("event", mock.high, priority=10)
+    ee.on("event", mock.second)
+
+    assert ee.listeners("event") == [mock.high, mock.first, mock.second, mock.low]
+    assert ee.emit("event", 1)
+    assert mock.mock_calls == [
+        call.high(1),
+        call.first(1),
+        call.second(1),
+        call.low(1),
+    ]
+
+
+def test_priority_reregistering_listener(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.first)
+    ee.on("event", mock.second)
+    ee.on("event", mock.first)
+    assert ee.listeners("event") == [mock.first, mock.second]
+    ee.on("event", mock.second, priority=1)
+    assert ee.listeners("event") == [mock.second, mock.first]
+    assert ee.listener_count("event") == 2
+
+
+@pytest.mark.asyncio
+async def test_priority_orders_listeners_whatever_their_lane(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    ee = ee_with_event_loop
+    called = []
+
+    def coroutine(arg: int) -> Future:
+        called.append("async")
+        return ensure_future(sleep(0))
+
+    def plain(arg: int) -> None:
+        called.append("plain")
+
+    def sync(arg: int) -> None:
+        called.append("sync")
+
+    ee.on("event", sync, is_async=False, priority=-5)
+    ee.on("event", plain)
+    ee.on("event", coroutine, is_async=True, priority=10)
+    assert ee.listeners("event") == [coroutine, plain, sync]
+    assert ee.emit("event", 1)
+    assert called == ["async", "plain", "sync"]
+
+
+def test_listener_changes_rebuild_calls_once(ee: EventEmitter, mock: Mock) -> None:
+    listeners = [Mock() for _ in range(20)]
+    for listener in listeners:
+        ee.on("event", listener)
+    table = getattr(ee, "_%s__events" % type(ee).__name__)["event"]
+    assert ee.emit("event", 1)
+    calls = table.calls
+    assert len(calls) == 20
+    for listener in listeners[:-1]:
+        ee.remove_listener("event", listener)
+    assert table.calls is None
+    ee.on("event", mock.method, priority=1)
+    assert len(table) == 2
+    assert ee.emit("event", 2)
+    assert [listener for listener, _ in table.calls] == [mock.method, listeners[-1]]
+    mock.method.assert_called_once_with(2)
+    listeners[0].assert_called_once_with(1)
+    listeners[-1].assert_has_calls([call(1), call(2)])
+
+
+def test_prepend_listener(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.first)
+    ee.prepend_listener("event", mock.prepended)
+    ee.prepend_listener("event", mock.prepended_last)
+    ee.on("event", mock.high, priority=1)
+
+    @ee.prepend_listener("event", priority=-1)
+    def low(arg: int) -> None:
+        mock.low(arg)
+
+    assert ee.emit("event", 1)
+    assert mock.mock_calls == [
+        call.high(1),
+        call.prepended_last(1),
+        call.prepended(1),
+        call.first(1),
+        call.low(1),
+    ]
+    ee.remove_listener("event", mock.prepended)
+    assert ee.listeners("event") == [mock.high, mock.prepended_last, mock.first, low]
+
+
+def test_prepend_once_listener(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.first)
+    ee.prepend_once_listener("event", mock.once)
+
+    assert ee.emit("event", 1)
+    assert ee.emit("event", 2)
+    assert mock.mock_calls == [call.once(1), call.first(1), call.first(2)]
+    assert ee.listeners("event") == [mock.first]
+
+
+def test_priority_across_patterns(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Network.*", mock.pattern)
+    ee.on("Network.request", mock.exact)
+    ee.on("**", mock.globstar, priority=1)
+
+    assert ee.emit("Network.request", 1)
+    assert mock.mock_calls == [
+        call.globstar(1),
+        call.exact(1),
+        call.pattern(1),
+    ]
+
+
+def test_metrics_disabled_by_default(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method)
+    assert not ee.metrics_enabled()
+    assert ee.emit("event", 1)
+    assert ee.stats() == {}
+
+
+def test_metrics_counts_emits_and_calls(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method)
+    ee.enable_metrics()
+    assert ee.metrics_enabled()
+    ee.once("event", mock.once)
+    assert ee.emit("event", 1)
+    assert ee.emit("event", 2)
+    assert not ee.emit("nothing", 3)
+    assert ee.listeners("event") == [mock.method]
+
+    stats = ee.stats()
+    assert list(stats) == ["event"]
+    assert stats["event"]["emits"] == 2
+    method, once = stats["event"]["listeners"]
+    assert method["listener"] is mock.method
+    assert method["calls"] == 2
+    assert method["errors"] == 0
+    assert method["duration"]["count"] == 2
+    assert sum(method["duration"]["buckets"]) == 2
+    assert method["latency"]["count"] == 0
+    assert once["listener"] is mock.once
+    assert once["calls"] == 1
+
+    ee.remove_listener("event", mock.method)
+    assert ee.listener_count("event") == 0
+    ee.disable_metrics()
+    ee.on("event", mock.method)
+    assert ee.emit("event", 3)
+    assert ee.stats()["event"]["emits"] == 2
+    mock.method.assert_has_calls([call(1), call(2), call(3)])
+
+
+def test_metrics_counts_errors(
+    ee: EventEmitter, error_helper: "EEExceptionHelper"
+) -> None:
+    ee.enable_metrics()
+    ee.on("event", error_helper.error_raiser)
+    ee.on("error", error_helper.error_listener)
+    assert ee.emit("event", 1)
+    error_helper.assert_error_was_emitted()
+    listener = ee.stats()["event"]["listeners"][0]
+    assert listener["calls"] == 1
+    assert listener["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_async_latency(
+    ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    async def listener(arg: int) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ee_with_event_loop.enable_metrics()
+    ee_with_event_loop.on("event", listener)
+    assert ee_with_event_loop.emit("event", 1)
+    mock.method.assert_not_called()
+    await sleep(0.01)
+    mock.method.assert_called_once_with(1)
+    stats = ee_with_event_loop.stats()["event"]["listeners"][0]
+    assert stats["listener"] is listener
+    assert stats["calls"] == 1
+    assert stats["latency"]["count"] == 1
+    assert stats["latency"]["max_ns"] >= stats["duration"]["max_ns"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_leave_scheduling_to_emit_async(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    running = []
+    overlapped = []
+
+    async def listener(arg: int, offset: int = 0) -> int:
+        overlapped.append(bool(running))
+        running.append(arg)
+        await sleep(0)
+        running.remove(arg)
+        return arg + offset
+
+    ee_with_event_loop.enable_metrics()
+    ee_with_event_loop.on("event", listener)
+    ee_with_event_loop.on("event", partial(listener, offset=1))
+    results = await ee_with_event_loop.emit_async("event", 1, max_concurrency=1)
+    assert results == [1, 2]
+    assert overlapped == [False, False]
+    listeners = ee_with_event_loop.stats()["event"]["listeners"]
+    assert [stats["latency"]["count"] for stats in listeners] == [1, 1]
+
+
+def test_metrics_do_not_keep_removed_listeners(ee: EventEmitter, mock: Mock) -> None:
+    class Handler:
+        def on_event(self, arg: int) -> None:
+            mock.method(arg)
+
+    ee.enable_metrics()
+    handlers = []
+    for arg in range(1000):
+        handler = Handler()
+        handlers.append(ref(handler))
+        ee.on("event", handler.on_event)
+        assert ee.emit("event", arg)
+        ee.remove_listener("event", handler.on_event)
+    del handler
+    gc.collect()
+    assert not any(handler() for handler in handlers)
+    assert len(mock.method.mock_calls) == 1000
+    assert ee.stats()["event"] == {"emits": 1000, "listeners": []}
+
+
+def test_metrics_wildcard(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.on("Network.*", mock.pattern)
+    ee.enable_metrics()
+    assert ee.emit("Network.request", 1)
+    assert ee.emit("Network.request", 2)
+    stats = ee.stats()["Network.request"]
+    assert stats["emits"] == 2
+    assert stats["listeners"][0]["listener"] is mock.pattern
+    assert stats["listeners"][0]["calls"] == 2
+
+
+def test_single_listener_then_more(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.first)
+    ee.on("event", mock.first)
+    assert ee.listeners("event") == [mock.first]
+    ee.prepend_listener("event", mock.first)
+    assert ee.listeners("event") == [mock.first]
+    ee.on("event", mock.second)
+    ee.on("event", mock.third, priority=1)
+    assert ee.listeners("event") == [mock.third, mock.first, mock.second]
+    assert ee.emit("event", 1)
+    ee.remove_listener("event", mock.third)
+    ee.remove_listener("event", mock.first)
+    assert ee.listeners("event") == [mock.second]
+    assert ee.emit("event", 2)
+    ee.remove_listener("event", mock.second)
+    assert not ee.has_listeners("event")
+    assert not ee.emit("event", 3)
+    assert mock.mock_calls == [
+        call.third(1),
+        call.first(1),
+        call.second(1),
+        call.second(2),
+    ]
+
+
+def test_reuse_after_removing_every_listener(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method)
+    ee.on("other", mock.other)
+    ee.remove_all_listeners()
+    assert ee.event_names() == []
+    assert not ee.emit("event", 1)
+    ee.remove_all_listeners("event")
+    ee.remove_listener("event", mock.method)
+    ee.on("event", mock.method)
+    assert ee.emit("event", 2)
+    ee.remove_all_listeners("event")
+    assert ee.event_names() == []
+    ee.on("other", mock.other)
+    assert ee.emit("other", 3)
+    assert mock.mock_calls == [call.method(2), call.other(3)]
+
+
+@pytest.mark.asyncio
+async def test_events_iterates_emits(ee_with_event_loop: EventEmitter) -> None:
+    received = []
+    async with ee_with_event_loop.events("data") as events:
+        assert ee_with_event_loop.listener_count("data") == 1
+        ee_with_event_loop.emit("data", 1)
+        ee_with_event_loop.emit("data", 2, 3)
+        assert events.qsize() == 2
+        async for args in events:
+            received.append(args)
+            if len(received) == 3:
+                break
+            if len(received) == 2:
+                ee_with_event_loop.emit("data", 4)
+    assert received == [(1,), (2, 3), (4,)]
+    assert ee_with_event_loop.listener_count("data") == 0
+    assert not ee_with_event_loop.emit("data", 5)
+
+
+@pytest.mark.asyncio
+async def test_events_waits_for_emits(ee_with_event_loop: EventEmitter) -> None:
+    events = ee_with_event_loop.events("data")
+    ee_with_event_loop._loop.call_later(0.01, ee_with_event_loop.emit, "data", 1)
+    assert await events.__anext__() == (1,)
+    ee_with_event_loop._loop.call_later(0.01, events.close)
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert ee_with_event_loop.listener_count("data") == 0
+
+
+@pytest.mark.asyncio
+async def test_events_drop_policies(ee_with_event_loop: EventEmitter) -> None:
+    oldest = ee_with_event_loop.events("data", maxsize=2, overflow="drop_oldest")
+    newest = ee_with_event_loop.events("data", maxsize=2, overflow="drop_newest")
+    for arg in range(4):
+        ee_with_event_loop.emit("data", arg)
+    assert [await oldest.__anext__() for _ in range(2)] == [(2,), (3,)]
+    assert [await newest.__anext__() for _ in range(2)] == [(0,), (1,)]
+    assert oldest.dropped == 2
+    assert newest.dropped == 2
+    await oldest.aclose()
+    await newest.aclose()
+    assert ee_with_event_loop.listener_count("data") == 0
+
+
+@pytest.mark.asyncio
+async def test_events_block_policy(ee_with_event_loop: EventEmitter) -> None:
+    events = ee_with_event_loop.events("data", maxsize=1)
+    await ee_with_event_loop.emit_async("data", 0)
+    producer = ensure_future(ee_with_event_loop.emit_async("data", 1))
+    await sleep(0)
+    assert not producer.done()
+    assert events.qsize() == 1
+    assert await events.__anext__() == (0,)
+    await producer
+    assert await events.__anext__() == (1,)
+    assert events.dropped == 0
+    events.close()
+
+
+@pytest.mark.asyncio
+async def test_events_block_policy_bounds_emits_waiting_for_room(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    events = ee_with_event_loop.events("data", maxsize=2)
+    for arg in range(6):
+        ee_with_event_loop.emit("data", arg)
+    assert events.qsize() == 2
+    assert events.dropped == 2
+    assert [await events.__anext__() for _ in range(4)] == [(0,), (1,), (2,), (3,)]
+    assert events.qsize() == 0
+    events.close()
+
+
+def test_events_validation(ee: EventEmitter) -> None:
+    with pytest.raises(ValueError):
+        ee.events("data", overflow="sometimes")
+    assert not ee.has_listeners("data")
+
+
+@pytest.mark.asyncio
+async def test_wait_for(ee_with_event_loop: EventEmitter) -> None:
+    first = ensure_future(ee_with_event_loop.wait_for("load"))
+    second = ensure_future(ee_with_event_loop.wait_for("load"))
+    await sleep(0)
+    assert ee_with_event_loop.listener_count("load") == 1
+    assert ee_with_event_loop.emit("load", "a", 1)
+    assert await first == ("a", 1)
+    assert await second == ("a", 1)
+    assert ee_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_predicate(ee_with_event_loop: EventEmitter) -> None:
+    def is_b(url: str, status: int = 200) -> bool:
+        return url == "b"
+
+    matching = ensure_future(ee_with_event_loop.wait_for("load", is_b))
+    any_load = ensure_future(ee_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ee_with_event_loop.emit("load", "a")
+    assert await any_load == ("a",)
+    assert not matching.done()
+    assert ee_with_event_loop.listener_count("load") == 1
+    ee_with_event_loop.emit("load", "b", status=404)
+    assert await matching == ("b",)
+    assert ee_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_predicate_raising(ee_with_event_loop: EventEmitter) -> None:
+    def predicate(arg: int) -> bool:
+        raise ValueError(arg)
+
+    waiting = ensure_future(ee_with_event_loop.wait_for("load", predicate))
+    await sleep(0)
+    ee_with_event_loop.emit("load", 1)
+    with pytest.raises(ValueError):
+        await waiting
+    assert ee_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_timeout_and_cancel(ee_with_event_loop: EventEmitter) -> None:
+    with pytest.raises(TimeoutError):
+        await ee_with_event_loop.wait_for("load", timeout=0.01)
+    assert ee_with_event_loop.listener_count("load") == 0
+
+    cancelled = ensure_future(ee_with_event_loop.wait_for("load"))
+    waiting = ensure_future(ee_with_event_loop.wait_for("load"))
+    await sleep(0)
+    cancelled.cancel()
+    await sleep(0)
+    assert ee_with_event_loop.listener_count("load") == 1
+    ee_with_event_loop.emit("load", 1)
+    assert await waiting == (1,)
+    assert cancelled.cancelled()
+    assert ee_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_remove_all_listeners(
+    ee_with_event_loop: EventEmitter,
+) -> None:
+    waiting = ensure_future(ee_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ee_with_event_loop.remove_all_listeners()
+    await sleep(0)
+    assert waiting.cancelled()
+    again = ensure_future(ee_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ee_with_event_loop.emit("load", 1)
+    assert await again == (1,)
+
+
+def test_once_listeners_removed_in_bulk(ee: EventEmitter, mock: Mock) -> None:
+    listeners = [Mock() for _ in range(100)]
+    ee.on("event", mock.method)
+    for listener in listeners:
+        ee.once("event", listener)
+    assert ee.listener_count("event") == 101
+    assert ee.emit("event", 1)
+    assert ee.listeners("event") == [mock.method]
+    assert ee.emit("event", 2)
+    for listener in listeners:
+        listener.assert_called_once_with(1)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_once_reentrant_emit(ee: EventEmitter, mock: Mock) -> None:
+    @ee.once("event")
+    def reentrant(arg: int) -> None:
+        mock.reentrant(arg)
+        ee.emit("event", arg + 1)
+
+    ee.on("event", mock.method)
+    assert ee.emit("event", 1)
+    assert mock.mock_calls == [call.reentrant(1), call.method(2), call.method(1)]
+    assert ee.listeners("event") == [mock.method]
+
+
+def test_remove_listener_cancels_once(ee: EventEmitter, mock: Mock) -> None:
+    ee.once("event", mock.first)
+    ee.once("event", mock.second)
+    ee.remove_listener("event", mock.first)
+    assert ee.emit("event", 1)
+    assert mock.mock_calls == [call.second(1)]
+    assert not ee.has_listeners("event")
+
+
+def test_once_with_emit_many_and_raising_emit(ee: EventEmitter, mock: Mock) -> None:
+    ee.on("event", mock.method)
+    ee.once("event", mock.once)
+    assert ee.emit_many("event", [(1,), (2,)])
+    ee.once("event", mock.raising)
+    assert ee.raising_emit("event", 3)
+    assert ee.raising_emit("event", 4)
+    assert mock.mock_calls == [
+        call.method(1),
+        call.once(1),
+        call.method(2),
+        call.method(3),
+        call.raising(3),
+        call.method(4),
+    ]
+
+
+def test_once_pattern_listener(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.once("Network.*", mock.pattern)
+    ee.once("Network.request", mock.exact)
+    ee.on("Network.request", mock.method)
+    assert ee.emit("Network.request", 1)
+    assert ee.emit("Network.request", 2)
+    assert mock.mock_calls == [
+        call.exact(1),
+        call.method(1),
+        call.pattern(1),
+        call.method(2),
+    ]
+    assert ee.event_names() == ["Network.request"]
+
+
+def test_subscription(ee: EventEmitter, mock: Mock) -> None:
+    subscription = ee.on("event", mock.method, subscription=True)
+    assert isinstance(subscription, Subscription)
+    assert subscription.event == "event"
+    assert not subscription.disposed
+    assert ee.emit("event", 1)
+    subscription.dispose()
+    assert subscription.disposed
+    subscription.dispose()
+    assert not ee.emit("event", 2)
+    mock.method.assert_called_once_with(1)
+
+    with ee.once("event", mock.once, subscription=True):
+        assert ee.listeners("event") == [mock.once]
+    assert not ee.has_listeners("event")
+
+
+def test_subscription_weak(ee: EventEmitter) -> None:
+    class Listener:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def method(self, arg: int) -> None:
+            self.calls += 1
+
+    listener = Listener()
+    subscription = ee.on("event", listener.method, weak=True, subscription=True)
+    assert ee.emit("event", 1)
+    subscription.dispose()
+    assert not ee.has_listeners("event")
+    assert listener.calls == 1
+
+
+def test_listener_group(ee: EventEmitter, mock: Mock) -> None:
+    other = EventEmitter(loop=ee._loop)
+    group = ListenerGroup()
+    ee.on("event", mock.kept)
+    group.on(ee, "event", mock.method)
+    group.once(ee, "other", mock.once, priority=1)
+    group.on(other, "event", mock.other, is_async=False)
+    group.add(other.prepend_listener("event", mock.added, subscription=True))
+    assert len(group) == 4
+    assert other.listeners("event") == [mock.added, mock.other]
+    group.dispose()
+    assert len(group) == 0
+    assert ee.listeners("event") == [mock.kept]
+    assert not ee.has_listeners("other")
+    assert other.event_names() == []
+
+
+@pytest.mark.asyncio
+async def test_listener_group_context_managers(
+    ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    with ListenerGroup() as group:
+        group.on(ee_with_event_loop, "event", mock.method)
+        assert ee_with_event_loop.emit("event", 1)
+    assert not ee_with_event_loop.has_listeners("event")
+    async with ListenerGroup() as group:
+        group.on(ee_with_event_loop, "event", mock.method)
+        assert ee_with_event_loop.emit("event", 2)
+    assert not ee_with_event_loop.has_listeners("event")
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_replay(ee: EventEmitter, mock: Mock) -> None:
+    ee.configure_event("config", replay=2)
+    assert not ee.emit("config", 1)
+    assert not ee.emit("config", 2, data=3)
+    ee.on("config", mock.early)
+    assert ee.emit("config", 4)
+    ee.on("config", mock.late, replay=True)
+    ee.on("config", mock.not_replayed)
+    assert mock.mock_calls == [
+        call.early(4),
+        call.late(2, data=3),
+        call.late(4),
+    ]
+    mock.reset_mock()
+    ee.once("config", mock.once, replay=True)
+    assert ee.listeners("config") == [mock.early, mock.late, mock.not_replayed]
+    mock.once.assert_called_once_with(4)
+    ee.once("other", mock.other, replay=True)
+    assert ee.listeners("other") == [mock.other]
+    mock.other.assert_not_called()
+
+
+def test_replay_reconfigure(ee: EventEmitter, mock: Mock) -> None:
+    ee.configure_event("config", replay=3)
+    for arg in range(3):
+        ee.emit("config", arg)
+    ee.configure_event("config", replay=2)
+    ee.on("config", mock.method, replay=True)
+    assert mock.method.mock_calls == [call(1), call(2)]
+    ee.configure_event("config", replay=None)
+    ee.emit("config", 3)
+    ee.on("config", mock.other, replay=True)
+    mock.other.assert_not_called()
+    with pytest.raises(ValueError):
+        ee.configure_event("config", replay=0)
+
+
+def test_replay_emit_variants(ee: EventEmitter, mock: Mock) -> None:
+    ee.configure_event("ready", replay=5)
+    ee.on("ready", mock.method)
+    ee.raising_emit("ready", 1)
+    ee.emit_many("ready", [(2,), (3,)])
+    ee.remove_listener("ready", mock.method)
+    ee.raising_emit("ready", 4)
+    ee.emit_many("ready", [(5,)])
+    ee.on("ready", mock.replayed, replay=True)
+    assert mock.replayed.mock_calls == [call(arg) for arg in range(1, 6)]
+
+
+def test_replay_errors(ee: EventEmitter, error_helper: "EEExceptionHelper") -> None:
+    ee.configure_event("ready", replay=1)
+    ee.emit("ready", 1)
+    ee.on("error", error_helper.error_listener)
+    ee.on("ready", error_helper.error_raiser, replay=True)
+    error_helper.assert_error_was_emitted()
+
+
+def test_replay_wildcard(mock: Mock) -> None:
+    ee = EventEmitter(wildcard=True)
+    ee.configure_event("Network.ready", replay=1)
+    ee.on("Network.*", mock.pattern)
+    assert ee.emit("Network.ready", 1)
+    ee.on("Network.ready", mock.method, replay=True)
+    assert mock.mock_calls == [call.pattern(1), call.method(1)]
+
+
+@pytest.mark.asyncio
+async def test_bridge(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    here, there = bridge_pipe()
+    with EventBridge(ee_with_event_loop, here) as bridge, EventBridge(
+        remote, there
+    ) as remote_bridge:
+        ee_with_event_loop.emit("data", 0)
+        remote.on("data", mock.method)
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        assert ee_with_event_loop.listener_count("data") == 1
+        assert ee_with_event_loop.listener_count("other") == 0
+        received = ensure_future(remote.wait_for("data", lambda arg, **kw: arg == 2))
+        for arg in range(1, 3):
+            ee_with_event_loop.emit("data", arg, key=arg)
+        assert len(bridge._batch) == 2
+        await received
+        assert mock.method.mock_calls == [call(1, key=1), call(2, key=2)]
+        remote_bridge.unsubscribe("data")
+        await sleep(0.01)
+        assert ee_with_event_loop.listener_count("data") == 0
+    assert here.closed and there.closed
+
+
+@pytest.mark.asyncio
+async def test_bridge_does_not_echo(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    here, there = bridge_pipe()
+    with EventBridge(ee_with_event_loop, here, 0) as bridge, EventBridge(
+        remote, there, 0
+    ) as remote_bridge:
+        ee_with_event_loop.on("data", mock.local)
+        remote.on("data", mock.remote)
+        bridge.subscribe("data")
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        ee_with_event_loop.emit("data", 1)
+        await sleep(0.01)
+        remote.emit("data", 2)
+        await sleep(0.01)
+    assert mock.mock_calls == [
+        call.local(1),
+        call.remote(1),
+        call.remote(2),
+        call.local(2),
+    ]
+    assert ee_with_event_loop.listener_count("data") == 1
+
+
+@pytest.mark.asyncio
+async def test_bridge_reports_unreadable_messages(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    here, there = bridge_pipe()
+    there.send_bytes(b"not a pickle")
+    event_loop.set_exception_handler(mock.handler)
+    try:
+        with EventBridge(ee_with_event_loop, here, 0) as bridge, EventBridge(
+            remote, there, 0
+        ):
+            ee_with_event_loop.on("data", mock.method)
+            bridge.subscribe("data")
+            await sleep(0.01)
+            remote.emit("data", 1)
+            await sleep(0.01)
+            remote.emit("data", 2)
+            await sleep(0.01)
+    finally:
+        event_loop.set_exception_handler(None)
+    assert mock.method.mock_calls == [call(1), call(2)]
+    assert len(mock.handler.mock_calls) == 1
+    assert mock.handler.call_args[0][1]["message"] == (
+        "EventBridge failed to handle a message"
+    )
+    assert not bridge._incoming
+
+
+def bridge_worker(connection: Connection, size: int) -> None:
+    """Exchanges a large emit with the test process, both sides flushing at once"""
+
+    async def exchange() -> None:
+        ee = EventEmitter(loop=get_running_loop())
+        received = ensure_future(ee.wait_for("from_parent"))
+        bridge = EventBridge(ee, connection, 0)
+        bridge.subscribe("from_parent")
+        while not ee.has_listeners("from_worker"):
+            await sleep(0.001)
+        ee.emit("from_worker", b"w" * size)
+        (payload,) = await wait_for(received, 30)
+        assert payload == b"p" * size
+        # the test process closes its end once it received the emit
+        while not connection.closed:
+            await sleep(0.001)
+
+    run(exchange())
+
+
+@pytest.mark.asyncio
+async def test_bridge_spawned_process_large_emits(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter
+) -> None:
+    size = 4 * 1024 * 1024
+    here, there = bridge_pipe()
+    process = get_context("spawn").Process(target=bridge_worker, args=(there, size))
+    process.start()
+    there.close()
+    received = ensure_future(ee_with_event_loop.wait_for("from_worker"))
+    with EventBridge(ee_with_event_loop, here, 0) as bridge:
+        bridge.subscribe("from_worker")
+        while not ee_with_event_loop.has_listeners("from_parent"):
+            await sleep(0.001)
+        ee_with_event_loop.emit("from_parent", b"p" * size)
+        (payload,) = await wait_for(received, 30)
+        assert payload == b"w" * size
+    await event_loop.run_in_executor(None, process.join, 30)
+    assert process.exitcode == 0
+    assert here.closed
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    received = []
+    kept = []
+
+    def listener(*args, **kwargs) -> None:
+        received.append((args, kwargs))
+        if kwargs.get("keep"):
+            kept.append(args[0].retain())
+
+    remote.on("data", listener)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ee_with_event_loop, here, 0, shared_memory_threshold=1024
+    ) as bridge, EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        large = bytes(range(256)) * 16
+        ee_with_event_loop.emit("data", large, b"small", keep=True)
+        ee_with_event_loop.emit("data", array("d", range(512)), bytearray(large))
+        await sleep(0.01)
+        (payload, small), kwargs = received[0]
+        assert isinstance(payload, SharedPayload) and kwargs == {"keep": True}
+        assert small == b"small"
+        assert kept == [payload] and not payload.released
+        assert payload.tobytes() == large
+        doubles, copied = received[1][0]
+        assert doubles.released and copied.released
+        assert len(bridge._pool) == 3
+        ee_with_event_loop.emit("data", large, large)
+        await sleep(0.01)
+        assert len(bridge._pool) == 3
+        payload.release()
+        await sleep(0.01)
+        assert payload.released
+        assert len(bridge._pool) == 3
+    assert len(bridge._pool) == 0
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory_unmaps_destroyed_segments(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter, mock: Mock
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    remote.on("data", mock.method)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ee_with_event_loop, here, 0, shared_memory_threshold=0
+    ) as bridge, EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        for _ in range(3):
+            for arg in range(10):
+                ee_with_event_loop.emit("data", bytes([arg]) * 64)
+            await sleep(0.02)
+            assert len(bridge._pool) == bridge._pool.max_free
+            assert len(remote_bridge._segments._segments) == bridge._pool.max_free
+    assert len(mock.method.mock_calls) == 30
+
+
+def shared_memory_worker(connection: Connection) -> None:
+    """Shares a buffer with the test process, destroying its segment once released"""
+    pool = SegmentPool()
+    connection.send(pool.share(b"shared" * 1024))
+    pool.release(connection.recv())
+    pool.close()
+    connection.send("closed")
+
+
+@pytest.mark.parametrize("start_method", ["spawn", "fork"])
+def test_shared_memory_segments_of_child_processes(start_method: str) -> None:
+    tracker = tracker_id()
+    here, there = Pipe()
+    process = get_context(start_method).Process(
+        target=shared_memory_worker, args=(there,)
+    )
+    process.start()
+    there.close()
+    handle = here.recv()
+    assert handle.pid == process.pid
+    assert handle.tracker == tracker
+    cache = SegmentCache()
+    with patch.object(
+        resource_tracker, "unregister", wraps=resource_tracker.unregister
+    ) as unregister:
+        payload = cache.receive(handle, here.send)
+    # the shared tracker keeps tracking the segment for the child
+    unregister.assert_not_called()
+    assert payload.tobytes() == b"shared" * 1024
+    payload.release()
+    cache.close()
+    assert here.recv() == "closed"
+    process.join(30)
+    assert process.exitcode == 0
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(handle.name)
+    here.close()
+
+
+def test_shared_memory_segments_of_other_trackers() -> None:
+    pool = SegmentPool()
+    handle = pool.share(b"data")
+    assert handle.pid == os.getpid()
+    foreign = SharedHandle(
+        handle.name, handle.nbytes, handle.format, handle.shape, 0, (0, 0)
+    )
+    own, other = SegmentCache(), SegmentCache()
+    with patch.object(resource_tracker, "unregister") as unregister:
+        own.receive(handle, pool.release).release()
+        unregister.assert_not_called()
+        other.receive(foreign, pool.release).release()
+    own.close()
+    other.close()
+    if sys.version_info < (3, 13):
+        unregister.assert_called_once()
+        assert unregister.call_args[0][1] == "shared_memory"
+    else:
+        unregister.assert_not_called()
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory_formats(
+    event_loop: AbstractEventLoop, ee_with_event_loop: EventEmitter
+) -> None:
+    remote = EventEmitter(loop=event_loop)
+    views = []
+
+    def listener(payload: SharedPayload) -> None:
+        views.append((payload.view.format, payload.view.tolist()))
+
+    remote.on("data", listener)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ee_with_event_loop, here, 0, shared_memory_threshold=0
+    ), EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        ee_with_event_loop.emit("data", array("d", [1.5, 2.5]))
+        ee_with_event_loop.emit("data", memoryview(b"ab"))
+        await sleep(0.01)
+    assert views == [("d", [1.5, 2.5]), ("B", [97, 98])]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compiled", [False, True])
+async def test_eager_listeners(
+    event_loop: AbstractEventLoop, compiled: bool, mock: Mock
+) -> None:
+    ee = EventEmitter(loop=event_loop, compiled=compiled, tracked=True, eager=True)
+    gate = event_loop.create_future()
+
+    async def cached(arg: int) -> None:
+        mock.cached(arg)
+
+    async def suspending(arg: int) -> str:
+        mock.before(arg)
+        value = await gate
+        mock.after(arg, value)
+        return value
+
+    ee.on("data", cached)
+    ee.on("data", suspending)
+    ee.emit("data", 1)
+    assert mock.mock_calls == [call.cached(1), call.before(1)]
+    assert ee.pending_count() == 1
+    gate.set_result("value")
+    assert await ee.drain(1)
+    assert mock.mock_calls[-1] == call.after(1, "value")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compiled", [False, True])
+async def test_eager_listener_errors(
+    event_loop: AbstractEventLoop, compiled: bool
+) -> None:
+    ee = EventEmitter(loop=event_loop, compiled=compiled, eager=True)
+    errors = []
+
+    async def fails_now() -> None:
+        raise ValueError("now")
+
+    async def fails_later() -> None:
+        await sleep(0)
+        raise ValueError("later")
+
+    ee.on("error", errors.append)
+    ee.on("data", fails_now)
+    ee.on("data", fails_later)
+    ee.emit("data")
+    await sleep(0.01)
+    assert [str(error) for error in errors] == ["now", "later"]
+
+
+@pytest.mark.asyncio
+async def test_eager_listeners_run_in_their_own_task_and_context(
+    event_loop: AbstractEventLoop,
+) -> None:
+    ee = EventEmitter(loop=event_loop, eager=True)
+    variable: ContextVar[str] = ContextVar("variable", default="caller")
+    seen = []
+
+    async def listener() -> None:
+        variable.set("listener")
+        seen.append(current_task())
+        # uses asyncio.timeout, which needs a task, on Python 3.12+
+        await wait_for(sleep(0), 1)
+
+    ee.on("data", listener)
+    caller = current_task()
+    ee.emit("data")
+    event_loop.call_soon(ee.emit, "data")
+    await sleep(0.01)
+    assert len(seen) == 2
+    assert caller not in seen and None not in seen
+    assert variable.get() == "caller"
+    assert ee.pending_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_eager_listener_cancelled(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ee = EventEmitter(loop=event_loop, tracked=True, eager=True)
+
+    async def waiting() -> None:
+        try:
+            await event_loop.create_future()
+        except CancelledError:
+            mock.cancelled()
+            raise
+
+    ee.on("data", waiting)
+    ee.emit("data")
+    assert ee.pending_count() == 1
+    await ee.aclose()
+    mock.cancelled.assert_called_once_with()
+    assert ee.pending_count() == 0
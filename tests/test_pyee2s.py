@@ -1,12 +1,45 @@
-from asyncio import AbstractEventLoop, Future
+import gc
+import os
+import sys
+from array import array
+from asyncio import (
+    AbstractEventLoop,
+    CancelledError,
+    Future,
+    TimeoutError,
+    current_task,
+    ensure_future,
+    get_running_loop,
+    run,
+    sleep,
+    wait_for,
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from multiprocessing import Pipe, get_context, resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from threading import Thread, current_thread
 from typing import Callable, TYPE_CHECKING
+from weakref import ref
 import pytest
-from mock import Mock
-
-from pyee2 import EventEmitterS
+from mock import Mock, call, patch
+
+from pyee2 import (
+    EventBridge,
+    EventEmitterS,
+    ListenerGroup,
+    SharedPayload,
+    Subscription,
+    bridge_pipe,
+    event_token,
+)
+from pyee2.eventemitter import MATCH_CACHE_SIZE
+from pyee2.sharedmem import SegmentCache, SegmentPool, SharedHandle, tracker_id
 
 if TYPE_CHECKING:
-    from .conftest import EEExceptionHelper
+    from .conftest import EEExceptionHelper, FakeClockLoop
 
 
 def test_get_listeners_registered_for_event(
@@ -404,3 +437,1819 @@ async def test_coroutine_listener_once_decorator_does_not_emits_error_when_not_l
     await error_helper.assert_error_was_not_emitted_async()
     assert ees_with_event_loop.listener_count("event") == 0
     assert ees_with_event_loop.listener_count("error") == 0
+
+
+def test_listener_added_during_emit_is_not_called(ees: EventEmitterS, mock: Mock) -> None:
+    def adder(*args, **kwargs) -> None:
+        ees.on("event", mock.method)
+
+    ees.on("event", adder)
+    assert ees.emit("event", 1)
+    mock.method.assert_not_called()
+    assert ees.listener_count("event") == 2
+    assert ees.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+
+
+def test_listener_removed_during_emit_is_still_called(
+    ees: EventEmitterS, mock: Mock
+) -> None:
+    def remover(*args, **kwargs) -> None:
+        ees.remove_all_listeners("event")
+
+    ees.on("event", remover)
+    ees.on("event", mock.method)
+    assert ees.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+    assert ees.listener_count("event") == 0
+    assert not ees.emit("event", 1)
+
+
+def test_declared_sync_listener(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method, is_async=False)
+    assert ees.listener_count("event") == 1
+    assert mock.method is ees.listeners("event")[0]
+    assert ees.emit("event", 1, data=2)
+    mock.method.assert_called_with(1, data=2)
+
+
+def test_declared_sync_listener_decorator_emits_error_when_listening_for_errors(
+    ees: EventEmitterS, error_helper: "EEExceptionHelper"
+) -> None:
+    @ees.on("event", is_async=False)
+    def handler(*args, **kwargs) -> None:
+        error_helper.error_raiser(*args, **kwargs)
+
+    ees.on("error", error_helper.error_listener)
+    assert ees.emit("event", 1, data=2)
+    error_helper.assert_error_was_emitted()
+
+
+def test_listeners_are_called_in_registration_order_whatever_their_lane(
+    ees: EventEmitterS, mock: Mock
+) -> None:
+    def unclassified(*args, **kwargs) -> None:
+        mock.unclassified(*args, **kwargs)
+
+    ees.on("event", mock.coroutine, is_async=True)
+    ees.on("event", unclassified)
+    ees.on("event", mock.sync, is_async=False)
+    assert ees.listeners("event") == [mock.coroutine, unclassified, mock.sync]
+    assert ees.emit("event", 1)
+    assert [call[0] for call in mock.mock_calls] == [
+        "coroutine",
+        "unclassified",
+        "sync",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_callable_object_listener(
+    ees_with_event_loop: EventEmitterS, mock: Mock, deferred: Future
+) -> None:
+    class Handler:
+        async def __call__(self, *args, **kwargs) -> None:
+            mock.method(*args, **kwargs)
+            deferred.set_result(True)
+
+    handler = Handler()
+    ees_with_event_loop.on("event", handler)
+    assert ees_with_event_loop.emit("event", 1, data=2)
+    assert await deferred
+    mock.method.assert_called_with(1, data=2)
+
+
+@pytest.mark.asyncio
+async def test_function_returning_awaitable_listener(
+    ees_with_event_loop: EventEmitterS, mock: Mock, deferred: Future
+) -> None:
+    async def handler(*args, **kwargs) -> None:
+        mock.method(*args, **kwargs)
+        deferred.set_result(True)
+
+    ees_with_event_loop.on("event", lambda *args, **kwargs: handler(*args, **kwargs))
+    assert ees_with_event_loop.emit("event", 1, data=2)
+    assert await deferred
+    mock.method.assert_called_with(1, data=2)
+
+
+@pytest.mark.parametrize("count", [0, 1, 8, 9, 20])
+def test_compiled_dispatch_calls_every_listener_in_order(
+    mock: Mock, count: int
+) -> None:
+    ees = EventEmitterS(compiled=True)
+    calls = []
+    for idx in range(count):
+        ees.on("event", partial(calls.append, idx), is_async=False)
+        ees.on("event", partial(calls.append, -idx))
+    ees.on("event", mock.method)
+    assert ees.emit("event")
+    assert ees.emit("event")
+    mock.method.assert_called_with()
+    expected = [arg for idx in range(count) for arg in (idx, -idx)]
+    assert calls == expected + expected
+
+
+def test_compiled_dispatch_is_invalidated_by_error_listeners(
+    error_helper: "EEExceptionHelper",
+) -> None:
+    ees = EventEmitterS(compiled=True)
+    ees.on("event", error_helper.error_raiser)
+    assert ees.emit("event")
+    error_helper.assert_error_was_not_emitted()
+    ees.on("error", error_helper.error_listener)
+    assert ees.emit("event")
+    error_helper.assert_error_was_emitted()
+    ees.remove_all_listeners("error")
+    error_helper.emitted_exception = None
+    assert ees.emit("event")
+    error_helper.assert_error_was_not_emitted()
+
+
+def test_compiled_dispatch_is_invalidated_by_listener_changes(mock: Mock) -> None:
+    ees = EventEmitterS(compiled=True)
+    ees.on("event", mock.first)
+    assert ees.emit("event", 1)
+    ees.once("event", mock.second)
+    assert ees.emit("event", 2)
+    assert ees.emit("event", 3)
+    ees.remove_listener("event", mock.first)
+    assert not ees.emit("event", 4)
+    assert mock.mock_calls == [
+        call.first(1),
+        call.first(2),
+        call.second(2),
+        call.first(3),
+    ]
+
+
+def test_emit_many(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.first)
+    ees.on("event", mock.second)
+    assert ees.emit_many("event", [(1,), (2, 3), ()])
+    assert mock.mock_calls == [
+        call.first(1),
+        call.second(1),
+        call.first(2, 3),
+        call.second(2, 3),
+        call.first(),
+        call.second(),
+    ]
+    assert not ees.emit_many("other", [(1,)])
+
+
+def test_emit_many_kwargs(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method)
+    assert ees.emit_many_kwargs("event", [((1,), {"data": 2}), ((), {"data": 3})])
+    assert mock.method.mock_calls == [call(1, data=2), call(data=3)]
+
+
+def test_emit_many_once(ees: EventEmitterS, mock: Mock) -> None:
+    ees.once("event", mock.once)
+    ees.on("event", mock.on)
+    assert ees.emit_many("event", [(1,), (2,)])
+    assert mock.mock_calls == [call.once(1), call.on(1), call.on(2)]
+    ees.once("event", mock.once)
+    ees.remove_all_listeners("event")
+    assert not ees.emit_many("event", [(3,)])
+    mock.once.assert_called_once_with(1)
+
+
+def test_emit_many_stops_when_listeners_are_removed(
+    ees: EventEmitterS, mock: Mock
+) -> None:
+    def remover(arg) -> None:
+        mock.method(arg)
+        if arg == 2:
+            ees.remove_all_listeners("event")
+
+    ees.on("event", remover)
+    assert ees.emit_many("event", [(1,), (2,), (3,)])
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_emit_many_emits_error_when_listening_for_errors(
+    ees: EventEmitterS, mock: Mock
+) -> None:
+    exception = Exception("An exception was raised")
+
+    def raiser(arg) -> None:
+        if arg == 1:
+            raise exception
+        mock.method(arg)
+
+    ees.on("event", raiser)
+    ees.on("error", mock.error)
+    assert ees.emit_many("event", [(1,), (2,)])
+    mock.error.assert_called_once_with(exception)
+    mock.method.assert_called_once_with(2)
+
+
+def test_raising_emit_many(ees: EventEmitterS, mock: Mock) -> None:
+    exception = Exception("An exception was raised")
+
+    def raiser(arg) -> None:
+        if arg == 2:
+            raise exception
+        mock.method(arg)
+
+    ees.on("event", raiser)
+    ees.on("error", mock.error)
+    with pytest.raises(Exception) as raised:
+        ees.raising_emit_many("event", [(1,), (2,), (3,)])
+    assert raised.value is exception
+    mock.method.assert_called_once_with(1)
+    mock.error.assert_not_called()
+    with pytest.raises(Exception):
+        ees.raising_emit_many_kwargs("event", [((2,), {})])
+
+
+@pytest.mark.asyncio
+async def test_emit_async(ees_with_event_loop: EventEmitterS, mock: Mock) -> None:
+    async def handler(arg, data=None) -> int:
+        await sleep(0)
+        mock.coroutine(arg, data=data)
+        return arg + data
+
+    ees_with_event_loop.on("event", handler)
+    ees_with_event_loop.on("event", lambda arg, data=None: arg * data)
+    results = await ees_with_event_loop.emit_async("event", 2, data=3)
+    assert results == [5, 6]
+    mock.coroutine.assert_called_once_with(2, data=3)
+    assert await ees_with_event_loop.emit_async("other") == []
+
+
+@pytest.mark.asyncio
+async def test_emit_async_results_exclude_hooks(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    ees = ees_with_event_loop
+    ees.configure_event("event", replay=1)
+    ees.enable_metrics()
+    ees.on("event", lambda arg: arg * 3)
+    assert await ees.emit_async("event", 2) == [6]
+    assert ees.emit("event", 3)
+    assert ees.stats()["event"]["emits"] == 2
+    replayed = []
+    ees.on("event", replayed.append, replay=True)
+    assert replayed == [3]
+
+
+@pytest.mark.asyncio
+async def test_emit_async_emits_error_when_listening_for_errors(
+    ees_with_event_loop: EventEmitterS, error_helper: "EEExceptionHelper", mock: Mock
+) -> None:
+    ees_with_event_loop.on("event", error_helper.error_raiser)
+    ees_with_event_loop.on("event", error_helper.error_raiser_async)
+    ees_with_event_loop.on("error", mock.error)
+    results = await ees_with_event_loop.emit_async("event", 1, data=2)
+    assert results == [error_helper.exception, error_helper.exception]
+    assert mock.error.mock_calls == [
+        call(error_helper.exception),
+        call(error_helper.exception),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_emit_async_max_concurrency(ees_with_event_loop: EventEmitterS) -> None:
+    running = 0
+    most_running = 0
+
+    async def handler(arg) -> int:
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await sleep(0)
+        running -= 1
+        return arg
+
+    for _ in range(10):
+        ees_with_event_loop.on("event", partial(handler))
+    results = await ees_with_event_loop.emit_async("event", 1, max_concurrency=3)
+    assert results == [1] * 10
+    assert most_running == 3
+
+
+@pytest.mark.asyncio
+async def test_tracked_drain(event_loop: AbstractEventLoop, mock: Mock) -> None:
+    ees = EventEmitterS(loop=event_loop, tracked=True)
+
+    async def handler(arg) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ees.on("event", handler)
+    assert ees.pending_count() == 0
+    assert ees.emit("event", 1)
+    assert ees.emit("event", 2)
+    assert ees.pending_count() == 2
+    assert await ees.drain()
+    assert ees.pending_count() == 0
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+@pytest.mark.asyncio
+async def test_tracked_aclose_cancels_pending(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ees = EventEmitterS(loop=event_loop, tracked=True)
+
+    async def handler() -> None:
+        await sleep(10)
+        mock.method()
+
+    ees.on("event", handler)
+    ees.on("error", mock.error)
+    assert ees.emit("event")
+    assert not await ees.drain(timeout=0.01)
+    assert ees.pending_count() == 1
+    await ees.aclose()
+    assert ees.pending_count() == 0
+    mock.method.assert_not_called()
+    mock.error.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_drop(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ees = EventEmitterS(loop=event_loop, tracked=True, high_water_mark=2, overflow="drop")
+
+    async def handler(arg) -> None:
+        mock.method(arg)
+
+    ees.on("event", handler)
+    for arg in range(4):
+        assert ees.emit("event", arg)
+    assert ees.pending_count() == 2
+    assert await ees.emit_async("event", 4) == []
+    assert await ees.drain()
+    assert mock.method.mock_calls == [call(0), call(1)]
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_raise(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ees = EventEmitterS(
+        loop=event_loop, tracked=True, high_water_mark=1, overflow="raise"
+    )
+
+    async def handler() -> None:
+        mock.method()
+
+    ees.on("event", handler)
+    ees.on("error", mock.error)
+    assert ees.emit("event")
+    assert ees.emit("event")
+    assert isinstance(mock.error.call_args[0][0], RuntimeError)
+    with pytest.raises(RuntimeError):
+        ees.raising_emit("event")
+    with pytest.raises(RuntimeError):
+        await ees.emit_async("event")
+    assert await ees.drain()
+    mock.method.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_tracked_high_water_mark_block(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ees = EventEmitterS(loop=event_loop, tracked=True, high_water_mark=2)
+
+    async def handler(arg) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ees.on("event", handler)
+    for arg in range(3):
+        assert ees.emit("event", arg)
+    assert ees.pending_count() == 3
+    assert await ees.emit_async("event", 3) == [None]
+    assert mock.method.call_count >= 2
+    assert await ees.drain()
+    assert mock.method.call_count == 4
+
+
+def test_unknown_overflow_policy() -> None:
+    with pytest.raises(ValueError):
+        EventEmitterS(tracked=True, overflow="unknown")
+
+
+def test_wildcard_listeners(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Network.requestWillBeSent", mock.exact)
+    ees.on("Network.*", mock.network)
+    ees.on("*.frameNavigated", mock.navigated)
+    ees.on("**", mock.everything)
+    assert ees.emit("Network.requestWillBeSent", 1)
+    assert ees.emit("Page.frameNavigated", 2)
+    assert ees.emit("Page.lifecycle.event", 3)
+    assert mock.mock_calls == [
+        call.exact(1),
+        call.network(1),
+        call.everything(1),
+        call.navigated(2),
+        call.everything(2),
+        call.everything(3),
+    ]
+    assert ees.listeners("Network.*") == [mock.network]
+    assert ees.listener_count("Network.requestWillBeSent") == 1
+
+
+def test_wildcard_listeners_separator_and_globstar(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True, separator="/")
+    ees.on("a/**/z", mock.method)
+    assert ees.emit("a/z", 1)
+    assert ees.emit("a/b/c/z", 2)
+    assert not ees.emit("a/b/c", 3)
+    assert not ees.emit("a.z", 4)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_wildcard_match_cache_is_bounded(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Network.*", mock.method)
+    names = ["req.%d" % idx for idx in range(MATCH_CACHE_SIZE + 100)]
+    for name in names:
+        assert not ees.emit(name)
+    assert ees.emit("Network.load", 1)
+    matched = getattr(ees, "_%s__extras" % type(ees).__name__).matched
+    assert len(matched) == MATCH_CACHE_SIZE
+    assert names[0] not in matched
+    assert ees.emit("Network.load", 2)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_wildcard_listener_changes(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Page.*", mock.page)
+    assert ees.emit("Page.load", 1)
+    ees.once("Page.*", mock.once)
+    ees.on("Page.load", mock.exact)
+    assert ees.emit("Page.load", 2)
+    assert ees.emit("Page.load", 3)
+    ees.remove_listener("Page.*", mock.page)
+    assert ees.emit("Page.load", 4)
+    ees.remove_all_listeners("Page.load")
+    assert not ees.emit("Page.load", 5)
+    assert mock.mock_calls == [
+        call.page(1),
+        call.exact(2),
+        call.page(2),
+        call.once(2),
+        call.exact(3),
+        call.page(3),
+        call.exact(4),
+    ]
+
+
+def test_wildcard_disabled_by_default(mock: Mock) -> None:
+    ees = EventEmitterS()
+    ees.on("Network.*", mock.method)
+    assert not ees.emit("Network.requestWillBeSent")
+    assert ees.emit("Network.*")
+    mock.method.assert_called_once_with()
+
+
+def test_event_token(ees: EventEmitterS, mock: Mock) -> None:
+    token = ees.event_token("token event")
+    assert token == "token event"
+    assert token is event_token("token event")
+    assert event_token("other token event").slot != token.slot
+    ees.on(token, mock.first)
+    ees.on("token event", mock.second)
+    assert ees.listener_count("token event") == 2
+    slots = getattr(ees, "_%s__slots" % type(ees).__name__)
+    assert slots[token.slot] is getattr(ees, "_%s__events" % type(ees).__name__)[token]
+    assert ees.emit(token, 1)
+    assert ees.emit("token event", 2)
+    ees.remove_listener(token, mock.second)
+    assert ees.listeners("token event") == [mock.first]
+    assert mock.mock_calls == [
+        call.first(1),
+        call.second(1),
+        call.first(2),
+        call.second(2),
+    ]
+
+
+def test_event_token_slot_follows_listeners(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("late token event", mock.method)
+    ees.once("late token event", mock.once)
+    token = event_token("late token event")
+    assert ees.emit(token, 1)
+    assert ees.emit(token, 2)
+    ees.remove_listener("late token event", mock.method)
+    assert not ees.emit(token, 3)
+    ees.on(token, mock.method)
+    ees.remove_all_listeners()
+    assert not ees.emit(token, 4)
+    assert not ees.raising_emit(token, 5)
+    assert mock.mock_calls == [call.method(1), call.once(1), call.method(2)]
+
+
+def test_event_token_wildcard(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Token.*", mock.pattern)
+    ees.on(event_token("Token.event"), mock.method)
+    assert ees.emit(event_token("Token.event"), 1)
+    assert ees.emit(event_token("Token.other"), 2)
+    assert mock.mock_calls == [call.method(1), call.pattern(1), call.pattern(2)]
+
+
+class WeakHandler:
+    def __init__(self, mock: Mock) -> None:
+        self.mock = mock
+
+    def handle(self, *args, **kwargs) -> None:
+        self.mock.handle(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.mock.call(*args, **kwargs)
+
+
+def test_weak_listener_is_removed_when_collected(ees: EventEmitterS, mock: Mock) -> None:
+    handler = WeakHandler(mock)
+    ees.on("event", handler.handle, weak=True)
+    ees.on("event", handler, weak=True)
+    assert ees.listener_count("event") == 2
+    assert ees.listeners("event") == [handler.handle, handler]
+    assert ees.emit("event", 1)
+    del handler
+    gc.collect()
+    assert ees.listener_count("event") == 0
+    assert ees.listeners("event") == []
+    assert not ees.emit("event", 2)
+    assert mock.mock_calls == [call.handle(1), call.call(1)]
+
+
+def test_weak_listener_remove_listener(ees: EventEmitterS, mock: Mock) -> None:
+    handler = WeakHandler(mock)
+    ees.on("event", handler.handle, weak=True)
+    ees.once("event", handler, weak=True)
+    ees.remove_listener("event", handler.handle)
+    assert ees.listeners("event") == [handler]
+    assert ees.emit("event", 1)
+    assert ees.listener_count("event") == 0
+    assert mock.mock_calls == [call.call(1)]
+
+
+def test_weak_listener_decorator(ees: EventEmitterS, mock: Mock) -> None:
+    @ees.on("event", weak=True)
+    def handler(*args, **kwargs) -> None:
+        mock.method(*args, **kwargs)
+
+    assert ees.emit("event", 1)
+    mock.method.assert_called_once_with(1)
+    del handler
+    gc.collect()
+    assert not ees.emit("event", 2)
+
+
+@pytest.mark.asyncio
+async def test_emit_threadsafe(
+    ees_with_event_loop: EventEmitterS, event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    done = event_loop.create_future()
+
+    def handler(arg, data=None) -> None:
+        mock.method(arg, data=data)
+        if arg == 99:
+            done.set_result(True)
+
+    ees_with_event_loop.on("event", handler)
+
+    def produce() -> None:
+        for arg in range(100):
+            ees_with_event_loop.emit_threadsafe("event", arg, data=arg)
+
+    producer = Thread(target=produce)
+    producer.start()
+    await done
+    producer.join()
+    assert mock.method.mock_calls == [call(arg, data=arg) for arg in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_executor_listener(ees_with_event_loop: EventEmitterS, mock: Mock) -> None:
+    def blocking(arg, data=None) -> int:
+        mock.thread(current_thread())
+        return arg + data
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        ees_with_event_loop.on("event", blocking, executor=executor)
+        ees_with_event_loop.on("event", blocking, executor="thread")
+        assert ees_with_event_loop.listeners("event") == [blocking]
+        assert await ees_with_event_loop.emit_async("event", 1, data=2) == [3]
+        ees_with_event_loop.remove_listener("event", blocking)
+        ees_with_event_loop.once("event", blocking, executor="thread")
+        assert await ees_with_event_loop.emit_async("event", 2, data=2) == [4]
+        assert ees_with_event_loop.listener_count("event") == 0
+    ees_with_event_loop.close()
+    assert all(
+        thread is not current_thread() for ((thread,), _) in mock.thread.call_args_list
+    )
+
+
+@pytest.mark.asyncio
+async def test_executor_listener_survives_close(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    ees_with_event_loop.on("event", divmod, executor="thread")
+    assert await ees_with_event_loop.emit_async("event", 7, 2) == [(3, 1)]
+    ees_with_event_loop.close()
+    assert await ees_with_event_loop.emit_async("event", 9, 4) == [(2, 1)]
+    ees_with_event_loop.close()
+
+
+@pytest.mark.asyncio
+async def test_executor_listener_emits_error_when_listening_for_errors(
+    ees_with_event_loop: EventEmitterS, error_helper: "EEExceptionHelper", mock: Mock
+) -> None:
+    ees_with_event_loop.on("event", error_helper.error_raiser, executor="thread")
+    ees_with_event_loop.on("error", mock.error)
+    assert await ees_with_event_loop.emit_async("event") == [error_helper.exception]
+    mock.error.assert_called_once_with(error_helper.exception)
+    ees_with_event_loop.close()
+
+
+@pytest.mark.asyncio
+async def test_process_executor_listener(ees_with_event_loop: EventEmitterS) -> None:
+    ees_with_event_loop.on("event", divmod, executor="process")
+    assert await ees_with_event_loop.emit_async("event", 7, 2) == [(3, 1)]
+    ees_with_event_loop.close()
+
+
+def test_executor_listener_validation(ees: EventEmitterS) -> None:
+    async def handler() -> None:
+        pass
+
+    with pytest.raises(ValueError):
+        ees.on("event", handler, executor="thread")
+    with pytest.raises(ValueError):
+        ees.on("event", print, executor="fiber")
+    assert ees.listener_count("event") == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_latest(ees_with_event_loop: EventEmitterS, mock: Mock) -> None:
+    ees_with_event_loop.configure_event("event", coalesce="latest")
+    ees_with_event_loop.on("event", mock.method)
+    for arg in range(5):
+        assert ees_with_event_loop.emit("event", arg, data=arg)
+    mock.method.assert_not_called()
+    await sleep(0)
+    mock.method.assert_called_once_with(4, data=4)
+    assert ees_with_event_loop.emit("event", 5)
+    await sleep(0)
+    assert mock.method.call_count == 2
+    ees_with_event_loop.configure_event("event", coalesce=None)
+    assert ees_with_event_loop.emit("event", 6)
+    assert mock.method.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesce_accumulate(
+    ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    ees_with_event_loop.on("event", mock.method)
+    ees_with_event_loop.configure_event("event", coalesce="accumulate")
+    for arg in range(3):
+        assert ees_with_event_loop.emit("event", arg)
+    with pytest.raises(TypeError):
+        ees_with_event_loop.emit("event", data=1)
+    await sleep(0)
+    mock.method.assert_called_once_with([(0,), (1,), (2,)])
+
+
+def test_coalesce_debounce(fake_clock: "FakeClockLoop", mock: Mock) -> None:
+    ees = EventEmitterS(loop=fake_clock)
+    ees.configure_event("event", coalesce="debounce", interval=0.5)
+    ees.on("event", mock.method)
+    for arg in range(3):
+        assert ees.emit("event", arg)
+        fake_clock.advance(0.125)
+    fake_clock.advance(0.25)
+    mock.method.assert_not_called()
+    fake_clock.advance(0.125)
+    mock.method.assert_called_once_with(2)
+    # the timer is only rescheduled when it fires before the deadline
+    assert fake_clock.timers == 2
+
+
+def test_coalesce_throttle(fake_clock: "FakeClockLoop", mock: Mock) -> None:
+    ees = EventEmitterS(loop=fake_clock)
+    ees.configure_event("event", coalesce="throttle", interval=0.5)
+    ees.on("event", mock.method)
+    for arg in range(3):
+        assert ees.emit("event", arg)
+    mock.method.assert_called_once_with(0)
+    fake_clock.advance(0.25)
+    mock.method.assert_called_once_with(0)
+    fake_clock.advance(0.25)
+    assert mock.method.mock_calls == [call(0), call(2)]
+    assert ees.emit("event", 3)
+    assert mock.method.call_count == 2
+    fake_clock.advance(0.5)
+    assert mock.method.mock_calls == [call(0), call(2), call(3)]
+    fake_clock.advance(0.5)
+    assert ees.emit("event", 4)
+    assert mock.method.mock_calls[-1] == call(4)
+
+
+def test_configure_event_validation(ees: EventEmitterS) -> None:
+    with pytest.raises(ValueError):
+        ees.configure_event("event", coalesce="debounce")
+    with pytest.raises(ValueError):
+        ees.configure_event("event", coalesce="sometimes")
+    with pytest.raises(ValueError):
+        ees.configure_event("event", interval=0.5)
+
+
+@pytest.mark.asyncio
+async def test_configure_event_keeps_options_not_supplied(
+    ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    ees = ees_with_event_loop
+    ees.configure_event("event", coalesce="latest")
+    ees.configure_event("event", replay=2)
+    ees.on("event", mock.method)
+    for arg in range(3):
+        assert ees.emit("event", arg)
+    await sleep(0)
+    mock.method.assert_called_once_with(2)
+    ees.configure_event("event", coalesce=None)
+    assert ees.emit("event", 3)
+    assert mock.method.mock_calls == [call(2), call(3)]
+    ees.on("event", mock.replayed, replay=True)
+    assert mock.replayed.mock_calls == [call(2), call(3)]
+    ees.configure_event("event", coalesce="latest")
+    ees.configure_event("event", replay=None)
+    assert ees.emit("event", 4)
+    mock.method.assert_called_with(3)
+    await sleep(0)
+    mock.method.assert_called_with(4)
+    ees.on("event", mock.late, replay=True)
+    mock.late.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_emit_deferred(ees_with_event_loop: EventEmitterS, mock: Mock) -> None:
+    def chained(arg) -> None:
+        mock.chained(arg)
+        if arg < 3:
+            ees_with_event_loop.emit_deferred("event", arg + 1)
+
+    ees_with_event_loop.on("event", chained)
+    ees_with_event_loop.on("other", mock.other)
+    queue = ees_with_event_loop.deferred_queue()
+    drained = queue.drained
+    drains = queue.drains
+    ees_with_event_loop.emit_deferred("event", 0)
+    ees_with_event_loop.emit_deferred("other", data=1)
+    assert queue.depth == 2
+    mock.chained.assert_not_called()
+    await sleep(0)
+    assert mock.mock_calls == [
+        call.chained(0),
+        call.other(data=1),
+        call.chained(1),
+        call.chained(2),
+        call.chained(3),
+    ]
+    stats = queue.stats()
+    assert stats["depth"] == 0
+    assert stats["max_depth"] >= 2
+    assert stats["drained"] - drained == 5
+    assert stats["drains"] - drains == 1
+
+
+@pytest.mark.asyncio
+async def test_emit_deferred_max_batch(
+    ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    ees_with_event_loop.on("event", mock.method)
+    queue = ees_with_event_loop.deferred_queue()
+    queue.max_batch = 2
+    try:
+        for arg in range(5):
+            ees_with_event_loop.emit_deferred("event", arg)
+        await sleep(0)
+        assert mock.method.call_count == 2
+        await sleep(0)
+        assert mock.method.call_count == 4
+        await sleep(0)
+        assert mock.method.mock_calls == [call(arg) for arg in range(5)]
+    finally:
+        queue.max_batch = None
+
+
+def test_priority_orders_listeners(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.low, priority=-1)
+    ees.on("event", mock.first)
+    ees.on("event", mock.high, priority=10)
+    ees.on("event", mock.second)
+
+    assert ees.listeners("event") == [mock.high, mock.first, mock.second, mock.low]
+    assert ees.emit("event", 1)
+    assert mock.mock_calls == [
+        call.high(1),
+        call.first(1),
+        call.second(1),
+        call.low(1),
+    ]
+
+
+def test_priority_reregistering_listener(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.first)
+    ees.on("event", mock.second)
+    ees.on("event", mock.first)
+    assert ees.listeners("event") == [mock.first, mock.second]
+    ees.on("event", mock.second, priority=1)
+    assert ees.listeners("event") == [mock.second, mock.first]
+    assert ees.listener_count("event") == 2
+
+
+@pytest.mark.asyncio
+async def test_priority_orders_listeners_whatever_their_lane(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    ees = ees_with_event_loop
+    called = []
+
+    def coroutine(arg: int) -> Future:
+        called.append("async")
+        return ensure_future(sleep(0))
+
+    def plain(arg: int) -> None:
+        called.append("plain")
+
+    def sync(arg: int) -> None:
+        called.append("sync")
+
+    ees.on("event", sync, is_async=False, priority=-5)
+    ees.on("event", plain)
+    ees.on("event", coroutine, is_async=True, priority=10)
+    assert ees.listeners("event") == [coroutine, plain, sync]
+    assert ees.emit("event", 1)
+    assert called == ["async", "plain", "sync"]
+
+
+def test_listener_changes_rebuild_calls_once(ees: EventEmitterS, mock: Mock) -> None:
+    listeners = [Mock() for _ in range(20)]
+    for listener in listeners:
+        ees.on("event", listener)
+    table = getattr(ees, "_%s__events" % type(ees).__name__)["event"]
+    assert ees.emit("event", 1)
+    calls = table.calls
+    assert len(calls) == 20
+    for listener in listeners[:-1]:
+        ees.remove_listener("event", listener)
+    assert table.calls is None
+    ees.on("event", mock.method, priority=1)
+    assert len(table) == 2
+    assert ees.emit("event", 2)
+    assert [listener for listener, _ in table.calls] == [mock.method, listeners[-1]]
+    mock.method.assert_called_once_with(2)
+    listeners[0].assert_called_once_with(1)
+    listeners[-1].assert_has_calls([call(1), call(2)])
+
+
+def test_prepend_listener(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.first)
+    ees.prepend_listener("event", mock.prepended)
+    ees.prepend_listener("event", mock.prepended_last)
+    ees.on("event", mock.high, priority=1)
+
+    @ees.prepend_listener("event", priority=-1)
+    def low(arg: int) -> None:
+        mock.low(arg)
+
+    assert ees.emit("event", 1)
+    assert mock.mock_calls == [
+        call.high(1),
+        call.prepended_last(1),
+        call.prepended(1),
+        call.first(1),
+        call.low(1),
+    ]
+    ees.remove_listener("event", mock.prepended)
+    assert ees.listeners("event") == [mock.high, mock.prepended_last, mock.first, low]
+
+
+def test_prepend_once_listener(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.first)
+    ees.prepend_once_listener("event", mock.once)
+
+    assert ees.emit("event", 1)
+    assert ees.emit("event", 2)
+    assert mock.mock_calls == [call.once(1), call.first(1), call.first(2)]
+    assert ees.listeners("event") == [mock.first]
+
+
+def test_priority_across_patterns(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Network.*", mock.pattern)
+    ees.on("Network.request", mock.exact)
+    ees.on("**", mock.globstar, priority=1)
+
+    assert ees.emit("Network.request", 1)
+    assert mock.mock_calls == [
+        call.globstar(1),
+        call.exact(1),
+        call.pattern(1),
+    ]
+
+
+def test_metrics_disabled_by_default(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method)
+    assert not ees.metrics_enabled()
+    assert ees.emit("event", 1)
+    assert ees.stats() == {}
+
+
+def test_metrics_counts_emits_and_calls(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method)
+    ees.enable_metrics()
+    assert ees.metrics_enabled()
+    ees.once("event", mock.once)
+    assert ees.emit("event", 1)
+    assert ees.emit("event", 2)
+    assert not ees.emit("nothing", 3)
+    assert ees.listeners("event") == [mock.method]
+
+    stats = ees.stats()
+    assert list(stats) == ["event"]
+    assert stats["event"]["emits"] == 2
+    method, once = stats["event"]["listeners"]
+    assert method["listener"] is mock.method
+    assert method["calls"] == 2
+    assert method["errors"] == 0
+    assert method["duration"]["count"] == 2
+    assert sum(method["duration"]["buckets"]) == 2
+    assert method["latency"]["count"] == 0
+    assert once["listener"] is mock.once
+    assert once["calls"] == 1
+
+    ees.remove_listener("event", mock.method)
+    assert ees.listener_count("event") == 0
+    ees.disable_metrics()
+    ees.on("event", mock.method)
+    assert ees.emit("event", 3)
+    assert ees.stats()["event"]["emits"] == 2
+    mock.method.assert_has_calls([call(1), call(2), call(3)])
+
+
+def test_metrics_counts_errors(
+    ees: EventEmitterS, error_helper: "EEExceptionHelper"
+) -> None:
+    ees.enable_metrics()
+    ees.on("event", error_helper.error_raiser)
+    ees.on("error", error_helper.error_listener)
+    assert ees.emit("event", 1)
+    error_helper.assert_error_was_emitted()
+    listener = ees.stats()["event"]["listeners"][0]
+    assert listener["calls"] == 1
+    assert listener["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_async_latency(
+    ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    async def listener(arg: int) -> None:
+        await sleep(0)
+        mock.method(arg)
+
+    ees_with_event_loop.enable_metrics()
+    ees_with_event_loop.on("event", listener)
+    assert ees_with_event_loop.emit("event", 1)
+    mock.method.assert_not_called()
+    await sleep(0.01)
+    mock.method.assert_called_once_with(1)
+    stats = ees_with_event_loop.stats()["event"]["listeners"][0]
+    assert stats["listener"] is listener
+    assert stats["calls"] == 1
+    assert stats["latency"]["count"] == 1
+    assert stats["latency"]["max_ns"] >= stats["duration"]["max_ns"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_leave_scheduling_to_emit_async(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    running = []
+    overlapped = []
+
+    async def listener(arg: int, offset: int = 0) -> int:
+        overlapped.append(bool(running))
+        running.append(arg)
+        await sleep(0)
+        running.remove(arg)
+        return arg + offset
+
+    ees_with_event_loop.enable_metrics()
+    ees_with_event_loop.on("event", listener)
+    ees_with_event_loop.on("event", partial(listener, offset=1))
+    results = await ees_with_event_loop.emit_async("event", 1, max_concurrency=1)
+    assert results == [1, 2]
+    assert overlapped == [False, False]
+    listeners = ees_with_event_loop.stats()["event"]["listeners"]
+    assert [stats["latency"]["count"] for stats in listeners] == [1, 1]
+
+
+def test_metrics_do_not_keep_removed_listeners(ees: EventEmitterS, mock: Mock) -> None:
+    class Handler:
+        def on_event(self, arg: int) -> None:
+            mock.method(arg)
+
+    ees.enable_metrics()
+    handlers = []
+    for arg in range(1000):
+        handler = Handler()
+        handlers.append(ref(handler))
+        ees.on("event", handler.on_event)
+        assert ees.emit("event", arg)
+        ees.remove_listener("event", handler.on_event)
+    del handler
+    gc.collect()
+    assert not any(handler() for handler in handlers)
+    assert len(mock.method.mock_calls) == 1000
+    assert ees.stats()["event"] == {"emits": 1000, "listeners": []}
+
+
+def test_metrics_wildcard(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.on("Network.*", mock.pattern)
+    ees.enable_metrics()
+    assert ees.emit("Network.request", 1)
+    assert ees.emit("Network.request", 2)
+    stats = ees.stats()["Network.request"]
+    assert stats["emits"] == 2
+    assert stats["listeners"][0]["listener"] is mock.pattern
+    assert stats["listeners"][0]["calls"] == 2
+
+
+def test_single_listener_then_more(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.first)
+    ees.on("event", mock.first)
+    assert ees.listeners("event") == [mock.first]
+    ees.prepend_listener("event", mock.first)
+    assert ees.listeners("event") == [mock.first]
+    ees.on("event", mock.second)
+    ees.on("event", mock.third, priority=1)
+    assert ees.listeners("event") == [mock.third, mock.first, mock.second]
+    assert ees.emit("event", 1)
+    ees.remove_listener("event", mock.third)
+    ees.remove_listener("event", mock.first)
+    assert ees.listeners("event") == [mock.second]
+    assert ees.emit("event", 2)
+    ees.remove_listener("event", mock.second)
+    assert not ees.has_listeners("event")
+    assert not ees.emit("event", 3)
+    assert mock.mock_calls == [
+        call.third(1),
+        call.first(1),
+        call.second(1),
+        call.second(2),
+    ]
+
+
+def test_reuse_after_removing_every_listener(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method)
+    ees.on("other", mock.other)
+    ees.remove_all_listeners()
+    assert ees.event_names() == []
+    assert not ees.emit("event", 1)
+    ees.remove_all_listeners("event")
+    ees.remove_listener("event", mock.method)
+    ees.on("event", mock.method)
+    assert ees.emit("event", 2)
+    ees.remove_all_listeners("event")
+    assert ees.event_names() == []
+    ees.on("other", mock.other)
+    assert ees.emit("other", 3)
+    assert mock.mock_calls == [call.method(2), call.other(3)]
+
+
+@pytest.mark.asyncio
+async def test_events_iterates_emits(ees_with_event_loop: EventEmitterS) -> None:
+    received = []
+    async with ees_with_event_loop.events("data") as events:
+        assert ees_with_event_loop.listener_count("data") == 1
+        ees_with_event_loop.emit("data", 1)
+        ees_with_event_loop.emit("data", 2, 3)
+        assert events.qsize() == 2
+        async for args in events:
+            received.append(args)
+            if len(received) == 3:
+                break
+            if len(received) == 2:
+                ees_with_event_loop.emit("data", 4)
+    assert received == [(1,), (2, 3), (4,)]
+    assert ees_with_event_loop.listener_count("data") == 0
+    assert not ees_with_event_loop.emit("data", 5)
+
+
+@pytest.mark.asyncio
+async def test_events_waits_for_emits(ees_with_event_loop: EventEmitterS) -> None:
+    events = ees_with_event_loop.events("data")
+    ees_with_event_loop._loop.call_later(0.01, ees_with_event_loop.emit, "data", 1)
+    assert await events.__anext__() == (1,)
+    ees_with_event_loop._loop.call_later(0.01, events.close)
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert ees_with_event_loop.listener_count("data") == 0
+
+
+@pytest.mark.asyncio
+async def test_events_drop_policies(ees_with_event_loop: EventEmitterS) -> None:
+    oldest = ees_with_event_loop.events("data", maxsize=2, overflow="drop_oldest")
+    newest = ees_with_event_loop.events("data", maxsize=2, overflow="drop_newest")
+    for arg in range(4):
+        ees_with_event_loop.emit("data", arg)
+    assert [await oldest.__anext__() for _ in range(2)] == [(2,), (3,)]
+    assert [await newest.__anext__() for _ in range(2)] == [(0,), (1,)]
+    assert oldest.dropped == 2
+    assert newest.dropped == 2
+    await oldest.aclose()
+    await newest.aclose()
+    assert ees_with_event_loop.listener_count("data") == 0
+
+
+@pytest.mark.asyncio
+async def test_events_block_policy(ees_with_event_loop: EventEmitterS) -> None:
+    events = ees_with_event_loop.events("data", maxsize=1)
+    await ees_with_event_loop.emit_async("data", 0)
+    producer = ensure_future(ees_with_event_loop.emit_async("data", 1))
+    await sleep(0)
+    assert not producer.done()
+    assert events.qsize() == 1
+    assert await events.__anext__() == (0,)
+    await producer
+    assert await events.__anext__() == (1,)
+    assert events.dropped == 0
+    events.close()
+
+
+@pytest.mark.asyncio
+async def test_events_block_policy_bounds_emits_waiting_for_room(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    events = ees_with_event_loop.events("data", maxsize=2)
+    for arg in range(6):
+        ees_with_event_loop.emit("data", arg)
+    assert events.qsize() == 2
+    assert events.dropped == 2
+    assert [await events.__anext__() for _ in range(4)] == [(0,), (1,), (2,), (3,)]
+    assert events.qsize() == 0
+    events.close()
+
+
+def test_events_validation(ees: EventEmitterS) -> None:
+    with pytest.raises(ValueError):
+        ees.events("data", overflow="sometimes")
+    assert not ees.has_listeners("data")
+
+
+@pytest.mark.asyncio
+async def test_wait_for(ees_with_event_loop: EventEmitterS) -> None:
+    first = ensure_future(ees_with_event_loop.wait_for("load"))
+    second = ensure_future(ees_with_event_loop.wait_for("load"))
+    await sleep(0)
+    assert ees_with_event_loop.listener_count("load") == 1
+    assert ees_with_event_loop.emit("load", "a", 1)
+    assert await first == ("a", 1)
+    assert await second == ("a", 1)
+    assert ees_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_predicate(ees_with_event_loop: EventEmitterS) -> None:
+    def is_b(url: str, status: int = 200) -> bool:
+        return url == "b"
+
+    matching = ensure_future(ees_with_event_loop.wait_for("load", is_b))
+    any_load = ensure_future(ees_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ees_with_event_loop.emit("load", "a")
+    assert await any_load == ("a",)
+    assert not matching.done()
+    assert ees_with_event_loop.listener_count("load") == 1
+    ees_with_event_loop.emit("load", "b", status=404)
+    assert await matching == ("b",)
+    assert ees_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_predicate_raising(ees_with_event_loop: EventEmitterS) -> None:
+    def predicate(arg: int) -> bool:
+        raise ValueError(arg)
+
+    waiting = ensure_future(ees_with_event_loop.wait_for("load", predicate))
+    await sleep(0)
+    ees_with_event_loop.emit("load", 1)
+    with pytest.raises(ValueError):
+        await waiting
+    assert ees_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_timeout_and_cancel(ees_with_event_loop: EventEmitterS) -> None:
+    with pytest.raises(TimeoutError):
+        await ees_with_event_loop.wait_for("load", timeout=0.01)
+    assert ees_with_event_loop.listener_count("load") == 0
+
+    cancelled = ensure_future(ees_with_event_loop.wait_for("load"))
+    waiting = ensure_future(ees_with_event_loop.wait_for("load"))
+    await sleep(0)
+    cancelled.cancel()
+    await sleep(0)
+    assert ees_with_event_loop.listener_count("load") == 1
+    ees_with_event_loop.emit("load", 1)
+    assert await waiting == (1,)
+    assert cancelled.cancelled()
+    assert ees_with_event_loop.listener_count("load") == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_remove_all_listeners(
+    ees_with_event_loop: EventEmitterS,
+) -> None:
+    waiting = ensure_future(ees_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ees_with_event_loop.remove_all_listeners()
+    await sleep(0)
+    assert waiting.cancelled()
+    again = ensure_future(ees_with_event_loop.wait_for("load"))
+    await sleep(0)
+    ees_with_event_loop.emit("load", 1)
+    assert await again == (1,)
+
+
+def test_once_listeners_removed_in_bulk(ees: EventEmitterS, mock: Mock) -> None:
+    listeners = [Mock() for _ in range(100)]
+    ees.on("event", mock.method)
+    for listener in listeners:
+        ees.once("event", listener)
+    assert ees.listener_count("event") == 101
+    assert ees.emit("event", 1)
+    assert ees.listeners("event") == [mock.method]
+    assert ees.emit("event", 2)
+    for listener in listeners:
+        listener.assert_called_once_with(1)
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_once_reentrant_emit(ees: EventEmitterS, mock: Mock) -> None:
+    @ees.once("event")
+    def reentrant(arg: int) -> None:
+        mock.reentrant(arg)
+        ees.emit("event", arg + 1)
+
+    ees.on("event", mock.method)
+    assert ees.emit("event", 1)
+    assert mock.mock_calls == [call.reentrant(1), call.method(2), call.method(1)]
+    assert ees.listeners("event") == [mock.method]
+
+
+def test_remove_listener_cancels_once(ees: EventEmitterS, mock: Mock) -> None:
+    ees.once("event", mock.first)
+    ees.once("event", mock.second)
+    ees.remove_listener("event", mock.first)
+    assert ees.emit("event", 1)
+    assert mock.mock_calls == [call.second(1)]
+    assert not ees.has_listeners("event")
+
+
+def test_once_with_emit_many_and_raising_emit(ees: EventEmitterS, mock: Mock) -> None:
+    ees.on("event", mock.method)
+    ees.once("event", mock.once)
+    assert ees.emit_many("event", [(1,), (2,)])
+    ees.once("event", mock.raising)
+    assert ees.raising_emit("event", 3)
+    assert ees.raising_emit("event", 4)
+    assert mock.mock_calls == [
+        call.method(1),
+        call.once(1),
+        call.method(2),
+        call.method(3),
+        call.raising(3),
+        call.method(4),
+    ]
+
+
+def test_once_pattern_listener(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.once("Network.*", mock.pattern)
+    ees.once("Network.request", mock.exact)
+    ees.on("Network.request", mock.method)
+    assert ees.emit("Network.request", 1)
+    assert ees.emit("Network.request", 2)
+    assert mock.mock_calls == [
+        call.exact(1),
+        call.method(1),
+        call.pattern(1),
+        call.method(2),
+    ]
+    assert ees.event_names() == ["Network.request"]
+
+
+def test_subscription(ees: EventEmitterS, mock: Mock) -> None:
+    subscription = ees.on("event", mock.method, subscription=True)
+    assert isinstance(subscription, Subscription)
+    assert subscription.event == "event"
+    assert not subscription.disposed
+    assert ees.emit("event", 1)
+    subscription.dispose()
+    assert subscription.disposed
+    subscription.dispose()
+    assert not ees.emit("event", 2)
+    mock.method.assert_called_once_with(1)
+
+    with ees.once("event", mock.once, subscription=True):
+        assert ees.listeners("event") == [mock.once]
+    assert not ees.has_listeners("event")
+
+
+def test_subscription_weak(ees: EventEmitterS) -> None:
+    class Listener:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def method(self, arg: int) -> None:
+            self.calls += 1
+
+    listener = Listener()
+    subscription = ees.on("event", listener.method, weak=True, subscription=True)
+    assert ees.emit("event", 1)
+    subscription.dispose()
+    assert not ees.has_listeners("event")
+    assert listener.calls == 1
+
+
+def test_listener_group(ees: EventEmitterS, mock: Mock) -> None:
+    other = EventEmitterS(loop=ees._loop)
+    group = ListenerGroup()
+    ees.on("event", mock.kept)
+    group.on(ees, "event", mock.method)
+    group.once(ees, "other", mock.once, priority=1)
+    group.on(other, "event", mock.other, is_async=False)
+    group.add(other.prepend_listener("event", mock.added, subscription=True))
+    assert len(group) == 4
+    assert other.listeners("event") == [mock.added, mock.other]
+    group.dispose()
+    assert len(group) == 0
+    assert ees.listeners("event") == [mock.kept]
+    assert not ees.has_listeners("other")
+    assert other.event_names() == []
+
+
+@pytest.mark.asyncio
+async def test_listener_group_context_managers(
+    ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    with ListenerGroup() as group:
+        group.on(ees_with_event_loop, "event", mock.method)
+        assert ees_with_event_loop.emit("event", 1)
+    assert not ees_with_event_loop.has_listeners("event")
+    async with ListenerGroup() as group:
+        group.on(ees_with_event_loop, "event", mock.method)
+        assert ees_with_event_loop.emit("event", 2)
+    assert not ees_with_event_loop.has_listeners("event")
+    assert mock.method.mock_calls == [call(1), call(2)]
+
+
+def test_replay(ees: EventEmitterS, mock: Mock) -> None:
+    ees.configure_event("config", replay=2)
+    assert not ees.emit("config", 1)
+    assert not ees.emit("config", 2, data=3)
+    ees.on("config", mock.early)
+    assert ees.emit("config", 4)
+    ees.on("config", mock.late, replay=True)
+    ees.on("config", mock.not_replayed)
+    assert mock.mock_calls == [
+        call.early(4),
+        call.late(2, data=3),
+        call.late(4),
+    ]
+    mock.reset_mock()
+    ees.once("config", mock.once, replay=True)
+    assert ees.listeners("config") == [mock.early, mock.late, mock.not_replayed]
+    mock.once.assert_called_once_with(4)
+    ees.once("other", mock.other, replay=True)
+    assert ees.listeners("other") == [mock.other]
+    mock.other.assert_not_called()
+
+
+def test_replay_reconfigure(ees: EventEmitterS, mock: Mock) -> None:
+    ees.configure_event("config", replay=3)
+    for arg in range(3):
+        ees.emit("config", arg)
+    ees.configure_event("config", replay=2)
+    ees.on("config", mock.method, replay=True)
+    assert mock.method.mock_calls == [call(1), call(2)]
+    ees.configure_event("config", replay=None)
+    ees.emit("config", 3)
+    ees.on("config", mock.other, replay=True)
+    mock.other.assert_not_called()
+    with pytest.raises(ValueError):
+        ees.configure_event("config", replay=0)
+
+
+def test_replay_emit_variants(ees: EventEmitterS, mock: Mock) -> None:
+    ees.configure_event("ready", replay=5)
+    ees.on("ready", mock.method)
+    ees.raising_emit("ready", 1)
+    ees.emit_many("ready", [(2,), (3,)])
+    ees.remove_listener("ready", mock.method)
+    ees.raising_emit("ready", 4)
+    ees.emit_many("ready", [(5,)])
+    ees.on("ready", mock.replayed, replay=True)
+    assert mock.replayed.mock_calls == [call(arg) for arg in range(1, 6)]
+
+
+def test_replay_errors(ees: EventEmitterS, error_helper: "EEExceptionHelper") -> None:
+    ees.configure_event("ready", replay=1)
+    ees.emit("ready", 1)
+    ees.on("error", error_helper.error_listener)
+    ees.on("ready", error_helper.error_raiser, replay=True)
+    error_helper.assert_error_was_emitted()
+
+
+def test_replay_wildcard(mock: Mock) -> None:
+    ees = EventEmitterS(wildcard=True)
+    ees.configure_event("Network.ready", replay=1)
+    ees.on("Network.*", mock.pattern)
+    assert ees.emit("Network.ready", 1)
+    ees.on("Network.ready", mock.method, replay=True)
+    assert mock.mock_calls == [call.pattern(1), call.method(1)]
+
+
+@pytest.mark.asyncio
+async def test_bridge(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    here, there = bridge_pipe()
+    with EventBridge(ees_with_event_loop, here) as bridge, EventBridge(
+        remote, there
+    ) as remote_bridge:
+        ees_with_event_loop.emit("data", 0)
+        remote.on("data", mock.method)
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        assert ees_with_event_loop.listener_count("data") == 1
+        assert ees_with_event_loop.listener_count("other") == 0
+        received = ensure_future(remote.wait_for("data", lambda arg, **kw: arg == 2))
+        for arg in range(1, 3):
+            ees_with_event_loop.emit("data", arg, key=arg)
+        assert len(bridge._batch) == 2
+        await received
+        assert mock.method.mock_calls == [call(1, key=1), call(2, key=2)]
+        remote_bridge.unsubscribe("data")
+        await sleep(0.01)
+        assert ees_with_event_loop.listener_count("data") == 0
+    assert here.closed and there.closed
+
+
+@pytest.mark.asyncio
+async def test_bridge_does_not_echo(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    here, there = bridge_pipe()
+    with EventBridge(ees_with_event_loop, here, 0) as bridge, EventBridge(
+        remote, there, 0
+    ) as remote_bridge:
+        ees_with_event_loop.on("data", mock.local)
+        remote.on("data", mock.remote)
+        bridge.subscribe("data")
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        ees_with_event_loop.emit("data", 1)
+        await sleep(0.01)
+        remote.emit("data", 2)
+        await sleep(0.01)
+    assert mock.mock_calls == [
+        call.local(1),
+        call.remote(1),
+        call.remote(2),
+        call.local(2),
+    ]
+    assert ees_with_event_loop.listener_count("data") == 1
+
+
+@pytest.mark.asyncio
+async def test_bridge_reports_unreadable_messages(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    here, there = bridge_pipe()
+    there.send_bytes(b"not a pickle")
+    event_loop.set_exception_handler(mock.handler)
+    try:
+        with EventBridge(ees_with_event_loop, here, 0) as bridge, EventBridge(
+            remote, there, 0
+        ):
+            ees_with_event_loop.on("data", mock.method)
+            bridge.subscribe("data")
+            await sleep(0.01)
+            remote.emit("data", 1)
+            await sleep(0.01)
+            remote.emit("data", 2)
+            await sleep(0.01)
+    finally:
+        event_loop.set_exception_handler(None)
+    assert mock.method.mock_calls == [call(1), call(2)]
+    assert len(mock.handler.mock_calls) == 1
+    assert mock.handler.call_args[0][1]["message"] == (
+        "EventBridge failed to handle a message"
+    )
+    assert not bridge._incoming
+
+
+def bridge_worker(connection: Connection, size: int) -> None:
+    """Exchanges a large emit with the test process, both sides flushing at once"""
+
+    async def exchange() -> None:
+        ees = EventEmitterS(loop=get_running_loop())
+        received = ensure_future(ees.wait_for("from_parent"))
+        bridge = EventBridge(ees, connection, 0)
+        bridge.subscribe("from_parent")
+        while not ees.has_listeners("from_worker"):
+            await sleep(0.001)
+        ees.emit("from_worker", b"w" * size)
+        (payload,) = await wait_for(received, 30)
+        assert payload == b"p" * size
+        # the test process closes its end once it received the emit
+        while not connection.closed:
+            await sleep(0.001)
+
+    run(exchange())
+
+
+@pytest.mark.asyncio
+async def test_bridge_spawned_process_large_emits(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS
+) -> None:
+    size = 4 * 1024 * 1024
+    here, there = bridge_pipe()
+    process = get_context("spawn").Process(target=bridge_worker, args=(there, size))
+    process.start()
+    there.close()
+    received = ensure_future(ees_with_event_loop.wait_for("from_worker"))
+    with EventBridge(ees_with_event_loop, here, 0) as bridge:
+        bridge.subscribe("from_worker")
+        while not ees_with_event_loop.has_listeners("from_parent"):
+            await sleep(0.001)
+        ees_with_event_loop.emit("from_parent", b"p" * size)
+        (payload,) = await wait_for(received, 30)
+        assert payload == b"w" * size
+    await event_loop.run_in_executor(None, process.join, 30)
+    assert process.exitcode == 0
+    assert here.closed
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    received = []
+    kept = []
+
+    def listener(*args, **kwargs) -> None:
+        received.append((args, kwargs))
+        if kwargs.get("keep"):
+            kept.append(args[0].retain())
+
+    remote.on("data", listener)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ees_with_event_loop, here, 0, shared_memory_threshold=1024
+    ) as bridge, EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        large = bytes(range(256)) * 16
+        ees_with_event_loop.emit("data", large, b"small", keep=True)
+        ees_with_event_loop.emit("data", array("d", range(512)), bytearray(large))
+        await sleep(0.01)
+        (payload, small), kwargs = received[0]
+        assert isinstance(payload, SharedPayload) and kwargs == {"keep": True}
+        assert small == b"small"
+        assert kept == [payload] and not payload.released
+        assert payload.tobytes() == large
+        doubles, copied = received[1][0]
+        assert doubles.released and copied.released
+        assert len(bridge._pool) == 3
+        ees_with_event_loop.emit("data", large, large)
+        await sleep(0.01)
+        assert len(bridge._pool) == 3
+        payload.release()
+        await sleep(0.01)
+        assert payload.released
+        assert len(bridge._pool) == 3
+    assert len(bridge._pool) == 0
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory_unmaps_destroyed_segments(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS, mock: Mock
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    remote.on("data", mock.method)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ees_with_event_loop, here, 0, shared_memory_threshold=0
+    ) as bridge, EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        for _ in range(3):
+            for arg in range(10):
+                ees_with_event_loop.emit("data", bytes([arg]) * 64)
+            await sleep(0.02)
+            assert len(bridge._pool) == bridge._pool.max_free
+            assert len(remote_bridge._segments._segments) == bridge._pool.max_free
+    assert len(mock.method.mock_calls) == 30
+
+
+def shared_memory_worker(connection: Connection) -> None:
+    """Shares a buffer with the test process, destroying its segment once released"""
+    pool = SegmentPool()
+    connection.send(pool.share(b"shared" * 1024))
+    pool.release(connection.recv())
+    pool.close()
+    connection.send("closed")
+
+
+@pytest.mark.parametrize("start_method", ["spawn", "fork"])
+def test_shared_memory_segments_of_child_processes(start_method: str) -> None:
+    tracker = tracker_id()
+    here, there = Pipe()
+    process = get_context(start_method).Process(
+        target=shared_memory_worker, args=(there,)
+    )
+    process.start()
+    there.close()
+    handle = here.recv()
+    assert handle.pid == process.pid
+    assert handle.tracker == tracker
+    cache = SegmentCache()
+    with patch.object(
+        resource_tracker, "unregister", wraps=resource_tracker.unregister
+    ) as unregister:
+        payload = cache.receive(handle, here.send)
+    # the shared tracker keeps tracking the segment for the child
+    unregister.assert_not_called()
+    assert payload.tobytes() == b"shared" * 1024
+    payload.release()
+    cache.close()
+    assert here.recv() == "closed"
+    process.join(30)
+    assert process.exitcode == 0
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(handle.name)
+    here.close()
+
+
+def test_shared_memory_segments_of_other_trackers() -> None:
+    pool = SegmentPool()
+    handle = pool.share(b"data")
+    assert handle.pid == os.getpid()
+    foreign = SharedHandle(
+        handle.name, handle.nbytes, handle.format, handle.shape, 0, (0, 0)
+    )
+    own, other = SegmentCache(), SegmentCache()
+    with patch.object(resource_tracker, "unregister") as unregister:
+        own.receive(handle, pool.release).release()
+        unregister.assert_not_called()
+        other.receive(foreign, pool.release).release()
+    own.close()
+    other.close()
+    if sys.version_info < (3, 13):
+        unregister.assert_called_once()
+        assert unregister.call_args[0][1] == "shared_memory"
+    else:
+        unregister.assert_not_called()
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_bridge_shared_memory_formats(
+    event_loop: AbstractEventLoop, ees_with_event_loop: EventEmitterS
+) -> None:
+    remote = EventEmitterS(loop=event_loop)
+    views = []
+
+    def listener(payload: SharedPayload) -> None:
+        views.append((payload.view.format, payload.view.tolist()))
+
+    remote.on("data", listener)
+    here, there = bridge_pipe()
+    with EventBridge(
+        ees_with_event_loop, here, 0, shared_memory_threshold=0
+    ), EventBridge(remote, there, 0) as remote_bridge:
+        remote_bridge.subscribe("data")
+        await sleep(0.01)
+        ees_with_event_loop.emit("data", array("d", [1.5, 2.5]))
+        ees_with_event_loop.emit("data", memoryview(b"ab"))
+        await sleep(0.01)
+    assert views == [("d", [1.5, 2.5]), ("B", [97, 98])]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compiled", [False, True])
+async def test_eager_listeners(
+    event_loop: AbstractEventLoop, compiled: bool, mock: Mock
+) -> None:
+    ees = EventEmitterS(loop=event_loop, compiled=compiled, tracked=True, eager=True)
+    gate = event_loop.create_future()
+
+    async def cached(arg: int) -> None:
+        mock.cached(arg)
+
+    async def suspending(arg: int) -> str:
+        mock.before(arg)
+        value = await gate
+        mock.after(arg, value)
+        return value
+
+    ees.on("data", cached)
+    ees.on("data", suspending)
+    ees.emit("data", 1)
+    assert mock.mock_calls == [call.cached(1), call.before(1)]
+    assert ees.pending_count() == 1
+    gate.set_result("value")
+    assert await ees.drain(1)
+    assert mock.mock_calls[-1] == call.after(1, "value")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compiled", [False, True])
+async def test_eager_listener_errors(
+    event_loop: AbstractEventLoop, compiled: bool
+) -> None:
+    ees = EventEmitterS(loop=event_loop, compiled=compiled, eager=True)
+    errors = []
+
+    async def fails_now() -> None:
+        raise ValueError("now")
+
+    async def fails_later() -> None:
+        await sleep(0)
+        raise ValueError("later")
+
+    ees.on("error", errors.append)
+    ees.on("data", fails_now)
+    ees.on("data", fails_later)
+    ees.emit("data")
+    await sleep(0.01)
+    assert [str(error) for error in errors] == ["now", "later"]
+
+
+@pytest.mark.asyncio
+async def test_eager_listeners_run_in_their_own_task_and_context(
+    event_loop: AbstractEventLoop,
+) -> None:
+    ees = EventEmitterS(loop=event_loop, eager=True)
+    variable: ContextVar[str] = ContextVar("variable", default="caller")
+    seen = []
+
+    async def listener() -> None:
+        variable.set("listener")
+        seen.append(current_task())
+        # uses asyncio.timeout, which needs a task, on Python 3.12+
+        await wait_for(sleep(0), 1)
+
+    ees.on("data", listener)
+    caller = current_task()
+    ees.emit("data")
+    event_loop.call_soon(ees.emit, "data")
+    await sleep(0.01)
+    assert len(seen) == 2
+    assert caller not in seen and None not in seen
+    assert variable.get() == "caller"
+    assert ees.pending_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_eager_listener_cancelled(
+    event_loop: AbstractEventLoop, mock: Mock
+) -> None:
+    ees = EventEmitterS(loop=event_loop, tracked=True, eager=True)
+
+    async def waiting() -> None:
+        try:
+            await event_loop.create_future()
+        except CancelledError:
+            mock.cancelled()
+            raise
+
+    ees.on("data", waiting)
+    ees.emit("data")
+    assert ees.pending_count() == 1
+    await ees.aclose()
+    mock.cancelled.assert_called_once_with()
+    assert ees.pending_count() == 0